@@ -0,0 +1,97 @@
+"""
+Throughput benchmark of the birthday notification fan-out.
+
+Seeds a SQLite database, starts the local SMTP stub and sends today's birthday digest
+to every user, reporting messages per second for the given pool size and concurrency.
+
+Usage:
+    python -m benchmarks.notifications --users 10000 --pool-size 10 --concurrency 50 --smtp-latency-ms 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.run import create_benchmark_engine, seed
+from src.database.models import Base
+from src.services.notifications import SMTPPool, send_birthday_notifications
+from src.services.smtp_stub import SMTPStub
+
+
+def run_notifications_benchmark(
+    users: int = 1000,
+    pool_size: int = 10,
+    concurrency: int = 50,
+    smtp_latency_ms: float = 0,
+) -> dict:
+    """
+    The run_notifications_benchmark function measures one notification run against the SMTP stub.
+
+    :param users: int: Number of seeded users (all of them are recipients)
+    :param pool_size: int: Number of pooled SMTP connections
+    :param concurrency: int: Number of messages rendered and sent at the same time
+    :param smtp_latency_ms: float: Simulated latency of the SMTP server per message
+    :return: The report
+    """
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_benchmark_engine(
+            f"sqlite:///{os.path.join(tmp_dir, 'benchmark.db')}"
+        )
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        Base.metadata.create_all(bind=engine)
+        seed(session_factory, users, 0)
+
+        async def run():
+            async with SMTPStub(latency=smtp_latency_ms / 1000) as stub:
+                pool = SMTPPool(stub.host, stub.port, size=pool_size)
+                with session_factory() as db:
+                    summary = await send_birthday_notifications(
+                        db, pool, concurrency=concurrency
+                    )
+                await pool.close()
+                summary["smtp_connections"] = stub.connections
+                return summary
+
+        summary = asyncio.run(run())
+        engine.dispose()
+    return {
+        "meta": {
+            "users": users,
+            "pool_size": pool_size,
+            "concurrency": concurrency,
+            "smtp_latency_ms": smtp_latency_ms,
+        },
+        "summary": summary,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Birthday notification benchmark")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--pool-size", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--smtp-latency-ms", type=float, default=0)
+    parser.add_argument("--output", help="save the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    report = run_notifications_benchmark(
+        users=args.users,
+        pool_size=args.pool_size,
+        concurrency=args.concurrency,
+        smtp_latency_ms=args.smtp_latency_ms,
+    )
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,453 @@
+"""
+Load-test and benchmark suite for the API.
+
+The application is run in-process against a dedicated database (a temporary SQLite
+file by default or Postgres via --db-url; its tables are dropped and re-created)
+with an in-memory fake of Redis for the rate limiter. The database is seeded with
+users and contacts, then every scenario is measured for p50/p99 latency, throughput
+and DB queries per request. The report is printed and optionally saved as JSON.
+
+Usage:
+    python -m benchmarks.run --users 1000 --contacts-per-user 5 --output report.json
+    python -m benchmarks.run --baseline report.json --max-regression 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import httpx
+from fastapi import Request
+from fastapi_limiter import FastAPILimiter
+from sqlalchemy import create_engine, event, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from main import app
+from src.database.db import (
+    RoutingSession,
+    begin_unit_of_work,
+    get_db,
+    instrument_engine,
+)
+from src.database.models import Base, Contact, User
+from src.services.auth import auth_service
+
+PASSWORD = "benchmark-password"
+SERVER_TIMING_RE = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries"')
+
+
+class FakeRedis:
+    """
+    In-memory replacement of Redis for FastAPILimiter that never throttles,
+    so the benchmark measures the application rather than the rate limit.
+    """
+
+    def __init__(self):
+        self.calls = 0
+
+    async def script_load(self, script: str) -> str:
+        return "benchmark"
+
+    async def evalsha(self, sha: str, numkeys: int, *args) -> int:
+        self.calls += 1
+        return 0
+
+    async def close(self):
+        pass
+
+
+def _date_part(field: str, value: str) -> int:
+    return getattr(date.fromisoformat(value[:10]), field)
+
+
+def create_benchmark_engine(db_url: str):
+    """
+    The create_benchmark_engine function creates an instrumented engine for the benchmark.
+    For SQLite the Postgres date_part function used by the birthdays query is registered.
+
+    :param db_url: str: Database URL
+    :return: Engine
+    """
+
+    if db_url.startswith("sqlite"):
+        engine = create_engine(db_url, connect_args={"check_same_thread": False})
+
+        @event.listens_for(engine, "connect")
+        def _register_functions(dbapi_connection, connection_record):
+            dbapi_connection.create_function("date_part", 2, _date_part)
+
+    else:
+        engine = create_engine(db_url)
+    return instrument_engine(engine)
+
+
+def seed(session_factory, users: int, contacts_per_user: int) -> list[int]:
+    """
+    The seed function fills the database with confirmed users and their contacts.
+    Birthdays are spread over the next 30 days, so the birthdays query has results.
+
+    :param session_factory: sessionmaker bound to the benchmark engine
+    :param users: int: Number of users
+    :param contacts_per_user: int: Number of contacts of every user
+    :return: Ids of the created users
+    """
+
+    password = auth_service.get_password_hash(PASSWORD)
+    today = date.today()
+    with session_factory() as db:
+        db.execute(
+            insert(User),
+            [
+                {
+                    "name": f"name{i}",
+                    "last_name": f"last_name{i}",
+                    "day_of_born": (today + timedelta(days=i % 30)).replace(year=1992),
+                    "email": f"user{i}@example.com",
+                    "password": password,
+                    "description": "benchmark user",
+                    "confirmed": True,
+                }
+                for i in range(users)
+            ],
+        )
+        user_ids = db.execute(select(User.id).order_by(User.id)).scalars().all()
+        if contacts_per_user:
+            db.execute(
+                insert(Contact),
+                [
+                    {"phone_number": f"+380{n:09d}", "user_id": user_id}
+                    for n, user_id in enumerate(
+                        user_id
+                        for user_id in user_ids
+                        for _ in range(contacts_per_user)
+                    )
+                ],
+            )
+        db.commit()
+    return user_ids
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def measure(
+    client: httpx.AsyncClient, requests: int, concurrency: int, make_request
+):
+    """
+    The measure function sends requests with bounded concurrency and collects their latency.
+
+    :param client: httpx.AsyncClient: Client bound to the application
+    :param requests: int: Number of requests
+    :param concurrency: int: Maximum number of requests in flight
+    :param make_request: Callable returning (method, url, kwargs) for the request number
+    :return: dict with latency percentiles, throughput, errors and DB statistics
+    """
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, db_times, db_queries = [], [], []
+    errors = 0
+
+    async def one(n: int):
+        nonlocal errors
+        method, url, kwargs = make_request(n)
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            errors += 1
+        timing = SERVER_TIMING_RE.search(response.headers.get("Server-Timing", ""))
+        if timing:
+            db_times.append(float(timing.group(1)))
+            db_queries.append(int(timing.group(2)))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(n) for n in range(requests)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 3),
+        "throughput_rps": round(requests / elapsed, 1),
+        "db_time_mean_ms": round(statistics.mean(db_times), 3) if db_times else None,
+        "db_queries_mean": (
+            round(statistics.mean(db_queries), 2) if db_queries else None
+        ),
+    }
+
+
+async def run_scenarios(
+    user_ids: list[int],
+    contacts_per_user: int,
+    requests: int,
+    login_requests: int,
+    concurrency: int,
+) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://benchmark"
+    ) as client:
+        response = await client.post(
+            "/api/auth/login",
+            data={"username": "user0@example.com", "password": PASSWORD},
+        )
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        own_contacts = list(range(1, contacts_per_user + 1))  # контакти user0
+        today = (date.today()).replace(year=1992).isoformat()
+        user_body = {
+            "name": "name0",
+            "last_name": "last_name0",
+            "day_of_born": today,
+            "email": "user0@example.com",
+            "description": "benchmark user",
+            "password": PASSWORD,
+            "contacts": own_contacts,
+        }
+        # один запит замість 20 окремих GET /{id}
+        batch_user_ids = ",".join(str(user_id) for user_id in user_ids[:20])
+        batch_contact_ids = ",".join(str(contact_id) for contact_id in range(1, 21))
+        # ланцюжок викликів мобільного клієнта за один round trip
+        mobile_start = {
+            "requests": [
+                {"path": "/api/users/me/"},
+                {"path": "/api/contacts/?limit=100"},
+                {"path": "/api/users/next_7_days_birthdays/"},
+            ]
+        }
+        scenarios = {
+            "login": (
+                login_requests,
+                lambda n: (
+                    "POST",
+                    "/api/auth/login",
+                    {
+                        "data": {
+                            "username": f"user{n % len(user_ids)}@example.com",
+                            "password": PASSWORD,
+                        }
+                    },
+                ),
+            ),
+            "users_me": (
+                requests,
+                lambda n: ("GET", "/api/users/me/", {"headers": headers}),
+            ),
+            "get_user": (
+                requests,
+                lambda n: (
+                    "GET",
+                    f"/api/users/{user_ids[n % len(user_ids)]}",
+                    {"headers": headers},
+                ),
+            ),
+            "get_users_batch": (
+                requests,
+                lambda n: (
+                    "GET",
+                    f"/api/users/batch?ids={batch_user_ids}",
+                    {"headers": headers},
+                ),
+            ),
+            "get_contacts_batch": (
+                requests,
+                lambda n: (
+                    "GET",
+                    f"/api/contacts/batch?ids={batch_contact_ids}",
+                    {"headers": headers},
+                ),
+            ),
+            "list_users": (
+                requests,
+                lambda n: ("GET", "/api/users/?limit=100", {"headers": headers}),
+            ),
+            "list_users_sparse": (
+                requests,
+                lambda n: (
+                    "GET",
+                    "/api/users/?limit=100&fields=id,name,email",
+                    {"headers": headers},
+                ),
+            ),
+            "list_contacts": (
+                requests,
+                lambda n: ("GET", "/api/contacts/?limit=100", {"headers": headers}),
+            ),
+            "birthdays": (
+                requests,
+                lambda n: (
+                    "GET",
+                    "/api/users/next_7_days_birthdays/",
+                    {"headers": headers},
+                ),
+            ),
+            "batch_mobile_start": (
+                requests,
+                lambda n: (
+                    "POST",
+                    "/api/batch",
+                    {"headers": headers, "json": mobile_start},
+                ),
+            ),
+            "bulk_update_user_contacts": (
+                requests,
+                lambda n: (
+                    "PUT",
+                    f"/api/users/{user_ids[0]}",
+                    {"headers": headers, "json": user_body},
+                ),
+            ),
+        }
+        results = {}
+        for name, (count, make_request) in scenarios.items():
+            if count:
+                results[name] = await measure(client, count, concurrency, make_request)
+    return results
+
+
+def run_benchmark(
+    db_url: str | None = None,
+    users: int = 200,
+    contacts_per_user: int = 5,
+    requests: int = 200,
+    login_requests: int = 20,
+    concurrency: int = 10,
+) -> dict:
+    """
+    The run_benchmark function prepares the database, runs all scenarios and builds the report.
+
+    :param db_url: str | None: Database URL, a temporary SQLite file if not set
+    :param users: int: Number of seeded users
+    :param contacts_per_user: int: Number of seeded contacts per user
+    :param requests: int: Number of requests per scenario
+    :param login_requests: int: Number of login requests (bcrypt makes them slow)
+    :param concurrency: int: Maximum number of requests in flight
+    :return: The report
+    """
+
+    tmp_dir = None
+    if db_url is None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        db_url = f"sqlite:///{os.path.join(tmp_dir.name, 'benchmark.db')}"
+    engine = create_benchmark_engine(db_url)
+    session_factory = sessionmaker(
+        class_=RoutingSession, autocommit=False, autoflush=False, bind=engine
+    )
+
+    def override_get_db(request: Request):
+        db = session_factory()
+        begin_unit_of_work(db, request)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    previous_override = app.dependency_overrides.get(get_db)
+    previous_redis = FastAPILimiter.redis
+    try:
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        user_ids = seed(session_factory, users, contacts_per_user)
+        app.dependency_overrides[get_db] = override_get_db
+        asyncio.run(FastAPILimiter.init(FakeRedis()))
+        results = asyncio.run(
+            run_scenarios(
+                user_ids, contacts_per_user, requests, login_requests, concurrency
+            )
+        )
+    finally:
+        if previous_override is None:
+            app.dependency_overrides.pop(get_db, None)
+        else:
+            app.dependency_overrides[get_db] = previous_override
+        FastAPILimiter.redis = previous_redis
+        engine.dispose()
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
+
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "database": engine.url.render_as_string(hide_password=True),
+            "users": users,
+            "contacts_per_user": contacts_per_user,
+            "requests": requests,
+            "login_requests": login_requests,
+            "concurrency": concurrency,
+        },
+        "scenarios": results,
+    }
+
+
+def compare(report: dict, baseline: dict, max_regression: float) -> list[str]:
+    """
+    The compare function finds scenarios whose p99 latency regressed against the baseline.
+
+    :param report: dict: The current report
+    :param baseline: dict: A previously saved report
+    :param max_regression: float: Allowed relative growth of p99, e.g. 0.2 for 20%
+    :return: A list of human-readable regressions, empty if there are none
+    """
+
+    regressions = []
+    for name, result in report["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base and result["p99_ms"] > base["p99_ms"] * (1 + max_regression):
+            regressions.append(
+                f"{name}: p99 {result['p99_ms']} ms > baseline {base['p99_ms']} ms"
+            )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="API load-test and benchmark suite")
+    parser.add_argument("--db-url", help="database URL (default: temporary SQLite)")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--contacts-per-user", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--login-requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--output", help="save the JSON report to this file")
+    parser.add_argument("--baseline", help="JSON report to compare p99 latency with")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(
+        db_url=args.db_url,
+        users=args.users,
+        contacts_per_user=args.contacts_per_user,
+        requests=args.requests,
+        login_requests=args.login_requests,
+        concurrency=args.concurrency,
+    )
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            regressions = compare(report, json.load(file), args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
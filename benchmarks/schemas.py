@@ -0,0 +1,112 @@
+"""
+Validation/serialization benchmark of the response schemas.
+
+Measures UserResponseGet and ContactResponse built from ORM objects
+(what FastAPI does with response_model for the list endpoints) and dumped to JSON
+with the installed pydantic. Run it with pydantic v1 and v2 to compare the versions.
+
+Usage:
+    python -m benchmarks.schemas --users 100 --contacts-per-user 5 --output report.json
+"""
+
+import argparse
+import json
+import sys
+from datetime import date, datetime
+
+import pydantic
+
+from benchmarks.serialization import timed
+from src.database.models import Contact, User
+from src.schemas import ContactResponse, UserResponseGet
+
+
+def make_users(users: int, contacts_per_user: int) -> list[User]:
+    now = datetime.utcnow()
+    return [
+        User(
+            id=i,
+            name=f"name{i}",
+            last_name=f"last_name{i}",
+            day_of_born=date(1992, 1 + i % 12, 1 + i % 28),
+            email=f"user{i}@example.com",
+            description="benchmark user",
+            password="$2b$12$" + "x" * 53,
+            created_at=now,
+            updated_at=now,
+            contacts=[
+                Contact(
+                    id=i * contacts_per_user + n, phone_number=f"+380{i:05d}{n:04d}"
+                )
+                for n in range(contacts_per_user)
+            ],
+        )
+        for i in range(users)
+    ]
+
+
+def validate(model, objects):
+    if hasattr(model, "model_validate"):
+        return [model.model_validate(obj) for obj in objects]
+    return [model.from_orm(obj) for obj in objects]
+
+
+def dump_json(models) -> list[str]:
+    if hasattr(models[0], "model_dump_json"):
+        return [model.model_dump_json() for model in models]
+    return [model.json() for model in models]
+
+
+def run_schemas_benchmark(
+    users: int = 100, contacts_per_user: int = 5, repeat: int = 50
+) -> dict:
+    """
+    The run_schemas_benchmark function measures validation and JSON serialization
+    of the list endpoint schemas.
+
+    :param users: int: Number of users in the list
+    :param contacts_per_user: int: Number of contacts of every user
+    :param repeat: int: Number of repetitions of every measurement
+    :return: The report
+    """
+
+    orm_users = make_users(users, contacts_per_user)
+    orm_contacts = [contact for user in orm_users for contact in user.contacts]
+    user_models = validate(UserResponseGet, orm_users)
+    contact_models = validate(ContactResponse, orm_contacts)
+    return {
+        "meta": {
+            "pydantic": pydantic.VERSION,
+            "users": users,
+            "contacts_per_user": contacts_per_user,
+            "repeat": repeat,
+        },
+        "users_validate": timed(lambda: validate(UserResponseGet, orm_users), repeat),
+        "users_dump_json": timed(lambda: dump_json(user_models), repeat),
+        "contacts_validate": timed(
+            lambda: validate(ContactResponse, orm_contacts), repeat
+        ),
+        "contacts_dump_json": timed(lambda: dump_json(contact_models), repeat),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Response schema benchmark")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--contacts-per-user", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--output", help="save the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    report = run_schemas_benchmark(
+        users=args.users, contacts_per_user=args.contacts_per_user, repeat=args.repeat
+    )
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+Serialization benchmark of the list endpoints.
+
+Compares the previous path of GET /api/users/ (ORM objects with lazy-loaded contacts,
+validated through UserResponseGet, jsonable_encoder and the stdlib json encoder)
+with the current one (rows mapped directly to dicts and encoded with orjson).
+Both the full path (DB + serialization) and the serialization alone are measured,
+and the outputs are checked to be the same JSON.
+
+Usage:
+    python -m benchmarks.serialization --users 100 --contacts-per-user 5 --output report.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.run import create_benchmark_engine, seed
+from src.database.models import Base
+from src.repository import users as repository_users
+from src.schemas import UserResponseGet
+
+
+def pydantic_json(users) -> bytes:
+    # те, що FastAPI робить з response_model: валідація, jsonable_encoder, JSONResponse
+    models = [UserResponseGet.model_validate(user) for user in users]
+    return json.dumps(
+        jsonable_encoder(models),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def rows_orjson(users: list[dict]) -> bytes:
+    return orjson.dumps(users, option=orjson.OPT_NON_STR_KEYS)
+
+
+def timed(function, repeat: int) -> dict:
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return {
+        "p50_ms": round(statistics.median(durations) * 1000, 3),
+        "mean_ms": round(statistics.mean(durations) * 1000, 3),
+        "min_ms": round(min(durations) * 1000, 3),
+    }
+
+
+def run_serialization_benchmark(
+    users: int = 100, contacts_per_user: int = 5, limit: int = 100, repeat: int = 50
+) -> dict:
+    """
+    The run_serialization_benchmark function measures both paths of the users list.
+
+    :param users: int: Number of seeded users
+    :param contacts_per_user: int: Number of seeded contacts per user
+    :param limit: int: Page size of the list endpoint
+    :param repeat: int: Number of repetitions of every measurement
+    :return: The report
+    """
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_benchmark_engine(
+            f"sqlite:///{os.path.join(tmp_dir, 'benchmark.db')}"
+        )
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        Base.metadata.create_all(bind=engine)
+        seed(session_factory, users, contacts_per_user)
+
+        def orm_path():
+            with session_factory() as db:
+                users = asyncio.run(repository_users.get_users(0, limit, db))
+                return pydantic_json(users)
+
+        def rows_path():
+            with session_factory() as db:
+                users = asyncio.run(repository_users.get_users_as_dicts(0, limit, db))
+                return rows_orjson(users)
+
+        with session_factory() as db:
+            orm_users = asyncio.run(repository_users.get_users(0, limit, db))
+            for user in orm_users:
+                user.contacts  # завантажуємо контакти заздалегідь
+            row_users = asyncio.run(repository_users.get_users_as_dicts(0, limit, db))
+            report = {
+                "meta": {
+                    "users": users,
+                    "contacts_per_user": contacts_per_user,
+                    "limit": limit,
+                    "repeat": repeat,
+                },
+                "outputs_equal": json.loads(orm_path()) == json.loads(rows_path()),
+                "full_path": {
+                    "orm_pydantic_json": timed(orm_path, repeat),
+                    "rows_orjson": timed(rows_path, repeat),
+                },
+                "serialization_only": {
+                    "orm_pydantic_json": timed(
+                        lambda: pydantic_json(orm_users), repeat
+                    ),
+                    "rows_orjson": timed(lambda: rows_orjson(row_users), repeat),
+                },
+            }
+        engine.dispose()
+
+    for section in ("full_path", "serialization_only"):
+        old = report[section]["orm_pydantic_json"]["p50_ms"]
+        new = report[section]["rows_orjson"]["p50_ms"]
+        report[section]["speedup"] = round(old / new, 1) if new else None
+    return report
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="List endpoint serialization benchmark"
+    )
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--contacts-per-user", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--output", help="save the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    report = run_serialization_benchmark(
+        users=args.users,
+        contacts_per_user=args.contacts_per_user,
+        limit=args.limit,
+        repeat=args.repeat,
+    )
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
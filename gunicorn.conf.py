@@ -0,0 +1,40 @@
+"""
+Gunicorn settings for running the application with several worker processes:
+
+    PROMETHEUS_MULTIPROC_DIR=/tmp/metrics gunicorn main:app
+
+The application is imported once in the master (preload_app), every worker is forked
+from it and builds its own Redis pool and HTTP client in the lifespan of main.app.
+The DB connection pool inherited from the master is dropped right after the fork
+(see src.database.db.dispose_engine_after_fork).
+Background tasks run in one worker at a time, the one holding their Redis lock.
+For development a single process is enough: uvicorn main:app --reload
+"""
+
+import multiprocessing
+import os
+
+from src.conf.config import settings
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = settings.web_concurrency or multiprocessing.cpu_count() * 2 + 1
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+graceful_timeout = 30
+timeout = 60
+
+
+def on_starting(server):
+    # файли метрик попереднього запуску не повинні потрапити в нові значення
+    metrics_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if metrics_dir:
+        os.makedirs(metrics_dir, exist_ok=True)
+        for name in os.listdir(metrics_dir):
+            os.remove(os.path.join(metrics_dir, name))
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,35 +1,345 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+import math
+import os
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+from anyio import to_thread
+from fastapi import FastAPI, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from src.routes import contacts, users, auth
-import redis.asyncio as redis
+from fastapi.responses import ORJSONResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    generate_latest,
+    multiprocess,
+)
+from redis.asyncio import ConnectionPool
+from src.routes import contacts, users, auth, batch, changes
 from src.conf.config import settings  # для обмеження кількості запитів
+from src.database.db import (
+    DBRoute,
+    QueryStats,
+    db_route,
+    engine,
+    query_stats,
+    replica_engines,
+)
+from src.services.metrics import (
+    InstrumentedRedis,
+    REQUEST_LATENCY,
+    REQUESTS_IN_PROGRESS,
+)
+from src.services.profiler import (
+    StackSampler,
+    is_valid_profile_token,
+    profiling_lock,
+    save_profile,
+)
+from src.services.compression import CompressionMiddleware
+from src.services.idempotency import IdempotencyMiddleware
+from src.services.admission import AdmissionMiddleware
+from src.services.birthdays import birthday_digest_scheduler
+from src.services.purge import purge_scheduler
+from src.services.outbox import outbox_relay
+from src.services.contact_events import ContactChangeHub
+from src.services.locks import run_as_leader
 
 from fastapi_limiter import FastAPILimiter
 
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    The lifespan function creates the resources of one worker process when it starts
+    and releases them when it stops: the Redis connection pool (used by FastAPILimiter),
+    the pub/sub hub of the contact event streams, the shared HTTP client,
+    the size of the thread pool and the background tasks. Every worker competes for
+    the background tasks, but each of them runs in one worker at a time.
+    Everything is created after the fork, so workers never share connections.
+
+    :param app: FastAPI: The application
+    :return: None, the application runs between startup and shutdown
+    """
+
+    # розмір пулу потоків для sync-залежностей і run_in_threadpool
+    to_thread.current_default_thread_limiter().total_tokens = settings.threadpool_size
+    redis_pool = ConnectionPool(
+        host=settings.redis_host,
+        port=settings.redis_port,
+        db=0,
+        max_connections=settings.redis_max_connections,
+    )
+    app.state.redis = InstrumentedRedis(connection_pool=redis_pool)
+    app.state.http_client = httpx.AsyncClient(timeout=settings.http_timeout)
+    app.state.contact_changes = ContactChangeHub(
+        app.state.redis, settings.contact_events_queue_size
+    )
+    app.state.birthday_digest_task = None
+    app.state.purge_task = None
+    app.state.outbox_task = None
+    try:
+        await FastAPILimiter.init(app.state.redis)
+        # фонові задачі виконує лише один воркер - той, що тримає їхній замок
+        if settings.birthday_digest_scheduler_enabled:
+            app.state.birthday_digest_task = asyncio.create_task(
+                run_as_leader(
+                    app.state.redis,
+                    "birthday_digest",
+                    settings.leader_lock_seconds,
+                    birthday_digest_scheduler,
+                )
+            )
+        if settings.purge_scheduler_enabled:
+            app.state.purge_task = asyncio.create_task(
+                run_as_leader(
+                    app.state.redis,
+                    "purge",
+                    settings.leader_lock_seconds,
+                    purge_scheduler,
+                )
+            )
+        if settings.outbox_relay_enabled:
+            app.state.outbox_task = asyncio.create_task(
+                run_as_leader(
+                    app.state.redis,
+                    "outbox_relay",
+                    settings.leader_lock_seconds,
+                    outbox_relay,
+                    app.state.redis,
+                )
+            )
+        yield
+    finally:
+        tasks = [
+            task
+            for task in (
+                app.state.birthday_digest_task,
+                app.state.purge_task,
+                app.state.outbox_task,
+            )
+            if task is not None
+        ]
+        for task in tasks:
+            task.cancel()
+        # задачі звільняють свої замки, поки Redis ще доступний
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await app.state.contact_changes.close()
+        await app.state.http_client.aclose()
+        await app.state.redis.close()
+        await redis_pool.disconnect()
+        for db_engine in (engine, *replica_engines):
+            db_engine.dispose()
+
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 
 app.include_router(auth.router, prefix="/api")
 app.include_router(contacts.router, prefix="/api")
 app.include_router(users.router, prefix="/api")
+app.include_router(batch.router, prefix="/api")
+app.include_router(changes.router, prefix="/api")
+
+
+PRIMARY_COOKIE = "db_primary_until"
+
+
+@app.middleware("http")
+async def db_routing(request: Request, call_next):
+    """
+    The db_routing middleware keeps the reads of a client on the primary database
+    for replica_stickiness_seconds after its last write, so the client always reads
+    its own writes even if the replicas lag behind. The deadline is kept in a cookie.
+
+    :param request: Request: The incoming request
+    :param call_next: Call the next handler in the chain
+    :return: The response, with the cookie renewed if the request wrote to the DB
+    """
+
+    if not replica_engines:
+        return await call_next(request)
+    try:
+        primary_until = float(request.cookies.get(PRIMARY_COOKIE, 0))
+    except ValueError:
+        primary_until = 0
+    route = DBRoute(sticky=primary_until > time.time())
+    token = db_route.set(route)
+    try:
+        response = await call_next(request)
+    finally:
+        db_route.reset(token)
+    if route.wrote:
+        response.set_cookie(
+            PRIMARY_COOKIE,
+            str(time.time() + settings.replica_stickiness_seconds),
+            max_age=math.ceil(settings.replica_stickiness_seconds),
+            httponly=True,
+        )
+    return response
+
+
+@app.middleware("http")
+async def db_timing(request: Request, call_next):
+    """
+    The db_timing middleware counts SQL statements executed while handling the request
+    and reports them in the Server-Timing header and in the log record of the request.
+
+    :param request: Request: The incoming request
+    :param call_next: Call the next handler in the chain
+    :return: The response with the Server-Timing header
+    """
+
+    stats = QueryStats()
+    token = query_stats.set(stats)
+    try:
+        response = await call_next(request)
+    finally:
+        query_stats.reset(token)
+    db_time_ms = stats.total_time * 1000
+    response.headers.append(
+        "Server-Timing", f'db;dur={db_time_ms:.1f};desc="{stats.count} queries"'
+    )
+    logger.info(
+        "%s %s: %d queries, %.1f ms in DB",
+        request.method,
+        request.url.path,
+        stats.count,
+        db_time_ms,
+        extra={
+            "db_queries": stats.count,
+            "db_time_ms": round(db_time_ms, 1),
+            "db_slowest_ms": round(stats.slowest_time * 1000, 1),
+            "db_slowest_statement": stats.slowest_statement,
+        },
+    )
+    return response
+
+
+@app.middleware("http")
+async def http_metrics(request: Request, call_next):
+    """
+    The http_metrics middleware records request latency per route template
+    and the number of requests in progress.
+
+    :param request: Request: The incoming request
+    :param call_next: Call the next handler in the chain
+    :return: The response of the next handler
+    """
+
+    in_progress = REQUESTS_IN_PROGRESS.labels(request.method)
+    in_progress.inc()
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        in_progress.dec()
+        route = request.scope.get("route")
+        REQUEST_LATENCY.labels(
+            request.method,
+            route.path if route is not None else "unmatched",
+            status_code,
+        ).observe(time.perf_counter() - start)
 
 
-@app.on_event("startup")  # для обмеження кількості запитів
-async def startup():
+@app.middleware("http")
+async def profiling(request: Request, call_next):
     """
-    The startup function is called when the application starts up.
-    It's a good place to initialize things that are needed by your app,
-    such as connecting to databases or initializing caches.
+    The profiling middleware samples the stacks of a request and saves them per route
+    in flamegraph-compatible (collapsed) format.
+    A request is profiled if it has a valid X-Profile token
+    (python -m src.services.profiler) or, when profiling_enabled is set,
+    with probability profiling_sample_rate. Other requests only pay for one check.
 
-    :return: A future
-    :doc-author: Trelent
+    :param request: Request: The incoming request
+    :param call_next: Call the next handler in the chain
+    :return: The response of the next handler
     """
 
-    r = await redis.Redis(host=settings.redis_host, port=settings.redis_port, db=0)
-    await FastAPILimiter.init(r)
+    profile_token = request.headers.get("X-Profile")
+    if profile_token is None:
+        if not (
+            settings.profiling_enabled
+            and random.random() < settings.profiling_sample_rate
+        ):
+            return await call_next(request)
+    elif not is_valid_profile_token(profile_token):
+        return await call_next(request)
+    if not profiling_lock.acquire(blocking=False):
+        return await call_next(request)
 
+    sampler = StackSampler(threading.get_ident(), settings.profiling_interval_ms / 1000)
+    start = time.perf_counter()
+    sampler.start()
+    try:
+        return await call_next(request)
+    finally:
+        duration = time.perf_counter() - start
+        try:
+            stacks = await run_in_threadpool(sampler.stop)
+        finally:
+            profiling_lock.release()
+        route = request.scope.get("route")
+        await run_in_threadpool(
+            save_profile,
+            route.path if route is not None else "unmatched",
+            stacks,
+            duration,
+        )
 
-# Додаємо CORS
+
+# Обмеження одночасних запитів: надлишок отримує швидку 503 замість тайм-ауту
+if settings.admission_enabled:
+    app.add_middleware(
+        AdmissionMiddleware,
+        max_in_flight=settings.admission_max_in_flight,
+        target=settings.admission_target_ms / 1000,
+        interval=settings.admission_interval_ms / 1000,
+        retry_after=settings.admission_retry_after,
+        critical_paths={"/api/auth/refresh_token", "/api/users/me/"},
+        bulk_routes={
+            ("GET", "/api/contacts/"),
+            ("GET", "/api/contacts/batch"),
+            ("GET", "/api/contacts/sync"),
+            ("GET", "/api/users/"),
+            ("GET", "/api/users/batch"),
+            ("GET", "/api/users/next_7_days_birthdays/"),
+            ("GET", "/api/changes/"),
+            ("POST", "/api/batch"),
+        },
+        exempt_paths={"/metrics", "/api/contacts/events"},
+    )
+
+# Повтори POST з тим самим Idempotency-Key отримують збережену першу відповідь
+app.add_middleware(
+    IdempotencyMiddleware,
+    paths={("POST", "/api/auth/signup"), ("POST", "/api/contacts/")},
+    ttl=settings.idempotency_ttl_seconds,
+    lock_seconds=settings.idempotency_lock_seconds,
+    wait_seconds=settings.idempotency_wait_seconds,
+)
+
+# Стискання відповідей поверх решти middleware (крім CORS) -
+# вони працюють з нестиснутим тілом
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.compression_minimum_size,
+    gzip_level=settings.compression_gzip_level,
+    brotli_quality=settings.compression_brotli_quality,
+    cache_size=settings.compression_cache_size,
+)
+
+# Додаємо CORS - зовнішнім шаром: і швидкі 503 admission control мають CORS-заголовки,
+# інакше браузер бачить мережеву помилку замість 503 з Retry-After
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # список джерел, яким дозволено доступ до застосунку
@@ -39,6 +349,22 @@ app.add_middleware(
 )
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    The metrics function exposes the collected metrics in Prometheus text format.
+
+    :return: Response
+    """
+
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        # кілька воркерів gunicorn - метрики збираються з файлів усіх процесів
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get("/")
 def read_root():
     """
@@ -0,0 +1,63 @@
+"""Soft delete
+
+Revision ID: 7d2b4c81f5a6
+Revises: 0c4f7e2a9d13
+Create Date: 2026-10-19 19:48:05.317720
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "7d2b4c81f5a6"
+down_revision: Union[str, None] = "0c4f7e2a9d13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("users_info", sa.Column("deleted_at", sa.DateTime(), nullable=True))
+    op.add_column("contacts", sa.Column("deleted_at", sa.DateTime(), nullable=True))
+    # email унікальний тільки серед не видалених користувачів
+    op.drop_index("ix_users_info_email", table_name="users_info")
+    op.create_index(
+        "ix_users_info_email",
+        "users_info",
+        ["email"],
+        unique=True,
+        postgresql_where=sa.text("deleted_at IS NULL"),
+    )
+    op.create_index(
+        "ix_users_info_deleted_at",
+        "users_info",
+        ["deleted_at"],
+        postgresql_where=sa.text("deleted_at IS NOT NULL"),
+    )
+    op.create_index(
+        "ix_contacts_user_id",
+        "contacts",
+        ["user_id"],
+        postgresql_where=sa.text("deleted_at IS NULL"),
+    )
+    op.create_index(
+        "ix_contacts_deleted_at",
+        "contacts",
+        ["deleted_at"],
+        postgresql_where=sa.text("deleted_at IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_contacts_deleted_at", table_name="contacts")
+    op.drop_index("ix_contacts_user_id", table_name="contacts")
+    op.drop_index("ix_users_info_deleted_at", table_name="users_info")
+    op.drop_index("ix_users_info_email", table_name="users_info")
+    # видалені рядки з повторюваним email не дадуть створити унікальний індекс
+    op.execute("DELETE FROM users_info WHERE deleted_at IS NOT NULL")
+    op.execute("DELETE FROM contacts WHERE deleted_at IS NOT NULL")
+    op.create_index("ix_users_info_email", "users_info", ["email"], unique=True)
+    op.drop_column("contacts", "deleted_at")
+    op.drop_column("users_info", "deleted_at")
@@ -0,0 +1,27 @@
+"""Contacts sync index
+
+Revision ID: c61d2a8e4f07
+Revises: a3e9f1c06b52
+Create Date: 2026-10-19 20:47:12.660381
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c61d2a8e4f07"
+down_revision: Union[str, None] = "a3e9f1c06b52"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_contacts_user_id_updated_at", "contacts", ["user_id", "updated_at"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_contacts_user_id_updated_at", table_name="contacts")
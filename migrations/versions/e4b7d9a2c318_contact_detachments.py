@@ -0,0 +1,43 @@
+"""Contact detachments
+
+Revision ID: e4b7d9a2c318
+Revises: c61d2a8e4f07
+Create Date: 2026-10-19 23:12:05.418277
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "e4b7d9a2c318"
+down_revision: Union[str, None] = "c61d2a8e4f07"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "contact_detachments",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("contact_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("detached_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_contact_detachments_user_id_detached_at",
+        "contact_detachments",
+        ["user_id", "detached_at"],
+    )
+    op.add_column("change_events", sa.Column("user_id", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("change_events", "user_id")
+    op.drop_index(
+        "ix_contact_detachments_user_id_detached_at", table_name="contact_detachments"
+    )
+    op.drop_table("contact_detachments")
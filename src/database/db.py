@@ -1,24 +1,389 @@
-from fastapi import HTTPException, status
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import itertools
+import logging
+import os
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from functools import wraps
+
+from fastapi import HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.pool import QueuePool
 
 from src.conf.config import settings
 
+logger = logging.getLogger(__name__)
 
 SQLALCHEMY_DATABASE_URL = settings.sqlalchemy_database_url
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+
+# функції, які отримують час очікування вільного з'єднання в пулі (секунди)
+pool_wait_observers: list = []
+# функції, які отримують пул після кожної видачі й повернення з'єднання
+pool_state_observers: list = []
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool that reports how long every checkout waited for a free connection
+    to the functions in pool_wait_observers (admission control, metrics),
+    and passes itself to the functions in pool_state_observers after every
+    checkout and checkin (metrics).
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            wait = time.perf_counter() - start
+            for observer in pool_wait_observers:
+                observer(wait)
+            for observer in pool_state_observers:
+                observer(self)
+
+    def _do_return_conn(self, record):
+        try:
+            super()._do_return_conn(record)
+        finally:
+            for observer in pool_state_observers:
+                observer(self)
+
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, poolclass=TimedQueuePool)
 
 # engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
 # "check_same_thread": False (тільки для SQLite!) дозволяє відкривати кілька з'єднань
 # з різних потоків до однієї бази даних.
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# репліки тільки для читання, через кому; порожньо - все йде в основну БД
+replica_engines = [
+    create_engine(url.strip(), poolclass=TimedQueuePool)
+    for url in settings.sqlalchemy_replica_urls.split(",")
+    if url.strip()
+]
+_replica_counter = itertools.count()
+
+
+class DBRoute:
+    """
+    Routing state of one HTTP request: whether its reads must go to the primary
+    (the client wrote recently) and whether the request wrote something itself.
+    """
+
+    def __init__(self, sticky: bool = False):
+        self.sticky = sticky
+        self.wrote = False
+
+
+# стан маршрутизації поточного HTTP-запиту (встановлюється middleware в main.py)
+db_route: ContextVar[DBRoute | None] = ContextVar("db_route", default=None)
+
+# True/False всередині функцій репозиторію, позначених reads_from_replica/reads_from_primary
+replica_reads: ContextVar[bool | None] = ContextVar("replica_reads", default=None)
+
+
+def route_reads(use_replica: bool):
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            if replica_reads.get() is not None:  # вирішує зовнішня функція
+                return await func(*args, **kwargs)
+            token = replica_reads.set(use_replica)
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                replica_reads.reset(token)
+
+        return wrapper
+
+    return decorator
+
+
+# SELECT-и read-only функції репозиторію можуть обслуговуватися реплікою
+reads_from_replica = route_reads(True)
+# функція читає, щоб потім записати - всі її читання (і вкладених функцій) з основної БД
+reads_from_primary = route_reads(False)
+
+
+def call_sync(func, *args, **kwargs):
+    """
+    The call_sync function runs a repository coroutine function in the current thread.
+    Their bodies only make blocking DB calls and never suspend, so the coroutine
+    finishes at its first step without an event loop.
+
+    :param func: Repository coroutine function
+    :param args: Arguments of the function
+    :param kwargs: Keyword arguments of the function
+    :return: The result of the function
+    :raises RuntimeError: If the function suspends on real async IO
+    """
+
+    coroutine = func(*args, **kwargs)
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+    coroutine.close()
+    raise RuntimeError(f"{func.__qualname__} suspended outside of an event loop")
+
+
+async def run_db_call(func, *args, **kwargs):
+    """
+    The run_db_call function runs a repository coroutine function in the thread pool,
+    so its blocking DB calls never stall the event loop of the worker.
+    The context (db_route, replica_reads) is copied into the thread.
+
+    :param func: Repository coroutine function
+    :param args: Arguments of the function
+    :param kwargs: Keyword arguments of the function
+    :return: The result of the function
+    """
+
+    return await run_in_threadpool(call_sync, func, *args, **kwargs)
+
+
+def choose_replica() -> Engine:
+    """
+    The choose_replica function picks the replica with the fewest checked out
+    connections; replicas with the same number take turns (round-robin).
+
+    :return: The engine of the replica
+    """
+
+    start = next(_replica_counter)
+    candidates = [
+        replica_engines[(start + i) % len(replica_engines)]
+        for i in range(len(replica_engines))
+    ]
+    return min(candidates, key=lambda db_engine: db_engine.pool.checkedout())
+
+
+def db_now(db: Session) -> datetime:
+    """
+    The db_now function returns the time by the DB clock as naive UTC,
+    the clock the func.now() timestamps of the rows are taken by.
+    Postgres returns it with a time zone, SQLite without one (already UTC).
+
+    :param db: Session: The database session
+    :return: Current time of the database
+    """
+
+    return to_naive_utc(db.scalar(select(func.now())))
+
+
+def to_naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+class RoutingSession(Session):
+    """
+    Session that sends SELECTs of reads_from_replica functions to a read replica.
+    Everything else goes to the primary. Once the session, or a recent request of
+    the same client, has written, all its reads go to the primary too
+    (read-your-writes). A session uses one replica for its whole lifetime.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        route = db_route.get()
+        if self._flushing or getattr(clause, "is_dml", False):
+            self.info["wrote"] = True
+            if route is not None:
+                route.wrote = True
+        elif (
+            replica_engines
+            and replica_reads.get()
+            and getattr(clause, "is_select", False)
+            and not self.info.get("wrote")
+            and not (route is not None and route.sticky)
+        ):
+            if "replica" not in self.info:
+                self.info["replica"] = choose_replica()
+            return self.info["replica"]
+        return super().get_bind(mapper, clause=clause, **kw)
+
+    def commit(self):
+        # у межах unit of work commit() репозиторіїв лише надсилає зміни в БД,
+        # транзакцію один раз фіксує UnitOfWorkRoute наприкінці запиту
+        if self.info.get("unit_of_work"):
+            self.flush()
+        else:
+            super().commit()
+
+
+SessionLocal = sessionmaker(
+    class_=RoutingSession, autocommit=False, autoflush=False, bind=engine
+)
+
+
+class QueryStats:
+    """
+    Statistics of the SQL statements executed while handling one request.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement = None
+
+    def add(self, statement: str, elapsed: float):
+        """
+        The add function registers one executed statement.
+
+        :param statement: str: SQL text of the statement
+        :param elapsed: float: Execution time in seconds
+        """
+
+        self.count += 1
+        self.total_time += elapsed
+        if elapsed > self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_statement = statement
+
+
+# статистика запитів поточного HTTP-запиту (встановлюється middleware в main.py)
+query_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def redact_parameters(parameters):
+    """
+    The redact_parameters function hides the values of statement parameters,
+    so passwords, tokens and emails never get into the logs.
+
+    :param parameters: Parameters passed to the DBAPI cursor
+    :return: The same structure with every value replaced by "?"
+    """
+
+    if isinstance(parameters, dict):
+        return {key: "?" for key in parameters}
+    if isinstance(parameters, (list, tuple)):
+        return [redact_parameters(item) for item in parameters]
+    return "?"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # час старту - у контексті виконання: запит, що впав, не лишає його в з'єднанні
+    if context is not None:
+        context.query_start_time = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "query_start_time", None)
+    if start is None:  # службові запити діалекту без контексту
+        return
+    elapsed = time.perf_counter() - start
+    stats = query_stats.get()
+    if stats is not None:
+        stats.add(statement, elapsed)
+    if elapsed * 1000 >= settings.slow_query_threshold_ms:
+        logger.warning(
+            "Slow query (%.1f ms): %s; parameters: %s",
+            elapsed * 1000,
+            statement,
+            redact_parameters(parameters),
+            extra={"db_time_ms": round(elapsed * 1000, 1), "statement": statement},
+        )
+
+
+def instrument_engine(db_engine: Engine):
+    """
+    The instrument_engine function attaches the query timing hooks to an engine.
+
+    :param db_engine: Engine: The engine to instrument
+    :return: The same engine
+    """
+
+    if not event.contains(db_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(db_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(db_engine, "after_cursor_execute", _after_cursor_execute)
+    return db_engine
+
+
+instrument_engine(engine)
+for replica_engine in replica_engines:
+    instrument_engine(replica_engine)
+
+
+def dispose_engine_after_fork():
+    """
+    The dispose_engine_after_fork function drops the connection pools inherited from
+    the parent process (gunicorn --preload, multiprocessing) without closing their
+    connections, so a forked worker never shares a DB connection with the parent.
+
+    :return: None
+    """
+
+    for db_engine in (engine, *replica_engines):
+        db_engine.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=dispose_engine_after_fork)
+
+
+def begin_unit_of_work(db: Session, request: Request):
+    """
+    The begin_unit_of_work function makes the session the unit of work of the request:
+    the whole request runs in one transaction, commit() calls of the repository
+    functions only flush, and UnitOfWorkRoute commits once before the response is sent.
+
+    :param db: Session: The session opened for the request
+    :param request: Request: The request
+    :return: None
+    """
+
+    db.info["unit_of_work"] = True
+    request.state.db = db
+
+
+def commit_unit_of_work(db: Session):
+    """
+    The commit_unit_of_work function commits the transaction of the request.
+
+    :param db: Session: The session of the request
+    :return: None
+    :raises HTTPException: 400 if the commit fails
+    """
+
+    db.info["unit_of_work"] = False
+    try:
+        db.commit()
+    except SQLAlchemyError as err:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(err))
+
+
+class UnitOfWorkRoute(APIRoute):
+    """
+    Route that commits the unit of work of the request after the endpoint returned
+    and before the response is sent. Exit code of dependencies with yield runs only
+    after the response, too late to report a failed commit to the client.
+    If the endpoint raises, nothing is committed and get_db rolls the transaction back.
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request):
+            response = await handler(request)
+            db = getattr(request.state, "db", None)
+            if db is not None and db.info.get("unit_of_work"):
+                commit_unit_of_work(db)
+            return response
+
+        return route_handler
 
 
 # Dependency
-def get_db():
+def get_db(request: Request):
     db = SessionLocal()
+    begin_unit_of_work(db, request)
     try:
         yield db
     except SQLAlchemyError as err:
@@ -1,5 +1,16 @@
-from sqlalchemy import Column, Integer, String, func, Table, DateTime, Date, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    func,
+    Table,
+    DateTime,
+    Date,
+    Boolean,
+    Index,
+    event,
+)
+from sqlalchemy.orm import Session, relationship, with_loader_criteria
 from sqlalchemy.sql.schema import ForeignKey
 
 # from sqlalchemy.sql.sqltypes import DateTime  #---?
@@ -24,7 +35,7 @@ class User(Base):
     name = Column(String(50), nullable=False, index=True)
     last_name = Column(String(50), nullable=False, index=True)
     day_of_born = Column(Date, nullable=False, index=True)
-    email = Column(String, nullable=False, unique=True, index=True)
+    email = Column(String, nullable=False)
     password = Column(String(350), nullable=False)
     description = Column(String(250), nullable=True)
     avatar = Column(String(255), nullable=True)
@@ -37,6 +48,25 @@ class User(Base):
     confirmed = Column(
         Boolean, default=False
     )  # визначає, чи був підтверджений email користувача
+    deleted_at = Column(DateTime, nullable=True)  # м'яке видалення
+
+    __table_args__ = (
+        # email унікальний тільки серед не видалених - його можна зареєструвати знову
+        Index(
+            "ix_users_info_email",
+            email,
+            unique=True,
+            postgresql_where=deleted_at.is_(None),
+            sqlite_where=deleted_at.is_(None),
+        ),
+        # для фонового очищення: індексуються тільки видалені рядки
+        Index(
+            "ix_users_info_deleted_at",
+            deleted_at,
+            postgresql_where=deleted_at.is_not(None),
+            sqlite_where=deleted_at.is_not(None),
+        ),
+    )
 
 
 class Contact(Base):
@@ -51,3 +81,97 @@ class Contact(Base):
     )  # автоматично створюватиметься
     user_id = Column("user_id", ForeignKey("users_info.id", ondelete="CASCADE"))
     user = relationship("User", backref="contacts")
+    deleted_at = Column(DateTime, nullable=True)  # м'яке видалення
+
+    __table_args__ = (
+        Index(
+            "ix_contacts_user_id",
+            user_id,
+            postgresql_where=deleted_at.is_(None),
+            sqlite_where=deleted_at.is_(None),
+        ),
+        # синхронізація контактів користувача (з видаленими - вони надсилаються як tombstones)
+        Index("ix_contacts_user_id_updated_at", user_id, updated_at),
+        Index(
+            "ix_contacts_deleted_at",
+            deleted_at,
+            postgresql_where=deleted_at.is_not(None),
+            sqlite_where=deleted_at.is_not(None),
+        ),
+    )
+
+
+class ContactDetachment(Base):
+    # tombstone для попереднього власника: контакт відв'язано, user_id вже інший
+    __tablename__ = "contact_detachments"
+    id = Column(Integer, primary_key=True)
+    contact_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, nullable=False)  # без FK - живе й після purge власника
+    detached_at = Column(DateTime, nullable=False, default=func.now())
+
+    __table_args__ = (
+        Index("ix_contact_detachments_user_id_detached_at", user_id, detached_at),
+    )
+
+
+class BirthdayDigest(Base):
+    # дата, на яку побудовано список найближчих днів народження
+    __tablename__ = "birthday_digests"
+    digest_date = Column(Date, primary_key=True)
+    refreshed_at = Column(DateTime, default=func.now())
+
+
+class BirthdayDigestEntry(Base):
+    __tablename__ = "birthday_digest_entries"
+    digest_date = Column(
+        Date,
+        ForeignKey("birthday_digests.digest_date", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    user_id = Column(
+        Integer, ForeignKey("users_info.id", ondelete="CASCADE"), primary_key=True
+    )
+
+
+class ChangeEvent(Base):
+    # outbox: подія пишеться в тій самій транзакції, що й зміна, яку вона описує
+    __tablename__ = "change_events"
+    id = Column(Integer, primary_key=True)
+    entity = Column(String(20), nullable=False)  # user | contact
+    entity_id = Column(Integer, nullable=False)
+    # created | updated | deleted | detached
+    action = Column(String(20), nullable=False)
+    # власник контакту, від якого його відв'язано (у detached) - потім його вже не знайти
+    user_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=func.now())
+    published_at = Column(DateTime, nullable=True)  # коли релей відправив у Redis
+
+    __table_args__ = (
+        # релей шукає тільки ще не відправлені події
+        Index(
+            "ix_change_events_unpublished",
+            id,
+            postgresql_where=published_at.is_(None),
+            sqlite_where=published_at.is_(None),
+        ),
+    )
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _exclude_deleted(execute_state):
+    # м'яко видалені користувачі й контакти не потрапляють у жоден ORM SELECT;
+    # execution_options(include_deleted=True) - для фонового очищення
+    if (
+        execute_state.is_select
+        and not execute_state.is_column_load
+        and not execute_state.is_relationship_load
+        and not execute_state.execution_options.get("include_deleted", False)
+    ):
+        execute_state.statement = execute_state.statement.options(
+            with_loader_criteria(
+                User, lambda cls: cls.deleted_at.is_(None), include_aliases=True
+            ),
+            with_loader_criteria(
+                Contact, lambda cls: cls.deleted_at.is_(None), include_aliases=True
+            ),
+        )
@@ -0,0 +1,66 @@
+import asyncio
+import inspect
+from functools import wraps
+
+from src.database.db import db_route, run_db_call
+from src.services.metrics import SINGLE_FLIGHT_CALLS
+
+# виклики, що виконуються зараз у цьому воркері: ключ -> задача з результатом
+_flights: dict[tuple, asyncio.Future] = {}
+
+
+def single_flight(func):
+    """
+    The single_flight decorator merges concurrent identical calls of a read-only
+    repository function in one worker into one DB call. The first call runs the
+    function once in the thread pool (run_db_call) with its caller's session, so
+    the event loop keeps serving requests; identical calls arriving meanwhile
+    await the same task on the event loop instead of running the same query.
+    Calls are identical when all their arguments except db are equal.
+    The session of the first call is used by the thread until the call finishes,
+    so one session must not be passed to concurrent calls.
+
+    The result is shared between requests, so it must be plain data (dicts),
+    never ORM objects, and callers must not modify it. A session that has written
+    does not take part: it must read its own uncommitted changes. Clients that
+    read from the primary (read-your-writes) are only merged with each other.
+
+    :param func: The repository function, with a db parameter
+    :return: The wrapped function
+    """
+
+    signature = inspect.signature(func)
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        arguments = signature.bind(*args, **kwargs).arguments
+        db = arguments["db"]
+        if db.info.get("wrote"):
+            return await run_db_call(func, *args, **kwargs)
+        route = db_route.get()
+        sticky = route is not None and route.sticky
+        key = (
+            func.__qualname__,
+            sticky,
+            *((name, value) for name, value in arguments.items() if name != "db"),
+        )
+        flight = _flights.get(key)
+        if flight is not None:
+            SINGLE_FLIGHT_CALLS.labels(func.__name__, "coalesced").inc()
+            # скасування одного з запитів не скасовує спільний виклик для решти
+            return await asyncio.shield(flight)
+
+        # контекст (маршрутизація читань запиту) копіюється в потік
+        flight = asyncio.ensure_future(run_db_call(func, *args, **kwargs))
+        _flights[key] = flight
+        flight.add_done_callback(lambda done: _flights.pop(key, None))
+        SINGLE_FLIGHT_CALLS.labels(func.__name__, "executed").inc()
+        try:
+            # скасування запиту не скасовує виклик, якого можуть чекати інші
+            return await asyncio.shield(flight)
+        except asyncio.CancelledError:
+            # потік ще працює з сесією запиту - її не можна закривати раніше
+            await asyncio.wait([flight])
+            raise
+
+    return wrapper
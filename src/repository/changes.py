@@ -0,0 +1,143 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+from src.database.db import db_now, reads_from_replica
+from src.database.models import ChangeEvent
+
+CHANGE_COLUMNS = (
+    ChangeEvent.id,
+    ChangeEvent.entity,
+    ChangeEvent.entity_id,
+    ChangeEvent.action,
+    ChangeEvent.created_at,
+)
+
+
+async def record_change(
+    entity: str, entity_id: int, action: str, db: Session, user_id: int | None = None
+) -> None:
+    """
+    The record_change function adds a change event to the outbox. It is committed
+    together with the change itself, so an event exists if and only if the change does.
+
+    :param entity: str: "user" or "contact"
+    :param entity_id: int: Id of the changed row
+    :param action: str: "created", "updated", "deleted" or "detached"
+    :param db: Session: Pass the database session to the function
+    :param user_id: int | None: Owner to notify if the row no longer points to them
+    :return: None
+    """
+
+    db.add(
+        ChangeEvent(entity=entity, entity_id=entity_id, action=action, user_id=user_id)
+    )
+    # після commit релей цього воркера надсилає подію одразу, не чекаючи опитування
+    db.info["changes_recorded"] = True
+
+
+@reads_from_replica
+async def get_changes_as_dicts(
+    since: int, limit: int, settle_seconds: float, db: Session
+) -> list[dict] | None:
+    """
+    The get_changes_as_dicts function returns the change events after the since cursor.
+    Events younger than settle_seconds (by the DB clock) are held back: the id and
+    created_at of an event are assigned when it is flushed, while the unit of work
+    commits at the end of the request, so a transaction that commits late can add
+    an event behind the cursor a client has already moved past. The window is
+    a heuristic, not a guarantee: it covers only transactions that commit within
+    settle_seconds of the flush, so settle_seconds has to stay above the duration
+    of the slowest write request.
+    Published events are purged after the retention period; once the event
+    of the cursor is gone, later events may be gone too, so the cursor is expired.
+
+    :param since: int: Id of the last event the client has seen
+    :param limit: int: Maximum number of events to return
+    :param settle_seconds: float: Minimum age of the returned events
+    :param db: Session: Pass the database session to the function
+    :return: Event dicts ordered by id, None if the since cursor has expired
+    """
+
+    if (
+        since
+        and db.scalar(select(ChangeEvent.id).where(ChangeEvent.id == since)) is None
+    ):
+        return None
+    settled = db_now(db) - timedelta(seconds=settle_seconds)
+    rows = db.execute(
+        select(*CHANGE_COLUMNS)
+        .where(ChangeEvent.id > since, ChangeEvent.created_at <= settled)
+        .order_by(ChangeEvent.id)
+        .limit(limit)
+    )
+    return [dict(row) for row in rows.mappings().all()]
+
+
+async def get_unpublished_changes(batch_size: int, db: Session) -> list[dict]:
+    """
+    The get_unpublished_changes function locks the oldest events not yet sent to Redis.
+    Rows locked by another relay are skipped, so several relays never send the same batch.
+
+    :param batch_size: int: Maximum number of events
+    :param db: Session: Pass the database session to the function
+    :return: Event dicts ordered by id
+    """
+
+    rows = db.execute(
+        select(*CHANGE_COLUMNS, ChangeEvent.user_id)
+        .where(ChangeEvent.published_at.is_(None))
+        .order_by(ChangeEvent.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    return [dict(row) for row in rows.mappings().all()]
+
+
+async def mark_changes_published(ids: list[int], db: Session) -> None:
+    """
+    The mark_changes_published function marks the events as sent and releases their locks.
+
+    :param ids: list[int]: Ids of the sent events
+    :param db: Session: Pass the database session to the function
+    :return: None
+    """
+
+    db.execute(
+        update(ChangeEvent)
+        .where(ChangeEvent.id.in_(ids))
+        .values(published_at=datetime.now())
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+async def purge_published_changes(
+    before: datetime, batch_size: int, db: Session
+) -> int:
+    """
+    The purge_published_changes function deletes one batch of events
+    published before the given time.
+
+    :param before: datetime: Events published before this time are deleted
+    :param batch_size: int: Maximum number of events deleted at once
+    :param db: Session: Pass the database session to the function
+    :return: Number of deleted events, 0 when there is nothing left to delete
+    """
+
+    ids = (
+        db.execute(
+            select(ChangeEvent.id)
+            .where(ChangeEvent.published_at < before)
+            .order_by(ChangeEvent.id)
+            .limit(batch_size)
+        )
+        .scalars()
+        .all()
+    )
+    if not ids:
+        return 0
+    db.execute(delete(ChangeEvent).where(ChangeEvent.id.in_(ids)))
+    db.commit()
+    return len(ids)
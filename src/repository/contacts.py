@@ -1,11 +1,16 @@
+from datetime import datetime
 from typing import Type
 
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from src.database.models import Contact, User
+from sqlalchemy import and_, delete, func, insert, null, select, tuple_, union_all
+from sqlalchemy import update
+from src.database.db import reads_from_replica
+from src.database.models import Contact, ContactDetachment, User, user_m2m_contact
+from src.repository.changes import record_change
 from src.schemas import ContactModel
 
 
+@reads_from_replica
 async def get_contacts(skip: int, limit: int, db: Session) -> list[Type[Contact]]:
     """
     The get_contacts function returns a list of contacts from the database.
@@ -20,6 +25,45 @@ async def get_contacts(skip: int, limit: int, db: Session) -> list[Type[Contact]
     return db.query(Contact).offset(skip).limit(limit).all()
 
 
+@reads_from_replica
+async def get_contacts_as_dicts(skip: int, limit: int, db: Session) -> list[dict]:
+    """
+    The get_contacts_as_dicts function returns the same contacts as get_contacts,
+    mapped directly from rows to dicts for fast serialization.
+
+    :param skip: int: Determine how many contacts to skip
+    :param limit: int: Limit the number of records returned
+    :param db: Session: Pass the database session to the function
+    :return: A list of contact dicts
+    """
+
+    rows = db.execute(
+        select(Contact.phone_number, Contact.id).offset(skip).limit(limit)
+    )
+    return [dict(row) for row in rows.mappings().all()]
+
+
+@reads_from_replica
+async def get_contacts_by_ids_as_dicts(
+    ids: list[int], db: Session
+) -> list[dict | None]:
+    """
+    The get_contacts_by_ids_as_dicts function fetches the contacts with the given ids
+    with one IN query.
+
+    :param ids: list[int]: Ids of the contacts, may contain duplicates
+    :param db: Session: Pass the database session to the function
+    :return: Contact dicts in the order of ids, None for the ids that were not found
+    """
+
+    rows = db.execute(
+        select(Contact.phone_number, Contact.id).where(Contact.id.in_(set(ids)))
+    )
+    contacts_by_id = {row["id"]: dict(row) for row in rows.mappings().all()}
+    return [contacts_by_id.get(contact_id) for contact_id in ids]
+
+
+@reads_from_replica
 async def get_contact(contact_id: int, db: Session) -> Type[Contact] | None:
     """
     The get_contact function returns a contact object from the database.
@@ -36,6 +80,64 @@ async def get_contact(contact_id: int, db: Session) -> Type[Contact] | None:
     return db.query(Contact).filter(Contact.id == contact_id).first()
 
 
+@reads_from_replica
+async def get_contact_changes(
+    user_id: int,
+    since: tuple[datetime, int] | None,
+    settled: datetime,
+    limit: int,
+    db: Session,
+) -> list[dict]:
+    """
+    The get_contact_changes function returns the contacts of a user changed after
+    the since position, deleted ones included as tombstones, in (updated_at, id) order.
+    Contacts taken away from the user (detach_contacts) are returned as deleted too.
+    It reads only the changed rows through the (user_id, updated_at) indexes.
+    Rows changed after settled are held back: updated_at is taken when
+    the transaction writes the row, but the unit of work commits at the end of
+    the request, so a late commit could land behind the client's position.
+    The settle window is a heuristic that covers transactions committing within it,
+    not a guarantee.
+
+    :param user_id: int: Id of the owner of the contacts
+    :param since: tuple[datetime, int] | None: (updated_at, id) of the last synced row, None for all
+    :param settled: datetime: Changes after this time (naive UTC, DB clock) are held back
+    :param limit: int: Maximum number of rows
+    :param db: Session: Pass the database session to the function
+    :return: {"id", "phone_number", "updated_at", "deleted_at"} dicts
+    """
+
+    changed = select(
+        Contact.id, Contact.phone_number, Contact.updated_at, Contact.deleted_at
+    ).where(Contact.user_id == user_id, Contact.updated_at <= settled)
+    if since is None:
+        # перша синхронізація: лише наявні контакти, без tombstones
+        changes = changed.where(Contact.deleted_at.is_(None)).subquery()
+    else:
+        detached = select(
+            ContactDetachment.contact_id.label("id"),
+            null().label("phone_number"),
+            ContactDetachment.detached_at.label("updated_at"),
+            ContactDetachment.detached_at.label("deleted_at"),
+        ).where(
+            ContactDetachment.user_id == user_id,
+            ContactDetachment.detached_at <= settled,
+            tuple_(ContactDetachment.detached_at, ContactDetachment.contact_id)
+            > tuple_(*since),
+        )
+        changes = union_all(
+            changed.where(tuple_(Contact.updated_at, Contact.id) > tuple_(*since)),
+            detached,
+        ).subquery()
+    stmt = (
+        select(changes)
+        .order_by(changes.c.updated_at, changes.c.id)
+        .limit(limit)
+        .execution_options(include_deleted=True)
+    )
+    return [dict(row) for row in db.execute(stmt).mappings().all()]
+
+
 async def create_contact(body: ContactModel, db: Session) -> Contact:
     """
     The create_contact function creates a new contact in the database.
@@ -48,6 +150,8 @@ async def create_contact(body: ContactModel, db: Session) -> Contact:
 
     contact = Contact(phone_number=body.phone_number)
     db.add(contact)
+    db.flush()  # id контакту потрібен для події
+    await record_change("contact", contact.id, "created", db)
     db.commit()
     db.refresh(contact)
     return contact
@@ -79,6 +183,7 @@ async def update_contact(
     )
     if contact:
         contact.phone_number = body.phone_number
+        await record_change("contact", contact.id, "updated", db)
         db.commit()
     return contact
 
@@ -105,6 +210,135 @@ async def remove_contact(contact_id: int, db: Session, user: User) -> Contact |
         .first()
     )
     if contact:
-        db.delete(contact)
+        # м'яке видалення: рядки прибирає фонове очищення (purge_deleted_contacts)
+        contact.deleted_at = func.now()
+        await record_change("contact", contact.id, "deleted", db)
         db.commit()
     return contact
+
+
+async def get_contact_owners(contact_ids: list[int], db: Session) -> dict[int, int]:
+    """
+    The get_contact_owners function returns the owners of the given contacts,
+    deleted contacts included. Contacts without an owner are left out.
+
+    :param contact_ids: list[int]: Ids of the contacts
+    :param db: Session: Pass the database session to the function
+    :return: Dict contact id -> user id
+    """
+
+    if not contact_ids:
+        return {}
+    rows = db.execute(
+        select(Contact.id, Contact.user_id)
+        .where(Contact.id.in_(contact_ids), Contact.user_id.is_not(None))
+        .execution_options(include_deleted=True)
+    )
+    return dict(rows.all())
+
+
+async def detach_contacts(condition, db: Session) -> None:
+    """
+    The detach_contacts function takes the live contacts matching the condition away
+    from their owners. The contact rows no longer point to the previous owners, so
+    every one of them gets a tombstone for contact sync and a detached change event
+    for the event streams. Soft-deleted contacts keep their owner: their deleted_at
+    is already the owner's tombstone. The caller commits the transaction.
+
+    :param condition: Filter of the contacts to detach
+    :param db: Session: Pass the database session to the function
+    :return: None
+    """
+
+    # м'яко видалені контакти власник уже отримав як tombstones
+    detached = db.execute(
+        select(Contact.id, Contact.user_id).where(
+            condition, Contact.user_id.is_not(None)
+        )
+    ).all()
+    if detached:
+        db.execute(
+            insert(ContactDetachment),
+            [
+                {"contact_id": contact_id, "user_id": owner_id}
+                for contact_id, owner_id in detached
+            ],
+        )
+        for contact_id, owner_id in detached:
+            await record_change("contact", contact_id, "detached", db, owner_id)
+    db.execute(
+        update(Contact)
+        .where(condition, Contact.deleted_at.is_(None))
+        .values(user_id=None)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def purge_contact_detachments(
+    before: datetime, batch_size: int, db: Session
+) -> int:
+    """
+    The purge_contact_detachments function deletes one batch of detachment tombstones
+    older than the given time, like purge_deleted_contacts does with deleted contacts.
+
+    :param before: datetime: Tombstones created before this time are deleted
+    :param batch_size: int: Maximum number of tombstones deleted at once
+    :param db: Session: Pass the database session to the function
+    :return: Number of deleted tombstones, 0 when there is nothing left to delete
+    """
+
+    ids = (
+        db.execute(
+            select(ContactDetachment.id)
+            .where(ContactDetachment.detached_at < before)
+            .order_by(ContactDetachment.id)
+            .limit(batch_size)
+        )
+        .scalars()
+        .all()
+    )
+    if not ids:
+        return 0
+    db.execute(
+        delete(ContactDetachment)
+        .where(ContactDetachment.id.in_(ids))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return len(ids)
+
+
+async def purge_deleted_contacts(before: datetime, batch_size: int, db: Session) -> int:
+    """
+    The purge_deleted_contacts function hard-deletes one batch of contacts
+    soft-deleted before the given time, together with their user_m2m_contact rows.
+
+    :param before: datetime: Contacts deleted before this time are purged
+    :param batch_size: int: Maximum number of contacts deleted at once
+    :param db: Session: Pass the database session to the function
+    :return: Number of purged contacts, 0 when there is nothing left to purge
+    """
+
+    contact_ids = (
+        db.execute(
+            select(Contact.id)
+            .where(Contact.deleted_at < before)
+            .order_by(Contact.id)
+            .limit(batch_size)
+            .execution_options(include_deleted=True)
+        )
+        .scalars()
+        .all()
+    )
+    if not contact_ids:
+        return 0
+    db.execute(
+        delete(user_m2m_contact).where(user_m2m_contact.c.contact_id.in_(contact_ids))
+    )
+    db.execute(
+        delete(Contact)
+        .where(Contact.id.in_(contact_ids))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return len(contact_ids)
@@ -1,15 +1,28 @@
-from libgravatar import Gravatar
 from typing import Type
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
 
-from sqlalchemy import func
-from sqlalchemy import and_
+from fastapi import HTTPException, status
+from sqlalchemy import delete, func, insert, literal, select, update
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from src.database.models import User, Contact
+from src.database.db import reads_from_primary, reads_from_replica
+from src.database.single_flight import single_flight
+from src.database.models import (
+    User,
+    Contact,
+    BirthdayDigest,
+    BirthdayDigestEntry,
+    user_m2m_contact,
+)
+from src.repository.changes import record_change
+from src.repository.contacts import detach_contacts
 from src.schemas import UserModel
+from src.services.avatars import avatar_provider
 
 
+@reads_from_replica
 async def get_users(skip: int, limit: int, db: Session) -> list[Type[User]]:
     """
     The get_users function returns a list of users from the database.
@@ -24,6 +37,105 @@ async def get_users(skip: int, limit: int, db: Session) -> list[Type[User]]:
     return db.query(User).offset(skip).limit(limit).all()
 
 
+# Колонки UserResponseGet - для списків без побудови ORM-об'єктів і валідації pydantic
+USER_RESPONSE_COLUMNS = (
+    User.id,
+    User.name,
+    User.last_name,
+    User.day_of_born,
+    User.email,
+    User.description,
+    User.password,
+    User.created_at,
+    User.updated_at,
+)
+
+
+async def users_with_contacts(stmt, db: Session) -> list[dict]:
+    """
+    The users_with_contacts function executes a select of user columns and maps the rows
+    straight to dicts shaped like UserResponseGet. Contacts of all the users are loaded
+    with one extra query instead of a lazy load per user.
+
+    :param stmt: Select: Select of USER_RESPONSE_COLUMNS
+    :param db: Session: Pass the database session to the function
+    :return: A list of user dicts with nested contact dicts
+    """
+
+    users = [dict(row) for row in db.execute(stmt).mappings().all()]
+    if not users:
+        return users
+    contacts = {user["id"]: [] for user in users}
+    user_contacts = db.execute(
+        select(Contact.phone_number, Contact.id, Contact.user_id).where(
+            Contact.user_id.in_(contacts)
+        )
+    )
+    for phone_number, contact_id, user_id in user_contacts.all():
+        contacts[user_id].append({"phone_number": phone_number, "id": contact_id})
+    for user in users:
+        user["contacts"] = contacts[user["id"]]
+    return users
+
+
+@reads_from_replica
+async def get_users_as_dicts(
+    skip: int, limit: int, db: Session, fields: list[str] | None = None
+) -> list[dict]:
+    """
+    The get_users_as_dicts function returns the same users as get_users,
+    mapped directly from rows to dicts for fast serialization.
+    With fields only the requested columns are selected (sparse fieldset),
+    and contacts are queried only if "contacts" is requested.
+
+    :param skip: int: Skip a number of records
+    :param limit: int: Limit the number of results returned
+    :param db: Session: Pass the database session to the function
+    :param fields: list[str] | None: Names of UserResponseGet fields to return, all if None
+    :return: A list of user dicts
+    """
+
+    if not fields:
+        return await users_with_contacts(
+            select(*USER_RESPONSE_COLUMNS).offset(skip).limit(limit), db
+        )
+
+    with_contacts = "contacts" in fields
+    columns = [
+        column
+        for column in USER_RESPONSE_COLUMNS
+        if column.key in fields or (with_contacts and column is User.id)
+    ]
+    stmt = select(*columns).offset(skip).limit(limit)
+    if not with_contacts:
+        return [dict(row) for row in db.execute(stmt).mappings().all()]
+
+    users = await users_with_contacts(stmt, db)
+    if "id" not in fields:
+        for user in users:
+            del user["id"]  # id потрібен тільки для вибірки контактів
+    return users
+
+
+@reads_from_replica
+async def get_users_by_ids_as_dicts(ids: list[int], db: Session) -> list[dict | None]:
+    """
+    The get_users_by_ids_as_dicts function fetches the users with the given ids
+    with one IN query (plus one query for their contacts).
+
+    :param ids: list[int]: Ids of the users, may contain duplicates
+    :param db: Session: Pass the database session to the function
+    :return: User dicts in the order of ids, None for the ids that were not found
+    """
+
+    users = await users_with_contacts(
+        select(*USER_RESPONSE_COLUMNS).where(User.id.in_(set(ids))), db
+    )
+    users_by_id = {user["id"]: user for user in users}
+    return [users_by_id.get(user_id) for user_id in ids]
+
+
+@reads_from_replica
 async def get_user(user_id: int, db: Session) -> Type[User] | None:
     """
     The get_user function takes in a user_id and db session, and returns the User object with that id.
@@ -60,13 +172,15 @@ async def remove_user(user_id: int, db: Session, user: User) -> User | None:
     :param user_id: int: Identify the user to be removed
     :param db: Session: Access the database
     :param user: User: Check if the user is an admin
-    :return: The user that was removed from the database, or none if no user was found
+    :return: The user that was marked as deleted, or none if no user was found
     :doc-author: Trelent
     """
 
     user = db.query(User).filter(and_(User.id == user_id, User.id == user.id)).first()
     if user:
-        db.delete(user)
+        # м'яке видалення: рядки прибирає фонове очищення (purge_deleted_users)
+        user.deleted_at = func.now()
+        await record_change("user", user.id, "deleted", db)
         db.commit()
     return user
 
@@ -81,26 +195,36 @@ async def update_user(
             body (UserModel): The updated data for the specified User.
 
     :param user_id: int: Identify the user to be updated
-    :param body: UserModel: Get the data from the request body
+    :param body: UserModel: Get the data from the request body (body.contacts replaces the user's contacts)
     :param db: Session: Access the database
     :param user: User: Get the user who is logged in
     :return: The updated user
+    :raises HTTPException: 404 if some of body.contacts are unknown or belong to another user
     :doc-author: Trelent
     """
 
     user = db.query(User).filter(and_(User.id == user_id, User.id == user.id)).first()
     if user:
-        phones = db.query(Contact).filter(Contact.id.in_(body.contacts)).all()
+        day_of_born_changed = user.day_of_born != body.day_of_born
         user.name = body.name
         user.last_name = body.last_name
         user.day_of_born = body.day_of_born
         user.email = body.email
         user.description = body.description
-        user.phones = phones
+        await attach_contacts(user.id, body.contacts, db)
+        await detach_contacts(
+            and_(Contact.user_id == user.id, Contact.id.not_in(body.contacts)), db
+        )
+        if day_of_born_changed:
+            db.flush()
+            await invalidate_birthday_digest(user.id, db)
+        await record_change("user", user.id, "updated", db)
         db.commit()
+        db.refresh(user)
     return user
 
 
+@reads_from_replica
 async def find_user_by_name(user_name: str, db: Session) -> Type[User] | None:
     """
     The find_user_by_name function takes in a user_name and db as parameters.
@@ -115,6 +239,7 @@ async def find_user_by_name(user_name: str, db: Session) -> Type[User] | None:
     return db.query(User).filter(User.name == user_name).first()
 
 
+@reads_from_replica
 async def find_user_by_last_name(user_last_name: str, db: Session) -> Type[User] | None:
     """
     The find_user_by_last_name function takes in a user's last name and returns the first user with that last name.
@@ -131,6 +256,7 @@ async def find_user_by_last_name(user_last_name: str, db: Session) -> Type[User]
     return db.query(User).filter(User.last_name == user_last_name).first()
 
 
+@reads_from_replica
 async def find_user_by_email(user_email: str, db: Session) -> Type[User] | None:
     """
     The find_user_by_email function takes in a user_email and db as parameters.
@@ -146,6 +272,25 @@ async def find_user_by_email(user_email: str, db: Session) -> Type[User] | None:
     return db.query(User).filter(User.email == user_email).first()
 
 
+@single_flight
+@reads_from_replica
+async def find_user_by_email_as_dict(user_email: str, db: Session) -> dict | None:
+    """
+    The find_user_by_email_as_dict function returns the same user as find_user_by_email,
+    mapped directly from rows to a dict. Concurrent lookups of the same email share one query.
+
+    :param user_email: str: Specify the email of the user we are looking for
+    :param db: Session: Pass the database session to the function
+    :return: A user dict, None if there is no such user
+    """
+
+    users = await users_with_contacts(
+        select(*USER_RESPONSE_COLUMNS).where(User.email == user_email), db
+    )
+    return users[0] if users else None
+
+
+@reads_from_replica
 async def find_next_7_days_birthdays(db: Session) -> list[Type[User]] | None:
     """
     The find_next_7_days_birthdays function finds all users who have birthdays in the next 7 days.
@@ -155,20 +300,256 @@ async def find_next_7_days_birthdays(db: Session) -> list[Type[User]] | None:
     :doc-author: Trelent
     """
 
-    today_date = date.today() + timedelta(days=1)
+    return db.query(User).filter(next_7_days_birthdays_filter(date.today())).all()
+
+
+def next_7_days_birthdays_filter(today: date):
+    """
+    The next_7_days_birthdays_filter function builds the condition of
+    find_next_7_days_birthdays for the given day.
+
+    :param today: date: The day the birthdays are counted from
+    :return: SQL condition on User.day_of_born
+    """
+
+    today_date = today + timedelta(days=1)
     seventh_day_date = today_date + timedelta(days=7)
     return (
-        db.query(User)
-        .filter(
-            (
-                func.date_part("month", User.day_of_born)
-                == today_date.month | seventh_day_date.month
+        (
+            func.date_part("month", User.day_of_born)
+            == today_date.month | seventh_day_date.month
+        )
+        & (func.date_part("day", User.day_of_born) >= today_date.day)
+        & (func.date_part("day", User.day_of_born) <= seventh_day_date.day)
+        # INSERT ... SELECT дайджесту не фільтрується автоматично
+        & User.deleted_at.is_(None)
+    )
+
+
+async def attach_contacts(user_id: int, contact_ids: list[int], db: Session) -> None:
+    """
+    The attach_contacts function assigns contacts to a user with a single UPDATE statement,
+    without loading Contact objects into the session.
+    Only free contacts or contacts already owned by the user can be attached.
+    If any id is unknown or belongs to another user, the transaction is rolled back
+    and HTTP 404 with the list of such ids is raised.
+
+    :param user_id: int: Id of the user that becomes the owner of the contacts
+    :param contact_ids: list[int]: Ids of the contacts to attach
+    :param db: Session: Pass the database session to the function
+    :return: None
+    """
+
+    if not contact_ids:
+        return
+    attached = (
+        db.execute(
+            update(Contact)
+            .where(
+                Contact.id.in_(contact_ids),
+                Contact.deleted_at.is_(None),
+                or_(Contact.user_id.is_(None), Contact.user_id == user_id),
             )
-            & (func.date_part("day", User.day_of_born) >= today_date.day)
-            & (func.date_part("day", User.day_of_born) <= seventh_day_date.day)
+            .values(user_id=user_id)
+            .returning(Contact.id)
+            .execution_options(synchronize_session=False)
         )
+        .scalars()
         .all()
     )
+    unknown_ids = sorted(set(contact_ids) - set(attached))
+    if unknown_ids:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Contacts not found: {', '.join(map(str, unknown_ids))}",
+        )
+
+
+@single_flight
+@reads_from_replica
+async def find_next_7_days_birthdays_as_dicts(db: Session) -> list[dict]:
+    """
+    The find_next_7_days_birthdays_as_dicts function returns the same users as
+    find_next_7_days_birthdays, mapped directly from rows to dicts for fast serialization.
+
+    :param db: Session: Pass the database session to the function
+    :return: A list of user dicts
+    """
+
+    return await users_with_contacts(
+        select(*USER_RESPONSE_COLUMNS).where(
+            next_7_days_birthdays_filter(date.today())
+        ),
+        db,
+    )
+
+
+async def refresh_birthday_digest(db: Session, today: date | None = None) -> int:
+    """
+    The refresh_birthday_digest function materializes the users with birthdays
+    in the next 7 days for the given day, so the endpoint reads k rows instead of
+    scanning users_info on every request. Digests of previous days are removed.
+
+    :param db: Session: Pass the database session to the function
+    :param today: date | None: The day of the digest, today if not set
+    :return: Number of users in the digest
+    """
+
+    today = today or date.today()
+    db.execute(
+        delete(BirthdayDigestEntry).where(BirthdayDigestEntry.digest_date <= today)
+    )
+    db.execute(delete(BirthdayDigest).where(BirthdayDigest.digest_date <= today))
+    db.add(BirthdayDigest(digest_date=today))
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()  # дайджест уже побудував інший процес
+        return 0
+    count = db.execute(
+        insert(BirthdayDigestEntry).from_select(
+            ["digest_date", "user_id"],
+            select(literal(today, BirthdayDigestEntry.digest_date.type), User.id).where(
+                next_7_days_birthdays_filter(today)
+            ),
+        )
+    ).rowcount
+    db.commit()
+    return count
+
+
+@single_flight
+@reads_from_replica
+async def get_birthday_digest_as_dicts(db: Session) -> list[dict]:
+    """
+    The get_birthday_digest_as_dicts function returns the same users as
+    find_next_7_days_birthdays_as_dicts from today's digest. The digest is built
+    only by refresh_birthday_digest; until today's digest exists (or reaches
+    the replica) the users are selected without it.
+
+    :param db: Session: Pass the database session to the function
+    :return: A list of user dicts
+    """
+
+    today = date.today()
+    query = select(*USER_RESPONSE_COLUMNS)
+    if db.get(BirthdayDigest, today) is None:
+        query = query.where(next_7_days_birthdays_filter(today))
+    else:
+        query = query.join(
+            BirthdayDigestEntry,
+            and_(
+                BirthdayDigestEntry.user_id == User.id,
+                BirthdayDigestEntry.digest_date == today,
+            ),
+        )
+    return await users_with_contacts(query, db)
+
+
+async def invalidate_birthday_digest(user_id: int, db: Session) -> None:
+    """
+    The invalidate_birthday_digest function re-evaluates one user in today's digest
+    after the user was created or their day_of_born has changed.
+    The caller commits the transaction.
+
+    :param user_id: int: Id of the created or changed user
+    :param db: Session: Pass the database session to the function
+    :return: None
+    """
+
+    today = date.today()
+    db.execute(
+        delete(BirthdayDigestEntry).where(
+            BirthdayDigestEntry.digest_date == today,
+            BirthdayDigestEntry.user_id == user_id,
+        )
+    )
+    db.execute(
+        insert(BirthdayDigestEntry).from_select(
+            ["digest_date", "user_id"],
+            select(BirthdayDigest.digest_date, User.id)
+            .join(
+                User, User.id == user_id
+            )  # рядок є, тільки якщо дайджест уже побудовано
+            .where(
+                BirthdayDigest.digest_date == today,
+                next_7_days_birthdays_filter(today),
+            ),
+        )
+    )
+
+
+async def purge_deleted_users(before: datetime, batch_size: int, db: Session) -> int:
+    """
+    The purge_deleted_users function hard-deletes one batch of users soft-deleted
+    before the given time. Their contacts, soft-deleted ones included, are detached
+    (as the ORM delete used to do) and their rows in user_m2m_contact and
+    the birthday digest are removed. The purged users never sync again, so
+    no detachment tombstones or change events are written for them.
+
+    :param before: datetime: Users deleted before this time are purged
+    :param batch_size: int: Maximum number of users deleted at once
+    :param db: Session: Pass the database session to the function
+    :return: Number of purged users, 0 when there is nothing left to purge
+    """
+
+    user_ids = (
+        db.execute(
+            select(User.id)
+            .where(User.deleted_at < before)
+            .order_by(User.id)
+            .limit(batch_size)
+            .execution_options(include_deleted=True)
+        )
+        .scalars()
+        .all()
+    )
+    if not user_ids:
+        return 0
+    db.execute(
+        update(Contact)
+        .where(Contact.user_id.in_(user_ids))
+        .values(user_id=None)
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(delete(user_m2m_contact).where(user_m2m_contact.c.user_id.in_(user_ids)))
+    db.execute(
+        delete(BirthdayDigestEntry).where(BirthdayDigestEntry.user_id.in_(user_ids))
+    )
+    db.execute(
+        delete(User)
+        .where(User.id.in_(user_ids))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return len(user_ids)
+
+
+async def stream_confirmed_users(db: Session, chunk_size: int = 1000):
+    """
+    The stream_confirmed_users function yields confirmed users in chunks
+    with keyset pagination by id, so a run over many users neither loads them all
+    nor keeps a cursor open while the chunk is processed.
+
+    :param db: Session: Pass the database session to the function
+    :param chunk_size: int: Number of users in one chunk
+    :return: Async iterator of lists of {"id", "name", "email"} dicts
+    """
+
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(User.id, User.name, User.email)
+            .where(User.confirmed.is_(True), User.id > last_id)
+            .order_by(User.id)
+            .limit(chunk_size)
+        )
+        chunk = [dict(row) for row in rows.mappings().all()]
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1]["id"]
 
 
 # -------------------Авторизаційні функції-----------------
@@ -179,16 +560,12 @@ async def create_user(body: UserModel, db: Session) -> User:
     :param body: UserModel: Get the data from the request body
     :param db: Session: Access the database
     :return: The created user
+    :raises HTTPException: 404 if some of body.contacts are unknown or belong to another user
     :doc-author: Trelent
     """
 
-    contacts = db.query(Contact).filter(Contact.id.in_(body.contacts)).all()
-    avatar = None  # надамо автоматичну аватарку користувачу через Gravatar
-    try:
-        g = Gravatar(body.email)
-        avatar = g.get_image()
-    except Exception as e:
-        print(e)
+    # автоматична аватарка через Gravatar: URL рахується локально, без мережі
+    avatar = avatar_provider.url(body.email)
     new_user = User(
         name=body.name,
         last_name=body.last_name,
@@ -196,10 +573,14 @@ async def create_user(body: UserModel, db: Session) -> User:
         email=body.email,
         description=body.description,
         password=body.password,
-        contacts=contacts,
         avatar=avatar,
     )
     db.add(new_user)
+    db.flush()  # отримуємо id нового юзера для прив'язки контактів
+    await attach_contacts(new_user.id, body.contacts, db)
+    # день народження може потрапляти у вже побудований дайджест
+    await invalidate_birthday_digest(new_user.id, db)
+    await record_change("user", new_user.id, "created", db)
     db.commit()
     db.refresh(new_user)
     return new_user
@@ -220,6 +601,7 @@ async def update_token(user: User, refresh_token, db: Session):
     db.commit()
 
 
+@reads_from_primary
 async def update_avatar(email, url: str, db: Session) -> User:
     """
     The update_avatar function updates the avatar of a user in the database.
@@ -237,7 +619,29 @@ async def update_avatar(email, url: str, db: Session) -> User:
     return user
 
 
+async def replace_avatar(email: str, old_url: str, url: str, db: Session) -> bool:
+    """
+    The replace_avatar function changes the avatar of a user only if it is still old_url,
+    so an avatar uploaded in the meantime is never overwritten.
+
+    :param email: str: Find the user in the database
+    :param old_url: str: The avatar that may be replaced
+    :param url: str: The new avatar
+    :param db: Session: Pass the database session into the function
+    :return: True if the avatar was replaced
+    """
+
+    result = db.execute(
+        update(User)
+        .where(User.email == email, User.avatar == old_url)
+        .values(avatar=url)
+    )
+    db.commit()
+    return result.rowcount > 0
+
+
 # ---------Верифікація-----------
+@reads_from_primary
 async def confirmed_email(email: str, db: Session) -> None:
     """
     The confirmed_email function confirms the email of a user.
@@ -14,13 +14,15 @@ from fastapi.security import (
 )
 from sqlalchemy.orm import Session
 
-from src.database.db import get_db
+from src.database.db import UnitOfWorkRoute, get_db
 from src.schemas import UserModel, TokenModel, RequestEmail, UserResponse
 from src.repository import users as repository_users
+from src.conf.config import settings
 from src.services.auth import auth_service
+from src.services.avatars import verify_avatar
 from src.services.email import send_email
 
-router = APIRouter(prefix="/auth", tags=["auth"])
+router = APIRouter(prefix="/auth", tags=["auth"], route_class=UnitOfWorkRoute)
 security = HTTPBearer()
 
 
@@ -55,6 +57,10 @@ async def signup(
     background_tasks.add_task(
         send_email, new_user.email, new_user.name, str(request.base_url)
     )
+    http_client = getattr(request.app.state, "http_client", None)
+    if settings.avatar_check_enabled and http_client is not None:
+        # перевірка Gravatar - вже після відповіді, реєстрація її не чекає
+        background_tasks.add_task(verify_avatar, new_user.email, http_client)
     return {
         "user": new_user,
         "detail": "User successfully created. Check your email for confirmation.",
@@ -0,0 +1,135 @@
+import asyncio
+import logging
+from typing import List
+
+import orjson
+from fastapi import APIRouter, Request
+from fastapi.responses import ORJSONResponse
+
+from src.database.db import UnitOfWorkRoute
+from src.schemas import BatchRequest, BatchRequestItem, BatchResponseItem
+from src.services.auth import shared_users
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["batch"], route_class=UnitOfWorkRoute)
+
+
+def sub_request_scope(request: Request, item: BatchRequestItem, headers: dict) -> dict:
+    path, _, query = item.path.partition("?")
+    return {
+        "type": "http",
+        "asgi": request.scope.get("asgi", {"version": "3.0"}),
+        "http_version": request.scope.get("http_version", "1.1"),
+        "method": item.method,
+        "scheme": request.url.scheme,
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode("latin-1"),
+        "root_path": request.scope.get("root_path", ""),
+        "headers": [
+            (name.encode("latin-1"), value.encode("latin-1"))
+            for name, value in headers.items()
+        ],
+        "client": request.scope.get("client"),
+        "server": request.scope.get("server"),
+    }
+
+
+async def dispatch(request: Request, item: BatchRequestItem) -> dict:
+    """
+    The dispatch function runs one sub-request through the application in-process,
+    with the same middleware, dependencies and exception handlers as a real request.
+
+    :param request: Request: The batch request
+    :param item: BatchRequestItem: The sub-request
+    :return: Status, headers and decoded body of the sub-response
+    """
+
+    if item.path.partition("?")[0].rstrip("/") == "/api/batch":
+        return {
+            "status": 400,
+            "headers": {},
+            "body": {"detail": "Nested batch requests are not allowed"},
+        }
+
+    headers = {name.lower(): value for name, value in item.headers.items()}
+    if "authorization" not in headers and "authorization" in request.headers:
+        headers["authorization"] = request.headers["authorization"]
+    body = b""
+    if item.body is not None:
+        body = orjson.dumps(item.body)
+        headers.setdefault("content-type", "application/json")
+    headers["content-length"] = str(len(body))
+
+    request_sent = False
+    response_complete = asyncio.Event()
+    response = {"status": 500, "headers": {}}
+    chunks = []
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # як у справжнього клієнта: disconnect тільки після отримання відповіді
+        await response_complete.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {
+                name.decode("latin-1"): value.decode("latin-1")
+                for name, value in message.get("headers", [])
+                if name.lower() != b"content-length"
+            }
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                response_complete.set()
+
+    try:
+        await request.app(sub_request_scope(request, item, headers), receive, send)
+    except Exception:
+        logger.exception("Batch sub-request %s %s failed", item.method, item.path)
+        return {
+            "status": 500,
+            "headers": {},
+            "body": {"detail": "Internal Server Error"},
+        }
+    finally:
+        response_complete.set()
+
+    content = b"".join(chunks)
+    if not content:
+        response["body"] = None
+    elif response["headers"].get("content-type", "").startswith("application/json"):
+        response["body"] = orjson.loads(content)
+    else:
+        response["body"] = content.decode("utf-8", errors="replace")
+    return response
+
+
+@router.post("/batch", response_model=List[BatchResponseItem])
+async def batch(body: BatchRequest, request: Request):
+    """
+    The batch function runs up to 20 API calls in one HTTP round trip.
+    Sub-requests are dispatched one after another in-process, each with its own
+    DB session and transaction, like separate requests; every access token
+    is authenticated only once. The Authorization header of the batch request
+    is used by sub-requests without their own.
+
+    :param body: BatchRequest: The sub-requests
+    :param request: Request: The batch request
+    :return: The sub-responses in the order of the sub-requests
+    """
+
+    # по черзі: запити до БД все одно виконуються в циклі подій, а одночасні
+    # підзапити тримали б до 20 з'єднань пулу до кінця своїх транзакцій
+    users_token = shared_users.set({})
+    try:
+        responses = [await dispatch(request, item) for item in body.requests]
+    finally:
+        shared_users.reset(users_token)
+    return ORJSONResponse(responses)
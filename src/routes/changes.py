@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.orm import Session
+
+from src.conf.config import settings
+from src.database.db import UnitOfWorkRoute, get_db
+from src.database.models import User
+from src.repository import changes as repository_changes
+from src.schemas import ChangesPage
+from src.services.auth import auth_service
+
+router = APIRouter(prefix="/changes", tags=["changes"], route_class=UnitOfWorkRoute)
+
+
+@router.get("/", response_model=ChangesPage)
+async def get_changes(
+    since: int = Query(0, ge=0, description="Id of the last change already seen"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(auth_service.get_current_user),
+):
+    """
+    The get_changes function returns the changes of users and contacts after
+    the since cursor, so a client syncs incrementally instead of re-reading all users.
+    The client passes the returned next as since of its following request;
+    an empty page means it is up to date. 410 means the events after since
+    may have been purged, so the client has to sync again from 0.
+
+    :param since: int: Id of the last change the client has seen, 0 for all
+    :param limit: int: Maximum number of changes returned
+    :param db: Session: Get the database session
+    :param current_user: User: Get the current user
+    :return: The changes and the next cursor
+    """
+
+    changes = await repository_changes.get_changes_as_dicts(
+        since, limit, settings.changes_settle_seconds, db
+    )
+    if changes is None:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Change cursor expired, sync again without since",
+        )
+    return ORJSONResponse(
+        {"changes": changes, "next": changes[-1]["id"] if changes else since}
+    )
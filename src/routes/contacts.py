@@ -1,16 +1,27 @@
-from typing import List
+from datetime import timedelta
+from typing import List, Union
 
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from fastapi_limiter.depends import RateLimiter  # для обмеження кількості запитів
 
-from src.database.db import get_db
+from src.database.db import UnitOfWorkRoute, db_now, get_db
 from src.database.models import User
-from src.schemas import ContactModel, ContactResponse
+from src.conf.config import settings
+from src.schemas import (
+    BatchNotFound,
+    ContactModel,
+    ContactResponse,
+    ContactSyncResponse,
+)
 from src.repository import contacts as repository_contacts
 from src.services.auth import auth_service
+from src.services.batch import batch_ids, with_not_found
+from src.services.contact_events import contact_event_stream
+from src.services.sync import SyncToken, encode_sync_token, sync_token
 
-router = APIRouter(prefix="/contacts", tags=["contacts"])
+router = APIRouter(prefix="/contacts", tags=["contacts"], route_class=UnitOfWorkRoute)
 
 
 # dependencies=[Depends(RateLimiter(times=2, seconds=5))] - обмеження кількості запитів
@@ -38,8 +49,126 @@ async def get_contacts(
     :doc-author: Trelent
     """
 
-    contacts = await repository_contacts.get_contacts(skip, limit, db)
-    return contacts
+    # рядки БД серіалізуються напряму, без ORM-об'єктів і валідації response_model
+    contacts = await repository_contacts.get_contacts_as_dicts(skip, limit, db)
+    return ORJSONResponse(contacts)
+
+
+@router.get(
+    "/sync",
+    response_model=ContactSyncResponse,
+    description="No more than 2 requests per 5 seconds",
+    dependencies=[Depends(RateLimiter(times=2, seconds=5))],
+)
+async def sync_contacts(
+    since: SyncToken | None = Depends(sync_token),
+    limit: int = Query(500, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(auth_service.get_current_user),
+):
+    """
+    The sync_contacts function returns the changes of the current user's contacts
+    since the previous sync: created or updated contacts and the ids of deleted ones.
+    The client stores next and passes it as since of the following sync;
+    while has_more is true it asks for the next page right away.
+
+    :param since: SyncToken | None: Decoded since token, None for the first sync
+    :param limit: int: Maximum number of changes returned
+    :param db: Session: Get the database session
+    :param current_user: User: Get the current user
+    :return: The changed contacts, the deleted ids and the next token
+    """
+
+    # токен і рядки порівнюються за одним годинником - часом БД
+    now = db_now(db)
+    # tombstones живуть до фонового очищення - старіший токен міг пропустити видалення
+    if since is not None and since.synced_until < now - timedelta(
+        days=settings.purge_retention_days
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Sync token expired, sync again without since",
+        )
+    settled = now - timedelta(seconds=settings.changes_settle_seconds)
+    rows = await repository_contacts.get_contact_changes(
+        current_user.id, since and since.position, settled, limit, db
+    )
+    has_more = len(rows) == limit
+    position = (
+        (rows[-1]["updated_at"], rows[-1]["id"]) if rows else since and since.position
+    )
+    # без наступної сторінки клієнт має всі зміни до settled, навіть якщо їх не було
+    synced_until = rows[-1]["updated_at"] if has_more else settled
+    return ORJSONResponse(
+        {
+            "contacts": [
+                {"id": row["id"], "phone_number": row["phone_number"]}
+                for row in rows
+                if row["deleted_at"] is None
+            ],
+            "deleted": [row["id"] for row in rows if row["deleted_at"] is not None],
+            "next": position and encode_sync_token(synced_until, *position),
+            "has_more": has_more,
+        }
+    )
+
+
+@router.get(
+    "/events",
+    response_class=StreamingResponse,
+    description="Server-sent events, no more than 2 connections per 5 seconds",
+    dependencies=[Depends(RateLimiter(times=2, seconds=5))],
+)
+async def contact_events(
+    request: Request,
+    current_user: User = Depends(auth_service.get_current_user),
+):
+    """
+    The contact_events function streams notifications about changes of the current
+    user's contacts as server-sent events: ready once subscribed, contact
+    ({"id", "contact_id", "action"}) for every change and resync when notifications
+    were lost. The client fetches the changes themselves with GET /contacts/sync.
+
+    :param request: Request: The request, to reach the hub of the worker
+    :param current_user: User: Get the current user
+    :return: The event stream
+    """
+
+    # сесія БД звільняє з'єднання після commit unit of work, ще до початку потоку
+    return StreamingResponse(
+        contact_event_stream(
+            request.app.state.contact_changes,
+            current_user.id,
+            settings.contact_events_keepalive,
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get(
+    "/batch",
+    response_model=List[Union[ContactResponse, BatchNotFound]],
+    description="No more than 2 requests per 5 seconds",
+    dependencies=[Depends(RateLimiter(times=2, seconds=5))],
+)
+async def get_contacts_batch(
+    ids: list[int] = Depends(batch_ids),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(auth_service.get_current_user),
+):
+    """
+    The get_contacts_batch function returns the contacts with the given ids in one request.
+    Contacts that do not exist are returned as {"id": ..., "detail": "Contact not found"}.
+
+    :param ids: list[int]: Ids from the comma-separated ids query parameter
+    :param db: Session: Get the database session
+    :param current_user: User: Get the user id from the jwt token
+    :return: A list of contacts and not-found markers in the order of ids
+    """
+
+    contacts = await repository_contacts.get_contacts_by_ids_as_dicts(ids, db)
+    return ORJSONResponse(with_not_found(ids, contacts, "Contact not found"))
 
 
 @router.get(
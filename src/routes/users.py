@@ -1,20 +1,20 @@
-from typing import List
+from typing import List, Union
 
 from fastapi_limiter.depends import RateLimiter  # для обмеження кількості запитів
 
-from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, File
+from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, File, Query
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
-import cloudinary
-import cloudinary.uploader
 
-from src.database.db import get_db
+from src.database.db import UnitOfWorkRoute, get_db
 from src.database.models import User
-from src.schemas import UserModel, UserResponse, UserResponseGet
+from src.schemas import BatchNotFound, UserModel, UserResponse, UserResponseGet
 from src.repository import users as repository_users
 from src.services.auth import auth_service
+from src.services.batch import batch_ids, with_not_found
 from src.conf.config import settings
 
-router = APIRouter(prefix="/users", tags=["users"])
+router = APIRouter(prefix="/users", tags=["users"], route_class=UnitOfWorkRoute)
 
 
 @router.get(
@@ -26,6 +26,10 @@ router = APIRouter(prefix="/users", tags=["users"])
 async def get_users(
     skip: int = 0,
     limit: int = 100,
+    fields: str | None = Query(
+        None,
+        description="Comma-separated fields to return, e.g. id,name,email",
+    ),
     db: Session = Depends(get_db),
     current_user: User = Depends(auth_service.get_current_user),
 ):
@@ -34,6 +38,7 @@ async def get_users(
 
     :param skip: int: Skip the first n number of users
     :param limit: int: Limit the number of users returned
+    :param fields: str | None: Comma-separated UserResponseGet fields to return (all if not set)
     :param db: Session: Get the database session
     :param current_user: User: Get the current user
     :param : Get the current user
@@ -41,8 +46,43 @@ async def get_users(
     :doc-author: Trelent
     """
 
-    users = await repository_users.get_users(skip, limit, db)
-    return users
+    selected = None
+    if fields:
+        selected = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = sorted(set(selected) - set(UserResponseGet.model_fields))
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Unknown fields: {', '.join(unknown)}",
+            )
+    # рядки БД серіалізуються напряму, без ORM-об'єктів і валідації response_model
+    users = await repository_users.get_users_as_dicts(skip, limit, db, selected)
+    return ORJSONResponse(users)
+
+
+@router.get(
+    "/batch",
+    response_model=List[Union[UserResponseGet, BatchNotFound]],
+    description="No more than 2 requests per 5 seconds",
+    dependencies=[Depends(RateLimiter(times=2, seconds=5))],
+)
+async def get_users_batch(
+    ids: list[int] = Depends(batch_ids),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(auth_service.get_current_user),
+):
+    """
+    The get_users_batch function returns the users with the given ids in one request.
+    Users that do not exist are returned as {"id": ..., "detail": "User not found"}.
+
+    :param ids: list[int]: Ids from the comma-separated ids query parameter
+    :param db: Session: Get the database session
+    :param current_user: User: Get the current user
+    :return: A list of users and not-found markers in the order of ids
+    """
+
+    users = await repository_users.get_users_by_ids_as_dicts(ids, db)
+    return ORJSONResponse(with_not_found(ids, users, "User not found"))
 
 
 @router.get(
@@ -235,12 +275,13 @@ async def find_user_by_email(
     """
 
     if user_email:
-        user = await repository_users.find_user_by_email(user_email, db)
+        # однакові одночасні запити одного email обслуговуються одним запитом до БД
+        user = await repository_users.find_user_by_email_as_dict(user_email, db)
         if user is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
             )
-        return user
+        return ORJSONResponse(user)
 
 
 @router.get(
@@ -264,12 +305,13 @@ async def find_next_7_days_birthdays(
     :doc-author: Trelent
     """
 
-    user = await repository_users.find_next_7_days_birthdays(db)
+    # готовий список на сьогодні замість сканування users_info на кожен запит
+    user = await repository_users.get_birthday_digest_as_dicts(db)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="No birthdays in next 7 days"
         )
-    return user
+    return ORJSONResponse(user)
 
 
 # --------------------оновлення аватара користувача
@@ -307,6 +349,10 @@ async def update_avatar_user(
     :doc-author: Trelent
     """
 
+    # cloudinary імпортується тільки тут - він не потрібен для старту застосунку
+    import cloudinary
+    import cloudinary.uploader
+
     cloudinary.config(
         cloud_name=settings.cloudinary_name,
         api_key=settings.cloudinary_api_key,
@@ -1,6 +1,6 @@
 from datetime import datetime, date
-from typing import List
-from pydantic import BaseModel, Field, EmailStr
+from typing import Any, Dict, List, Literal
+from pydantic import BaseModel, ConfigDict, Field, EmailStr
 
 
 class ContactModel(BaseModel):
@@ -8,10 +8,11 @@ class ContactModel(BaseModel):
 
 
 class ContactResponse(ContactModel):
-    id: int
+    model_config = ConfigDict(
+        from_attributes=True
+    )  # вказуємо, що дані повертаються з БД
 
-    class Config:
-        orm_mode = True  # вказуємо, що дані повертаються з БД
+    id: int
 
 
 class UserBase(BaseModel):
@@ -28,6 +29,8 @@ class UserModel(UserBase):
 
 
 class UserResponseGet(UserBase):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     name: str
     last_name: str
@@ -36,20 +39,21 @@ class UserResponseGet(UserBase):
     updated_at: datetime
     contacts: List[ContactResponse]
 
-    class Config:
-        orm_mode = True
+
+class BatchNotFound(BaseModel):
+    id: int
+    detail: str
 
 
 class UserDb(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     name: str
     email: str
     created_at: datetime
     avatar: str
 
-    class Config:
-        orm_mode = True
-
 
 class UserResponse(BaseModel):
     user: UserDb
@@ -64,3 +68,40 @@ class TokenModel(BaseModel):
 
 class RequestEmail(BaseModel):
     email: EmailStr
+
+
+class BatchRequestItem(BaseModel):
+    method: Literal["GET", "POST", "PUT", "PATCH", "DELETE"] = "GET"
+    path: str = Field(pattern=r"^/api/")
+    headers: Dict[str, str] = {}
+    body: Any = None
+
+
+class BatchRequest(BaseModel):
+    requests: List[BatchRequestItem] = Field(min_length=1, max_length=20)
+
+
+class BatchResponseItem(BaseModel):
+    status: int
+    headers: Dict[str, str]
+    body: Any = None
+
+
+class ChangeResponse(BaseModel):
+    id: int
+    entity: Literal["user", "contact"]
+    entity_id: int
+    action: Literal["created", "updated", "deleted", "detached"]
+    created_at: datetime
+
+
+class ChangesPage(BaseModel):
+    changes: List[ChangeResponse]
+    next: int  # курсор для наступного запиту (since)
+
+
+class ContactSyncResponse(BaseModel):
+    contacts: List[ContactResponse]  # створені або змінені з часу since
+    deleted: List[int]  # id видалених контактів (tombstones)
+    next: str | None  # since для наступної синхронізації
+    has_more: bool  # True - є ще зміни, треба одразу запитати наступну сторінку
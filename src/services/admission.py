@@ -0,0 +1,198 @@
+import asyncio
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.database.db import pool_wait_observers
+from src.services.metrics import ADMISSION_QUEUE_WAIT, REQUESTS_SHED
+
+CRITICAL = "critical"
+NORMAL = "normal"
+BULK = "bulk"
+
+# True у запиті, що вже має слот (підзапити /api/batch не займають ще один)
+admitted: ContextVar[bool] = ContextVar("admitted", default=False)
+
+
+class DelayWindow:
+    """
+    Standing queue detector of CoDel: the minimum delay observed during the last
+    full interval. A queue that drains from time to time has a minimum near zero;
+    a minimum above the target means the queue never drained for a whole interval.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.window_start = time.monotonic()
+        self.current_min: float | None = None
+        self.last_min = 0.0
+
+    def observe(self, delay: float):
+        self._roll()
+        if self.current_min is None or delay < self.current_min:
+            self.current_min = delay
+
+    def above(self, target: float) -> bool:
+        self._roll()
+        return self.last_min > target
+
+    def _roll(self):
+        now = time.monotonic()
+        if now - self.window_start >= self.interval:
+            # без спостережень за весь останній інтервал - черги не було
+            if self.current_min is None or now - self.window_start >= 2 * self.interval:
+                self.last_min = 0.0
+            else:
+                self.last_min = self.current_min
+            self.current_min = None
+            self.window_start = now
+
+
+class AdmissionController:
+    """
+    Limit of concurrently handled requests with a CoDel-style queue.
+    Requests over max_in_flight wait for a slot. Normally they wait up to interval;
+    when the queue (or the DB connection pool) has not drained below target for
+    a whole interval, the wait is cut to target, so the worker sheds the excess
+    quickly instead of letting every request time out. Critical requests go to
+    the front of the queue and are never cut; bulk requests are rejected at once
+    while the controller is overloaded.
+    """
+
+    def __init__(self, max_in_flight: int, target: float, interval: float):
+        self.max_in_flight = max_in_flight
+        self.target = target
+        self.interval = interval
+        self.in_flight = 0
+        self.waiters: deque[asyncio.Future] = deque()
+        self.queue_delay = DelayWindow(interval)
+        self.pool_wait = DelayWindow(interval)
+
+    def overloaded(self) -> bool:
+        return self.queue_delay.above(self.target) or self.pool_wait.above(self.target)
+
+    async def acquire(self, priority: str) -> bool:
+        """
+        The acquire function takes a slot for a request, waiting in the queue if needed.
+
+        :param priority: str: CRITICAL, NORMAL or BULK
+        :return: True if the request may run, False if it has to be shed
+        """
+
+        if priority == BULK and self.overloaded():
+            return False
+        if self.in_flight < self.max_in_flight and not self.waiters:
+            self.in_flight += 1
+            self._observe(priority, 0.0)
+            return True
+
+        if priority == CRITICAL:
+            timeout = self.interval
+        else:
+            timeout = self.target if self.overloaded() else self.interval
+        waiter = asyncio.get_running_loop().create_future()
+        if priority == CRITICAL:
+            self.waiters.appendleft(waiter)
+        else:
+            self.waiters.append(waiter)
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            self._observe(priority, time.monotonic() - start)
+            return False
+        except asyncio.CancelledError:
+            # слот уже передано цьому запиту - повертаємо його наступному
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if not waiter.done() or waiter.cancelled():
+                try:
+                    self.waiters.remove(waiter)
+                except ValueError:
+                    pass
+        self._observe(priority, time.monotonic() - start)
+        return True
+
+    def release(self):
+        """
+        The release function frees the slot of a finished request: it is handed
+        to the first request still waiting in the queue.
+
+        :return: None
+        """
+
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                # слот переходить до нього, in_flight не змінюється
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def _observe(self, priority: str, delay: float):
+        self.queue_delay.observe(delay)
+        ADMISSION_QUEUE_WAIT.labels(priority).observe(delay)
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying AdmissionController to HTTP requests.
+    Shed requests get 503 with Retry-After right away, before any work is done.
+    Exempt paths (long-lived event streams, metrics) are not limited at all.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_in_flight: int = 100,
+        target: float = 0.05,
+        interval: float = 0.5,
+        retry_after: int = 1,
+        critical_paths: set[str] = frozenset(),
+        bulk_routes: set[tuple[str, str]] = frozenset(),
+        exempt_paths: set[str] = frozenset(),
+    ):
+        self.app = app
+        self.controller = AdmissionController(max_in_flight, target, interval)
+        self.retry_after = retry_after
+        self.critical_paths = critical_paths
+        self.bulk_routes = bulk_routes
+        self.exempt_paths = exempt_paths
+        pool_wait_observers.append(self.controller.pool_wait.observe)
+
+    def priority(self, scope: Scope) -> str:
+        if scope["path"] in self.critical_paths:
+            return CRITICAL
+        if (scope["method"], scope["path"]) in self.bulk_routes:
+            return BULK
+        return NORMAL
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (
+            scope["type"] != "http"
+            or scope["path"] in self.exempt_paths
+            or admitted.get()
+        ):
+            await self.app(scope, receive, send)
+            return
+        priority = self.priority(scope)
+        if not await self.controller.acquire(priority):
+            REQUESTS_SHED.labels(priority).inc()
+            response = JSONResponse(
+                {"detail": "Server is overloaded, retry later"},
+                503,
+                headers={"Retry-After": str(self.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+        token = admitted.set(True)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admitted.reset(token)
+            self.controller.release()
@@ -1,3 +1,5 @@
+from contextvars import ContextVar
+from functools import cached_property
 from datetime import datetime, timedelta
 from typing import Optional
 
@@ -5,7 +7,6 @@ from typing import Optional
 
 # import redis as redis
 from fastapi import Depends, HTTPException, status
-from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from jose import JWTError, jwt
@@ -13,15 +14,25 @@ from jose import JWTError, jwt
 from src.conf.config import settings
 from src.database.db import get_db
 from src.repository import users as repository_users
+from src.services.metrics import PASSWORD_HASH_TIME, PASSWORD_VERIFY_TIME
+
+# Користувачі, вже автентифіковані в межах запиту /api/batch, за токеном
+shared_users: ContextVar[dict | None] = ContextVar("shared_users", default=None)
 
 
 class Auth:
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
     SECRET_KEY = settings.secret_key
     ALGORITHM = settings.algorithm
     oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
     # r = redis.Redis(host=settings.redis_host, port=settings.redis_port, db=0)
 
+    @cached_property
+    def pwd_context(self):
+        # passlib і bcrypt завантажуються при першому хешуванні, а не при імпорті
+        from passlib.context import CryptContext
+
+        return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
     def verify_password(self, plain_password, hashed_password):
         """
         The verify_password function takes a plain-text password and hashed password as arguments.
@@ -35,7 +46,8 @@ class Auth:
         :doc-author: Trelent
         """
 
-        return self.pwd_context.verify(plain_password, hashed_password)
+        with PASSWORD_VERIFY_TIME.time():
+            return self.pwd_context.verify(plain_password, hashed_password)
 
     def get_password_hash(self, password: str):
         """
@@ -48,7 +60,8 @@ class Auth:
         :doc-author: Trelent
         """
 
-        return self.pwd_context.hash(password)
+        with PASSWORD_HASH_TIME.time():
+            return self.pwd_context.hash(password)
 
     async def create_access_token(
         self, data: dict, expires_delta: Optional[float] = None
@@ -123,6 +136,12 @@ class Auth:
         :doc-author: Trelent
         """
 
+        shared = shared_users.get()
+        if shared is not None and token in shared:
+            # користувача завантажив попередній підзапит /api/batch своєю сесією -
+            # копія в сесії цього підзапиту, без запиту до БД
+            return db.merge(shared[token], load=False)
+
         credentials_exception = HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
@@ -144,6 +163,8 @@ class Auth:
         user = await repository_users.find_user_by_email(email, db)
         if user is None:
             raise credentials_exception
+        if shared is not None:
+            shared[token] = user
         return user
 
     async def decode_refresh_token(self, refresh_token: str):
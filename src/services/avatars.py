@@ -0,0 +1,88 @@
+import hashlib
+import logging
+from functools import lru_cache
+
+import httpx
+
+from src.database.db import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class GravatarProvider:
+    """
+    Avatar URLs of Gravatar. The URL is an md5 hash of the normalized email,
+    so it is computed locally and signup never waits for the network.
+    Whether the user really has a Gravatar can be checked later in the background.
+    """
+
+    base_url = "https://www.gravatar.com/avatar/"
+
+    def url(self, email: str) -> str:
+        """
+        The url function returns the Gravatar URL of an email address.
+
+        :param email: str: The email address of the user
+        :return: The URL of the user's Gravatar
+        """
+
+        return gravatar_url(normalize_email(email), self.base_url)
+
+    def fallback_url(self, email: str) -> str:
+        # згенерований візерунок замість безликої картинки за замовчуванням
+        return f"{self.url(email)}?d=identicon"
+
+    async def exists(self, email: str, client: httpx.AsyncClient) -> bool | None:
+        """
+        The exists function checks whether the email has its own Gravatar.
+
+        :param email: str: The email address of the user
+        :param client: httpx.AsyncClient: The shared HTTP client of the application
+        :return: True or False, None if Gravatar could not be reached
+        """
+
+        try:
+            response = await client.head(self.url(email), params={"d": "404"})
+        except httpx.HTTPError as err:
+            logger.warning("Gravatar check for %s failed: %s", email, err)
+            return None
+        if response.status_code == 404:
+            return False
+        if response.is_success:
+            return True
+        return None
+
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+@lru_cache(maxsize=4096)
+def gravatar_url(email: str, base_url: str) -> str:
+    return base_url + hashlib.md5(email.encode()).hexdigest()
+
+
+avatar_provider = GravatarProvider()
+
+
+async def verify_avatar(email: str, client: httpx.AsyncClient):
+    """
+    The verify_avatar function checks the Gravatar of a new user in the background.
+    If the user has no Gravatar and still has the default avatar, it is replaced
+    with a generated identicon. A failed check leaves the avatar as it is.
+
+    :param email: str: The email address of the new user
+    :param client: httpx.AsyncClient: The shared HTTP client of the application
+    :return: None
+    """
+
+    # репозиторій сам імпортує цей модуль, тому імпорт тут
+    from src.repository import users as repository_users
+
+    if await avatar_provider.exists(email, client) is not False:
+        return
+    with SessionLocal() as db:
+        # користувач міг уже завантажити власну аватарку - її не чіпаємо
+        await repository_users.replace_avatar(
+            email, avatar_provider.url(email), avatar_provider.fallback_url(email), db
+        )
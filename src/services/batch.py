@@ -0,0 +1,46 @@
+from fastapi import HTTPException, Query, status
+
+MAX_BATCH_IDS = 100
+
+
+def batch_ids(
+    ids: str = Query(
+        ..., description=f"Comma-separated ids, at most {MAX_BATCH_IDS}, e.g. 1,2,3"
+    )
+) -> list[int]:
+    """
+    The batch_ids function is a dependency parsing the ids query parameter of batch endpoints.
+
+    :param ids: str: Comma-separated ids
+    :return: The ids in request order
+    """
+
+    try:
+        parsed = [int(item) for item in ids.split(",") if item.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="ids must be comma-separated integers",
+        )
+    if not parsed or len(parsed) > MAX_BATCH_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"From 1 to {MAX_BATCH_IDS} ids are allowed",
+        )
+    return parsed
+
+
+def with_not_found(ids: list[int], items: list[dict | None], detail: str) -> list[dict]:
+    """
+    The with_not_found function replaces missing items of a batch with not-found markers.
+
+    :param ids: list[int]: Requested ids
+    :param items: list[dict | None]: Found items in the order of ids, None if not found
+    :param detail: str: Detail of the marker, e.g. "User not found"
+    :return: Items and {"id": id, "detail": detail} markers in the order of ids
+    """
+
+    return [
+        item if item is not None else {"id": item_id, "detail": detail}
+        for item_id, item in zip(ids, items)
+    ]
@@ -0,0 +1,53 @@
+import asyncio
+import logging
+from datetime import datetime, time, timedelta
+
+from src.database.db import SessionLocal, run_db_call
+from src.repository import users as repository_users
+
+logger = logging.getLogger(__name__)
+
+
+def seconds_until_next_day(now: datetime | None = None) -> float:
+    now = now or datetime.now()
+    midnight = datetime.combine(now.date() + timedelta(days=1), time())
+    return (midnight - now).total_seconds()
+
+
+async def refresh_birthday_digest() -> int:
+    """
+    The refresh_birthday_digest function rebuilds today's birthday digest
+    in its own DB session, in the thread pool.
+
+    :return: Number of users in the digest
+    """
+
+    with SessionLocal() as db:
+        return await run_db_call(repository_users.refresh_birthday_digest, db)
+
+
+async def birthday_digest_scheduler():
+    """
+    The birthday_digest_scheduler function refreshes the birthday digest at startup
+    and then every day right after midnight. Failed refreshes are retried in a minute;
+    until then the endpoint selects the users without the digest.
+
+    :return: None, runs until cancelled
+    """
+
+    delay = 0.0
+    while True:
+        await asyncio.sleep(delay)
+        try:
+            count = await refresh_birthday_digest()
+            logger.info("Birthday digest refreshed: %d users", count)
+            delay = seconds_until_next_day() + 1
+        except Exception:
+            logger.exception("Birthday digest refresh failed")
+            delay = 60
+
+
+if __name__ == "__main__":
+    # python -m src.services.birthdays - оновлення дайджесту окремим процесом (cron)
+    logging.basicConfig(level=logging.INFO)
+    print(asyncio.run(refresh_birthday_digest()))
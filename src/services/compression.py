@@ -0,0 +1,191 @@
+import hashlib
+import zlib
+from collections import OrderedDict
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # без brotli відповіді стискаються тільки gzip
+    brotli = None
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    """
+    The choose_encoding function picks the response encoding from the Accept-Encoding header,
+    preferring brotli when it is installed.
+
+    :param accept_encoding: str: Value of the Accept-Encoding header
+    :return: "br", "gzip" or None
+    """
+
+    accepted = set()
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        key, _, value = params.replace(" ", "").partition("=")
+        if key == "q":
+            try:
+                if float(value) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class CompressedCache:
+    """
+    LRU cache of compressed bodies keyed by encoding and body digest.
+    Identical responses (same list page, same user) are compressed once,
+    repeated hits only pay for hashing.
+    """
+
+    def __init__(self, max_entries: int, max_body_size: int = 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_body_size = max_body_size
+        self.entries: OrderedDict[tuple[str, bytes], bytes] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compress(self, encoding: str, body: bytes, compress) -> bytes:
+        if not self.max_entries or len(body) > self.max_body_size:
+            return compress(body)
+        key = (encoding, hashlib.blake2b(body, digest_size=16).digest())
+        compressed = self.entries.get(key)
+        if compressed is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return compressed
+        self.misses += 1
+        compressed = compress(body)
+        self.entries[key] = compressed
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return compressed
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with brotli or gzip.
+    Responses smaller than minimum_size or already encoded are sent as is.
+    Event streams and bodies larger than the cache limit are compressed chunk by chunk
+    (every chunk is flushed, so streamed events are not held back by the compressor).
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 500,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        cache_size: int = 256,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache = CompressedCache(cache_size)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http":
+            encoding = choose_encoding(Headers(scope=scope).get("Accept-Encoding", ""))
+            if encoding is not None:
+                responder = CompressionResponder(self, encoding, send)
+                await self.app(scope, receive, responder.send)
+                return
+        await self.app(scope, receive, send)
+
+    def compress(self, encoding: str, body: bytes) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        compressor = self.compressor("gzip")
+        return compressor.compress(body) + compressor.flush()
+
+    def compressor(self, encoding: str):
+        if encoding == "br":
+            return brotli.Compressor(quality=self.brotli_quality)
+        # wbits=16+MAX_WBITS - формат gzip
+        return zlib.compressobj(self.gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+
+class CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.downstream = send
+        self.initial_message: Message = {}
+        self.passthrough = False
+        self.streaming = False
+        self.buffer = bytearray()
+        self.compressor = None
+
+    def _encoded_headers(self) -> MutableHeaders:
+        headers = MutableHeaders(raw=self.initial_message["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        return headers
+
+    def _compress_chunk(self, body: bytes, more_body: bool) -> bytes:
+        if self.encoding == "br":
+            chunk = self.compressor.process(body)
+            return chunk + (
+                self.compressor.flush() if more_body else self.compressor.finish()
+            )
+        chunk = self.compressor.compress(body)
+        return chunk + self.compressor.flush(
+            zlib.Z_SYNC_FLUSH if more_body else zlib.Z_FINISH
+        )
+
+    async def send(self, message: Message):
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            # заголовки відправляються, коли стане відомо, чи стискати відповідь
+            headers = Headers(raw=message["headers"])
+            if "content-encoding" in headers:
+                self.passthrough = True
+                await self.downstream(message)
+                return
+            self.initial_message = message
+            self.streaming = headers.get("content-type", "").startswith(
+                "text/event-stream"
+            )
+            return
+        if message_type != "http.response.body" or self.passthrough:
+            await self.downstream(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is not None:
+            message["body"] = self._compress_chunk(body, more_body)
+            await self.downstream(message)
+            return
+
+        # тіло буферизується до кінця відповіді (BaseHTTPMiddleware завжди
+        # надсилає його кількома повідомленнями), події SSE і великі тіла - ні
+        self.buffer += body
+        if not more_body:
+            body = bytes(self.buffer)
+            if len(body) >= self.middleware.minimum_size:
+                body = self.middleware.cache.get_or_compress(
+                    self.encoding,
+                    body,
+                    lambda data: self.middleware.compress(self.encoding, data),
+                )
+                self._encoded_headers()["Content-Length"] = str(len(body))
+            message["body"] = body
+        elif self.streaming or len(self.buffer) > self.middleware.cache.max_body_size:
+            headers = self._encoded_headers()
+            del headers["Content-Length"]
+            self.compressor = self.middleware.compressor(self.encoding)
+            message["body"] = self._compress_chunk(bytes(self.buffer), more_body)
+        else:
+            return
+        self.buffer = bytearray()
+        await self.downstream(self.initial_message)
+        await self.downstream(message)
@@ -0,0 +1,153 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+import redis.asyncio as redis
+
+from src.conf.config import settings
+
+logger = logging.getLogger(__name__)
+
+# замість пропущених подій клієнт отримує сигнал повної синхронізації
+RESYNC = object()
+
+
+def contacts_channel(user_id: int) -> str:
+    """
+    The contacts_channel function returns the Redis pub/sub channel
+    of the contact changes of a user.
+
+    :param user_id: int: Id of the owner of the contacts
+    :return: Name of the channel
+    """
+
+    return f"{settings.contacts_channel}:{user_id}"
+
+
+class ContactChangeHub:
+    """
+    Fan-out of contact change notifications to the event streams of one worker.
+    The worker holds a single pub/sub connection to Redis, subscribed only to the
+    channels of users with an open stream; every stream reads its own bounded queue.
+    A stream that falls behind, or misses messages while Redis reconnects,
+    gets a resync event instead of the lost notifications.
+    """
+
+    def __init__(self, redis_client: redis.Redis, queue_size: int = 100):
+        self.redis = redis_client
+        self.queue_size = queue_size
+        self.listeners: dict[int, set[asyncio.Queue]] = {}
+        self.pubsub = None
+        self.reader = None
+
+    @asynccontextmanager
+    async def listen(self, user_id: int):
+        """
+        The listen function subscribes a stream to the contact changes of a user.
+
+        :param user_id: int: Id of the user
+        :return: Queue of the notifications (JSON bytes or RESYNC)
+        """
+
+        queue = asyncio.Queue(self.queue_size)
+        listeners = self.listeners.setdefault(user_id, set())
+        listeners.add(queue)
+        try:
+            if len(listeners) == 1:  # перший потік користувача у цьому воркері
+                if self.pubsub is None:
+                    self.pubsub = self.redis.pubsub()
+                await self.pubsub.subscribe(contacts_channel(user_id))
+                if self.reader is None:
+                    self.reader = asyncio.create_task(self._read())
+            yield queue
+        finally:
+            listeners.discard(queue)
+            if not listeners and self.listeners.get(user_id) is listeners:
+                del self.listeners[user_id]
+                try:
+                    await self.pubsub.unsubscribe(contacts_channel(user_id))
+                except Exception as err:
+                    logger.warning("Unsubscribe of user %s failed: %s", user_id, err)
+
+    def publish_local(self, user_id: int, data):
+        """
+        The publish_local function puts a notification into the queues of the streams
+        of a user. A full queue is replaced with a single resync event.
+
+        :param user_id: int: Id of the user
+        :param data: JSON bytes of the notification or RESYNC
+        :return: None
+        """
+
+        for queue in self.listeners.get(user_id, ()):
+            try:
+                queue.put_nowait(data)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC)
+
+    async def _read(self):
+        while True:
+            try:
+                message = await self.pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=None
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # після перепідключення redis-py сам підписується знову,
+                # а повідомлення за цей час втрачені
+                logger.exception("Contact changes subscription failed")
+                for user_id in list(self.listeners):
+                    self.publish_local(user_id, RESYNC)
+                await asyncio.sleep(1)
+                continue
+            if message is None:
+                continue
+            channel = message["channel"]
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            self.publish_local(int(channel.rsplit(":", 1)[1]), message["data"])
+
+    async def close(self):
+        """
+        The close function stops the reader and closes the pub/sub connection.
+
+        :return: None
+        """
+
+        if self.reader is not None:
+            self.reader.cancel()
+        if self.pubsub is not None:
+            await self.pubsub.close()
+
+
+async def contact_event_stream(hub: ContactChangeHub, user_id: int, keepalive: float):
+    """
+    The contact_event_stream function generates the server-sent events of a user.
+    The ready event follows the subscription: a client then syncs once
+    (GET /api/contacts/sync) and after that on every contact or resync event,
+    so nothing committed between the sync and the subscription is missed.
+
+    :param hub: ContactChangeHub: The hub of the worker
+    :param user_id: int: Id of the user
+    :param keepalive: float: Seconds of silence after which a comment is sent
+    :return: Async generator of SSE frames
+    """
+
+    async with hub.listen(user_id) as queue:
+        yield "event: ready\ndata: {}\n\n"
+        while True:
+            try:
+                data = await asyncio.wait_for(queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                # проксі не закривають з'єднання, а клієнт помічає обрив
+                yield ": keep-alive\n\n"
+                continue
+            if data is RESYNC:
+                yield "event: resync\ndata: {}\n\n"
+            else:
+                if isinstance(data, bytes):
+                    data = data.decode()
+                yield f"event: contact\ndata: {data}\n\n"
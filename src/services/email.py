@@ -1,28 +1,40 @@
+from functools import lru_cache
 from pathlib import Path
 import logging
 
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
-from fastapi_mail.errors import ConnectionErrors
 from pydantic import EmailStr
 
 from src.conf.config import settings
 from src.services.auth import auth_service
+from src.services.metrics import EMAILS_SENT_OK, EMAILS_SENT_FAILED
 
 
-# для навчання тут прописано навчальну пошту
-conf = ConnectionConfig(
-    MAIL_USERNAME=settings.mail_username,
-    MAIL_PASSWORD=settings.mail_password,
-    MAIL_FROM=EmailStr(settings.mail_from),
-    MAIL_PORT=settings.mail_port,
-    MAIL_SERVER=settings.mail_server,
-    MAIL_FROM_NAME="Home_work_12/13_app",
-    MAIL_STARTTLS=False,
-    MAIL_SSL_TLS=True,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True,
-    TEMPLATE_FOLDER=Path(__file__).parent / "templates",
-)
+@lru_cache
+def get_conf():
+    """
+    The get_conf function builds the fastapi-mail connection config on the first email.
+    fastapi-mail and its dependencies are imported here, so they do not slow down
+    the start of the application.
+
+    :return: The ConnectionConfig shared by all emails
+    """
+
+    from fastapi_mail import ConnectionConfig
+
+    # для навчання тут прописано навчальну пошту
+    return ConnectionConfig(
+        MAIL_USERNAME=settings.mail_username,
+        MAIL_PASSWORD=settings.mail_password,
+        MAIL_FROM=settings.mail_from,
+        MAIL_PORT=settings.mail_port,
+        MAIL_SERVER=settings.mail_server,
+        MAIL_FROM_NAME="Home_work_12/13_app",
+        MAIL_STARTTLS=False,
+        MAIL_SSL_TLS=True,
+        USE_CREDENTIALS=True,
+        VALIDATE_CERTS=True,
+        TEMPLATE_FOLDER=Path(__file__).parent / "templates",
+    )
 
 
 async def send_email(email: EmailStr, name: str, host: str):
@@ -36,6 +48,9 @@ async def send_email(email: EmailStr, name: str, host: str):
     :doc-author: Trelent
     """
 
+    from fastapi_mail import FastMail, MessageSchema, MessageType
+    from fastapi_mail.errors import ConnectionErrors
+
     try:
         token_verification = auth_service.create_email_token({"sub": email})
         message = MessageSchema(
@@ -49,7 +64,9 @@ async def send_email(email: EmailStr, name: str, host: str):
             subtype=MessageType.html,
         )
 
-        fm = FastMail(conf)
+        fm = FastMail(get_conf())
         await fm.send_message(message, template_name="email_template.html")
+        EMAILS_SENT_OK.inc()
     except ConnectionErrors as err:
+        EMAILS_SENT_FAILED.inc()
         logging.error(err)
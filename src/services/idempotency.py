@@ -0,0 +1,272 @@
+import asyncio
+import hashlib
+import logging
+import time
+
+import orjson
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.services.locks import (
+    RELEASE_SCRIPT,
+    acquire_lock,
+    new_lock_token,
+    release_lock,
+)
+
+logger = logging.getLogger(__name__)
+
+# заголовки, які не мають сенсу при повторі відповіді
+SKIPPED_HEADERS = {b"server-timing", b"date"}
+
+
+class RequestInFlight(Exception):
+    """
+    The first request with the same Idempotency-Key is still running.
+    """
+
+
+def idempotency_keys(scope: Scope, key: str, body: bytes) -> tuple[str, str, str]:
+    """
+    The idempotency_keys function returns the Redis keys of an Idempotency-Key
+    and the fingerprint of the request body. Keys are scoped to the route and to the
+    credentials of the client, so two clients never see each other's responses.
+
+    :param scope: Scope: The ASGI scope of the request
+    :param key: str: Value of the Idempotency-Key header
+    :param body: bytes: Body of the request
+    :return: Key of the stored response, key of the lock and the body fingerprint
+    """
+
+    credentials = Headers(scope=scope).get("Authorization", "")
+    scope_hash = hashlib.sha256(
+        f"{scope['method']} {scope['path']} {credentials}".encode()
+    ).hexdigest()[:32]
+    base = f"idempotency:{scope_hash}:{key}"
+    return base, f"{base}:lock", hashlib.sha256(body).hexdigest()
+
+
+class IdempotencyMiddleware:
+    """
+    ASGI middleware making POST endpoints safe to retry with an Idempotency-Key header.
+    The first response of a key is stored in Redis for ttl seconds and replayed
+    to retries with the Idempotent-Replayed header. While the first request runs,
+    its duplicates wait for the stored response instead of executing again;
+    after wait_seconds they get 409. Server errors and 429 are not stored,
+    so such requests can be retried. Without Redis requests run as usual.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        paths: set[tuple[str, str]],
+        ttl: int = 86400,
+        lock_seconds: float = 30,
+        wait_seconds: float = 10,
+        poll_interval: float = 0.05,
+    ):
+        self.app = app
+        self.paths = paths
+        self.ttl = ttl
+        self.lock_seconds = lock_seconds
+        self.wait_seconds = wait_seconds
+        self.poll_interval = poll_interval
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (
+            scope["type"] != "http"
+            or (scope["method"], scope["path"]) not in self.paths
+        ):
+            await self.app(scope, receive, send)
+            return
+        key = Headers(scope=scope).get("Idempotency-Key")
+        redis_client = getattr(scope["app"].state, "redis", None)
+        if key is None or redis_client is None:
+            await self.app(scope, receive, send)
+            return
+        if len(key) > 255:
+            response = JSONResponse(
+                {"detail": "Idempotency-Key is longer than 255 characters"}, 400
+            )
+            await response(scope, receive, send)
+            return
+
+        # тіло читається наперед: від нього залежить відбиток запиту
+        body = bytearray()
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+        result_key, lock_key, fingerprint = idempotency_keys(scope, key, bytes(body))
+        # замок знімає лише його власник - повтор міг узяти його після закінчення ttl
+        token = new_lock_token()
+
+        try:
+            stored = await self.acquire(redis_client, result_key, lock_key, token)
+        except RequestInFlight:
+            response = JSONResponse(
+                {"detail": "A request with this Idempotency-Key is in progress"},
+                409,
+                headers={"Retry-After": "1"},
+            )
+            await response(scope, receive, send)
+            return
+        except Exception as err:
+            # Redis недоступний - запит виконується як без ключа
+            logger.warning("Idempotency check failed: %s", err)
+            await self.app(scope, self._receive(bytes(body), receive), send)
+            return
+        if stored is not None:
+            await self.replay(stored, fingerprint)(scope, receive, send)
+            return
+
+        start: Message = {}
+        chunks: list[bytes] = []
+        is_stored = False
+
+        async def capture(message: Message):
+            nonlocal is_stored
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    # зберігається до відправки, тож повтор ніколи не випередить запис
+                    is_stored = await self.store(
+                        redis_client,
+                        result_key,
+                        lock_key,
+                        token,
+                        fingerprint,
+                        start,
+                        b"".join(chunks),
+                    )
+            await send(message)
+
+        try:
+            await self.app(scope, self._receive(bytes(body), receive), capture)
+        finally:
+            if not is_stored:
+                try:
+                    await release_lock(redis_client, lock_key, token)
+                except Exception as err:
+                    logger.warning("Idempotency lock release failed: %s", err)
+
+    async def acquire(self, redis_client, result_key: str, lock_key: str, token: str):
+        """
+        The acquire function takes the lock of a key or waits until the request
+        holding it stores its response.
+
+        :param redis_client: redis.Redis: The Redis client
+        :param result_key: str: Key of the stored response
+        :param lock_key: str: Key of the lock
+        :param token: str: Random token identifying this request as the lock owner
+        :return: The stored response, None if the caller holds the lock now
+        :raises RequestInFlight: wait_seconds passed and the first request still runs
+        """
+
+        deadline = time.monotonic() + self.wait_seconds
+        while True:
+            stored = await redis_client.hgetall(result_key)
+            if stored:
+                return stored
+            if await acquire_lock(redis_client, lock_key, token, self.lock_seconds):
+                # перший запит міг зберегти відповідь між двома перевірками
+                stored = await redis_client.hgetall(result_key)
+                if stored:
+                    await release_lock(redis_client, lock_key, token)
+                    return stored
+                return None
+            if time.monotonic() >= deadline:
+                raise RequestInFlight
+            await asyncio.sleep(self.poll_interval)
+
+    async def store(
+        self,
+        redis_client,
+        result_key: str,
+        lock_key: str,
+        token: str,
+        fingerprint: str,
+        start: Message,
+        body: bytes,
+    ) -> bool:
+        """
+        The store function saves the response of a key and releases the lock
+        if it is still held by this request.
+
+        :param redis_client: redis.Redis: The Redis client
+        :param result_key: str: Key of the stored response
+        :param lock_key: str: Key of the lock
+        :param token: str: Token of the lock owner
+        :param fingerprint: str: Fingerprint of the request body
+        :param start: Message: The http.response.start message
+        :param body: bytes: Body of the response
+        :return: True if the response was stored
+        """
+
+        status_code = start["status"]
+        if status_code >= 500 or status_code == 429:
+            return False
+        headers = [
+            [name.decode("latin-1"), value.decode("latin-1")]
+            for name, value in start["headers"]
+            if name.lower() not in SKIPPED_HEADERS
+        ]
+        try:
+            async with redis_client.pipeline(transaction=True) as pipe:
+                pipe.hset(
+                    result_key,
+                    mapping={
+                        "status": status_code,
+                        "headers": orjson.dumps(headers),
+                        "body": body,
+                        "fingerprint": fingerprint,
+                    },
+                )
+                pipe.expire(result_key, self.ttl)
+                pipe.eval(RELEASE_SCRIPT, 1, lock_key, token)
+                await pipe.execute()
+        except Exception as err:
+            logger.warning("Idempotent response was not stored: %s", err)
+            return False
+        return True
+
+    @staticmethod
+    def replay(stored: dict, fingerprint: str) -> Response:
+        """
+        The replay function rebuilds the stored response of a key.
+
+        :param stored: dict: The stored response (HGETALL)
+        :param fingerprint: str: Fingerprint of the body of the retried request
+        :return: The response, 422 if the key was used for a different body
+        """
+
+        if stored[b"fingerprint"].decode() != fingerprint:
+            return JSONResponse(
+                {"detail": "Idempotency-Key was used with a different request body"},
+                422,
+            )
+        response = Response(stored[b"body"], int(stored[b"status"]))
+        response.raw_headers = [
+            (name.encode("latin-1"), value.encode("latin-1"))
+            for name, value in orjson.loads(stored[b"headers"])
+        ] + [(b"idempotent-replayed", b"true")]
+        return response
+
+    @staticmethod
+    def _receive(body: bytes, receive: Receive) -> Receive:
+        body_sent = False
+
+        async def replay_receive() -> Message:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        return replay_receive
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import os
+import secrets
+import time
+
+import redis.asyncio as redis
+
+logger = logging.getLogger(__name__)
+
+# ключ змінюється лише власником: значення порівнюється з його токеном
+RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+EXTEND_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+def new_lock_token() -> str:
+    return secrets.token_hex(16)
+
+
+async def acquire_lock(
+    redis_client: redis.Redis, key: str, token: str, seconds: float
+) -> bool:
+    """
+    The acquire_lock function takes a Redis lock (SET NX PX) that expires by itself
+    if its owner dies.
+
+    :param redis_client: redis.Redis: The Redis client
+    :param key: str: Key of the lock
+    :param token: str: Random token of the owner
+    :param seconds: float: Time to live of the lock
+    :return: True if the lock was taken
+    """
+
+    return bool(await redis_client.set(key, token, nx=True, px=int(seconds * 1000)))
+
+
+async def extend_lock(
+    redis_client: redis.Redis, key: str, token: str, seconds: float
+) -> bool:
+    """
+    The extend_lock function renews the time to live of a lock still held by the token.
+
+    :param redis_client: redis.Redis: The Redis client
+    :param key: str: Key of the lock
+    :param token: str: Token of the owner
+    :param seconds: float: New time to live of the lock
+    :return: True if the lock is still held by the token
+    """
+
+    return bool(
+        await redis_client.eval(EXTEND_SCRIPT, 1, key, token, int(seconds * 1000))
+    )
+
+
+async def release_lock(redis_client: redis.Redis, key: str, token: str) -> bool:
+    """
+    The release_lock function deletes a lock only if it is still held by the token,
+    so an owner whose lock has expired never deletes the lock of the next owner.
+
+    :param redis_client: redis.Redis: The Redis client
+    :param key: str: Key of the lock
+    :param token: str: Token of the owner
+    :return: True if the lock was deleted
+    """
+
+    return bool(await redis_client.eval(RELEASE_SCRIPT, 1, key, token))
+
+
+async def run_as_leader(
+    redis_client: redis.Redis, name: str, lock_seconds: float, job, *args
+):
+    """
+    The run_as_leader function runs a background job in only one worker process
+    at a time. Every worker competes for the leader:<name> lock; the leader runs
+    job(*args) and renews the lock every third of lock_seconds, the others retry
+    as often. When the lock cannot be renewed in time, the job is cancelled before
+    the lock expires, so two workers never run it together. When the leader dies,
+    another worker takes over within lock_seconds.
+
+    :param redis_client: redis.Redis: The Redis client
+    :param name: str: Name of the job
+    :param lock_seconds: float: Time to live of the lock
+    :param job: Coroutine function of the job, runs until cancelled
+    :param args: Arguments of the job
+    :return: None, runs until cancelled
+    """
+
+    key = f"leader:{name}"
+    token = new_lock_token()
+    interval = lock_seconds / 3
+    while True:
+        try:
+            acquired = await acquire_lock(redis_client, key, token, lock_seconds)
+        except Exception as err:
+            logger.warning("Leader lock of %s failed: %s", name, err)
+            acquired = False
+        if acquired:
+            logger.info("Worker %s runs %s", os.getpid(), name)
+            task = asyncio.create_task(job(*args))
+            try:
+                await _lead(redis_client, key, token, lock_seconds, task)
+            finally:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                try:
+                    await release_lock(redis_client, key, token)
+                except Exception as err:
+                    logger.warning("Leader lock of %s was not released: %s", name, err)
+            logger.info("Worker %s stopped %s", os.getpid(), name)
+        await asyncio.sleep(interval)
+
+
+async def _lead(redis_client, key: str, token: str, lock_seconds: float, task):
+    interval = lock_seconds / 3
+    valid_until = time.monotonic() + lock_seconds
+    while True:
+        done, _ = await asyncio.wait([task], timeout=interval)
+        if done:
+            if not task.cancelled() and task.exception() is not None:
+                logger.error("Job %s failed", key, exc_info=task.exception())
+            return
+        try:
+            if not await extend_lock(redis_client, key, token, lock_seconds):
+                logger.warning("Leader lock %s was lost", key)
+                return
+            valid_until = time.monotonic() + lock_seconds
+        except Exception as err:
+            logger.warning("Leader lock %s was not renewed: %s", key, err)
+            # наступне продовження може запізнитися - зупиняємося, поки замок ще наш
+            if time.monotonic() + interval >= valid_until:
+                return
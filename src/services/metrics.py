@@ -0,0 +1,118 @@
+from prometheus_client import Counter, Gauge, Histogram
+import redis.asyncio as redis
+
+from src.database.db import engine, pool_state_observers, pool_wait_observers
+
+# Метрики HTTP-запитів (мітка route - шаблон маршруту, напр. "/api/contacts/{contact_id}")
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being handled",
+    ["method"],
+    multiprocess_mode="livesum",  # сума по живих воркерах gunicorn
+)
+
+# Пул з'єднань БД основної бази - значення встановлюються після кожної видачі
+# й повернення з'єднання (set_function не працює в multiprocess-режимі)
+DB_POOL_SIZE = Gauge(
+    "db_pool_size",
+    "Configured size of the DB connection pool",
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "DB connections currently checked out of the pool",
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "DB connections opened above pool size",
+    multiprocess_mode="livesum",
+)
+
+
+def observe_pool(pool):
+    if pool is not engine.pool:  # репліки не рахуються
+        return
+    DB_POOL_SIZE.set(pool.size())
+    DB_POOL_CHECKED_OUT.set(pool.checkedout())
+    DB_POOL_OVERFLOW.set(pool.overflow())
+
+
+pool_state_observers.append(observe_pool)
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds",
+    "Time a checkout waited for a free DB connection",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+pool_wait_observers.append(DB_POOL_WAIT.observe)
+
+REDIS_LATENCY = Histogram(
+    "redis_command_duration_seconds",
+    "Redis round-trip latency by command",
+    ["command"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+PASSWORD_HASH_LATENCY = Histogram(
+    "password_hash_duration_seconds",
+    "Time spent in bcrypt hash/verify",
+    ["operation"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.0),
+)
+PASSWORD_HASH_TIME = PASSWORD_HASH_LATENCY.labels("hash")
+PASSWORD_VERIFY_TIME = PASSWORD_HASH_LATENCY.labels("verify")
+
+EMAILS_SENT = Counter("emails_sent_total", "Outgoing emails by outcome", ["outcome"])
+EMAILS_SENT_OK = EMAILS_SENT.labels("sent")
+EMAILS_SENT_FAILED = EMAILS_SENT.labels("failed")
+SMTP_SEND_LATENCY = Histogram(
+    "smtp_send_duration_seconds",
+    "Time to send one message over a pooled SMTP connection",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+BIRTHDAY_NOTIFICATIONS_THROUGHPUT = Gauge(
+    "birthday_notifications_last_run_per_second",
+    "Messages per second sent by the last birthday notification run",
+)
+
+ADMISSION_QUEUE_WAIT = Histogram(
+    "admission_queue_wait_seconds",
+    "Time a request waited for an admission slot",
+    ["priority"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+REQUESTS_SHED = Counter(
+    "http_requests_shed_total",
+    "Requests rejected with 503 by admission control",
+    ["priority"],
+)
+
+SINGLE_FLIGHT_CALLS = Counter(
+    "single_flight_calls_total",
+    "Calls of single-flight repository functions: executed or coalesced",
+    ["function", "result"],
+)
+
+
+class InstrumentedRedis(redis.Redis):
+    """
+    Redis client that records round-trip latency of every command
+    (used by FastAPILimiter).
+    """
+
+    async def execute_command(self, *args, **options):
+        """
+        The execute_command function runs a command and observes its duration.
+
+        :param args: Command name and arguments
+        :param options: Command options
+        :return: The command result
+        """
+
+        with REDIS_LATENCY.labels(str(args[0]).lower()).time():
+            return await super().execute_command(*args, **options)
@@ -0,0 +1,246 @@
+import asyncio
+import logging
+import time
+from email.message import EmailMessage
+from pathlib import Path
+
+import aiosmtplib
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from sqlalchemy.orm import Session
+
+from src.conf.config import settings
+from src.database.db import SessionLocal
+from src.repository import users as repository_users
+from src.services.metrics import (
+    BIRTHDAY_NOTIFICATIONS_THROUGHPUT,
+    EMAILS_SENT_FAILED,
+    EMAILS_SENT_OK,
+    SMTP_SEND_LATENCY,
+)
+
+logger = logging.getLogger(__name__)
+
+templates = Environment(
+    loader=FileSystemLoader(Path(__file__).parent / "templates"),
+    autoescape=select_autoescape(),
+)
+
+
+class SMTPPool:
+    """
+    Pool of persistent SMTP connections. A connection is opened on first use and
+    reused for the following messages, so a run pays for the TLS handshake and
+    the login once per connection instead of once per message.
+    A connection that failed is dropped and reopened by the next message.
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        size: int = 10,
+        use_tls: bool = False,
+        username: str | None = None,
+        password: str | None = None,
+        timeout: float = 30,
+    ):
+        self.options = {
+            "hostname": hostname,
+            "port": port,
+            "use_tls": use_tls,
+            "start_tls": False,
+            "username": username,
+            "password": password,
+            "timeout": timeout,
+        }
+        self._slots: asyncio.Queue = asyncio.Queue()
+        for _ in range(size):
+            self._slots.put_nowait(None)
+
+    @classmethod
+    def from_settings(cls) -> "SMTPPool":
+        # ті ж параметри, що й get_conf() у src/services/email.py
+        return cls(
+            settings.mail_server,
+            settings.mail_port,
+            size=settings.smtp_pool_size,
+            use_tls=True,
+            username=settings.mail_username,
+            password=settings.mail_password,
+        )
+
+    async def send(self, message: EmailMessage):
+        """
+        The send function sends one message over a free pooled connection.
+
+        :param message: EmailMessage: The message with From and To headers
+        :return: None
+        :raises aiosmtplib.SMTPException, OSError: if the message could not be sent
+        """
+
+        client = await self._slots.get()
+        try:
+            if client is None:
+                client = aiosmtplib.SMTP(**self.options)
+                await client.connect()
+            with SMTP_SEND_LATENCY.time():
+                await client.send_message(message)
+        except (aiosmtplib.SMTPException, OSError):
+            if client is not None:
+                client.close()
+            client = None
+            raise
+        finally:
+            self._slots.put_nowait(client)
+
+    async def close(self):
+        for _ in range(self._slots.qsize()):
+            client = self._slots.get_nowait()
+            if client is not None:
+                try:
+                    await client.quit()
+                except (aiosmtplib.SMTPException, OSError):
+                    client.close()
+            self._slots.put_nowait(None)
+
+
+def render_birthday_digest(
+    recipient: dict, birthdays: list[dict], more: int = 0
+) -> EmailMessage:
+    """
+    The render_birthday_digest function builds the digest email of one recipient.
+
+    :param recipient: dict: {"id", "name", "email"} of the recipient
+    :param birthdays: list[dict]: Users with upcoming birthdays
+    :param more: int: Number of upcoming birthdays not listed in the email
+    :return: The message with a plain text and an HTML part
+    """
+
+    message = EmailMessage()
+    message["From"] = settings.mail_from
+    message["To"] = recipient["email"]
+    message["Subject"] = "Upcoming birthdays"
+    lines = [
+        f"{birthday['name']} {birthday['last_name']} - {birthday['day_of_born']:%d.%m}"
+        for birthday in birthdays
+    ]
+    if more:
+        lines.append(f"... and {more} more")
+    message.set_content("\n".join(lines))
+    message.add_alternative(
+        templates.get_template("birthday_digest.html").render(
+            username=recipient["name"], birthdays=birthdays, more=more
+        ),
+        subtype="html",
+    )
+    return message
+
+
+async def send_birthday_notifications(
+    db: Session,
+    pool: SMTPPool,
+    concurrency: int = 50,
+    chunk_size: int = 1000,
+    max_birthdays: int = 50,
+) -> dict:
+    """
+    The send_birthday_notifications function emails today's birthday digest to every
+    confirmed user. Recipients are streamed from the DB in chunks into a bounded queue,
+    and concurrency workers render the digests and send them through the SMTP pool.
+    Users do not get their own birthday in the digest, and at most max_birthdays
+    of the nearest birthdays are listed, so the cost of a message does not grow
+    with the number of users.
+
+    :param db: Session: Pass the database session to the function
+    :param pool: SMTPPool: Pool of SMTP connections
+    :param concurrency: int: Number of messages rendered and sent at the same time
+    :param chunk_size: int: Number of recipients read from the DB at once
+    :param max_birthdays: int: Maximum number of birthdays listed in one email
+    :return: Summary of the run with its throughput
+    """
+
+    start = time.perf_counter()
+    summary = {"recipients": 0, "sent": 0, "failed": 0, "skipped": 0}
+    birthdays = sorted(
+        await repository_users.get_birthday_digest_as_dicts(db),
+        key=lambda user: (user["day_of_born"].month, user["day_of_born"].day),
+    )
+    nearest = birthdays[: max_birthdays + 1]  # +1 на випадок, якщо там сам отримувач
+    birthday_ids = {user["id"] for user in birthdays}
+    # черга обмежена - читання з БД не випереджає відправлення
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+
+    async def worker():
+        while (recipient := await queue.get()) is not None:
+            listed = [user for user in nearest if user["id"] != recipient["id"]][
+                :max_birthdays
+            ]
+            more = len(birthdays) - len(listed) - (recipient["id"] in birthday_ids)
+            if not listed:
+                summary["skipped"] += 1
+                continue
+            try:
+                await pool.send(render_birthday_digest(recipient, listed, more))
+                summary["sent"] += 1
+                EMAILS_SENT_OK.inc()
+            except (aiosmtplib.SMTPException, OSError) as err:
+                summary["failed"] += 1
+                EMAILS_SENT_FAILED.inc()
+                logger.error(
+                    "Birthday digest to %s failed: %s", recipient["email"], err
+                )
+            except Exception:
+                # помилка одного листа не зупиняє воркер, інакше черга заблокує розсилку
+                summary["failed"] += 1
+                EMAILS_SENT_FAILED.inc()
+                logger.exception("Birthday digest to %s failed", recipient["email"])
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        if birthdays:
+            async for chunk in repository_users.stream_confirmed_users(db, chunk_size):
+                for recipient in chunk:
+                    summary["recipients"] += 1
+                    await queue.put(recipient)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+
+    summary["seconds"] = round(time.perf_counter() - start, 3)
+    summary["per_second"] = (
+        round(summary["sent"] / summary["seconds"], 1) if summary["seconds"] else 0.0
+    )
+    BIRTHDAY_NOTIFICATIONS_THROUGHPUT.set(summary["per_second"])
+    logger.info("Birthday notifications: %s", summary)
+    return summary
+
+
+async def run_birthday_notifications() -> dict:
+    """
+    The run_birthday_notifications function runs one fan-out with the configured
+    SMTP server, pool size and concurrency.
+
+    :return: Summary of the run
+    """
+
+    pool = SMTPPool.from_settings()
+    try:
+        with SessionLocal() as db:
+            return await send_birthday_notifications(
+                db,
+                pool,
+                concurrency=settings.notification_concurrency,
+                chunk_size=settings.notification_chunk_size,
+                max_birthdays=settings.notification_max_birthdays,
+            )
+    finally:
+        await pool.close()
+
+
+if __name__ == "__main__":
+    # python -m src.services.notifications - розсилка окремим процесом (cron)
+    logging.basicConfig(level=logging.INFO)
+    print(asyncio.run(run_birthday_notifications()))
@@ -0,0 +1,135 @@
+import asyncio
+import logging
+
+import orjson
+from fastapi.concurrency import run_in_threadpool
+import redis.asyncio as redis
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src.conf.config import settings
+from src.database.db import SessionLocal, run_db_call
+from src.repository import changes as repository_changes
+from src.repository import contacts as repository_contacts
+from src.services.contact_events import contacts_channel
+
+logger = logging.getLogger(__name__)
+
+# (event loop, asyncio.Event) запущеного релею цього воркера
+_relay_wakeup: tuple[asyncio.AbstractEventLoop, asyncio.Event] | None = None
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_relay(session):
+    if session.info.pop("changes_recorded", False) and _relay_wakeup is not None:
+        loop, wakeup = _relay_wakeup
+        loop.call_soon_threadsafe(wakeup.set)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changes(session):
+    session.info.pop("changes_recorded", None)
+
+
+async def relay_changes(
+    db, redis_client: redis.Redis, batch_size: int = 500, stream: str = "changes"
+) -> int:
+    """
+    The relay_changes function publishes one batch of outbox events to a Redis Stream
+    with a single pipelined round trip and marks them as published.
+    Contact events are also published to the pub/sub channel of the contact's owner
+    for the event streams (/api/contacts/events); detached events go to the owner
+    the contact was taken from.
+    If Redis fails, the events stay in the outbox and are sent again by the next run,
+    so delivery is at-least-once: consumers deduplicate by the id field.
+
+    :param db: Session: Pass the database session to the function
+    :param redis_client: redis.Redis: The Redis client
+    :param batch_size: int: Maximum number of events published at once
+    :param stream: str: Name of the Redis Stream
+    :return: Number of published events
+    """
+
+    # запити до БД - у пулі потоків, цикл подій воркера обслуговує HTTP-запити
+    events = await run_db_call(
+        repository_changes.get_unpublished_changes, batch_size, db
+    )
+    if not events:
+        await run_in_threadpool(db.rollback)  # знімаємо блокування порожньої вибірки
+        return 0
+    # власника відв'язаного контакту записано в події, решту знаходимо зараз
+    owners = await run_db_call(
+        repository_contacts.get_contact_owners,
+        [
+            event["entity_id"]
+            for event in events
+            if event["entity"] == "contact" and event["user_id"] is None
+        ],
+        db,
+    )
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for event in events:
+            pipe.xadd(
+                stream,
+                {
+                    "id": event["id"],
+                    "entity": event["entity"],
+                    "entity_id": event["entity_id"],
+                    "action": event["action"],
+                    "created_at": event["created_at"].isoformat(),
+                },
+                maxlen=settings.changes_stream_maxlen,
+                approximate=True,
+            )
+            owner = event["user_id"] or owners.get(event["entity_id"])
+            if event["entity"] == "contact" and owner is not None:
+                pipe.publish(
+                    contacts_channel(owner),
+                    orjson.dumps(
+                        {
+                            "id": event["id"],
+                            "contact_id": event["entity_id"],
+                            "action": event["action"],
+                        }
+                    ),
+                )
+        await pipe.execute()
+    await run_db_call(
+        repository_changes.mark_changes_published, [event["id"] for event in events], db
+    )
+    return len(events)
+
+
+async def outbox_relay(redis_client: redis.Redis):
+    """
+    The outbox_relay function keeps publishing outbox events to the changes stream.
+    Full batches are followed by the next one right away; when the outbox is drained
+    it waits for a commit with change events in this worker, or at most
+    outbox_poll_interval seconds for the commits of other workers.
+    Failures are retried after the interval.
+
+    :param redis_client: redis.Redis: The Redis client
+    :return: None, runs until cancelled
+    """
+
+    global _relay_wakeup
+    wakeup = asyncio.Event()
+    _relay_wakeup = (asyncio.get_running_loop(), wakeup)
+    while True:
+        wakeup.clear()
+        count = 0
+        try:
+            with SessionLocal() as db:
+                count = await relay_changes(
+                    db,
+                    redis_client,
+                    settings.outbox_batch_size,
+                    settings.changes_stream,
+                )
+        except Exception:
+            logger.exception("Outbox relay failed")
+        if count < settings.outbox_batch_size:
+            try:
+                await asyncio.wait_for(wakeup.wait(), settings.outbox_poll_interval)
+            except asyncio.TimeoutError:
+                pass
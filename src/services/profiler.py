@@ -0,0 +1,119 @@
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+
+from jose import JWTError, jwt
+
+from src.conf.config import settings
+
+# одночасно профілюється тільки один запит - вартість профілювання обмежена
+profiling_lock = threading.Lock()
+
+
+class StackSampler:
+    """
+    Wall-clock stack sampler of one thread (the event loop thread of a request).
+    Samples are aggregated into collapsed stacks, the input format of
+    flamegraph.pl, speedscope and similar tools.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[self._collapse(frame)] += 1
+            self._stopped.wait(self.interval)
+
+    @staticmethod
+    def _collapse(frame) -> str:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(stack))
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stopped.set()
+        self._thread.join()
+        return self.stacks
+
+
+def create_profile_token(expires_delta: float = 3600) -> str:
+    """
+    The create_profile_token function creates a token for the X-Profile header,
+    which forces profiling of the request it is sent with.
+
+    :param expires_delta: float: Lifetime of the token in seconds
+    :return: The signed token
+    """
+
+    to_encode = {
+        "iat": datetime.utcnow(),
+        "exp": datetime.utcnow() + timedelta(seconds=expires_delta),
+        "scope": "profile_token",
+    }
+    return jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
+
+
+def is_valid_profile_token(token: str) -> bool:
+    """
+    The is_valid_profile_token function checks the signature, lifetime and scope of the token.
+
+    :param token: str: Value of the X-Profile header
+    :return: True if the request may be profiled
+    """
+
+    try:
+        payload = jwt.decode(
+            token, settings.secret_key, algorithms=[settings.algorithm]
+        )
+    except JWTError:
+        return False
+    return payload.get("scope") == "profile_token"
+
+
+def save_profile(route: str, stacks: Counter, duration: float) -> str:
+    """
+    The save_profile function writes collapsed stacks of one request
+    to <profiling_dir>/<route>/<timestamp>-<id>.collapsed.
+
+    :param route: str: Route template of the request, e.g. /api/contacts/{contact_id}
+    :param stacks: Counter: Collapsed stacks with their sample counts
+    :param duration: float: Request duration in seconds
+    :return: Path of the written file
+    """
+
+    route_dir = os.path.join(
+        settings.profiling_dir,
+        re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root",
+    )
+    os.makedirs(route_dir, exist_ok=True)
+    path = os.path.join(
+        route_dir,
+        f"{time.strftime('%Y%m%dT%H%M%S')}-{int(duration * 1000)}ms-{uuid.uuid4().hex[:8]}.collapsed",
+    )
+    with open(path, "w", encoding="utf-8") as file:
+        for stack, count in stacks.most_common():
+            file.write(f"{stack} {count}\n")
+    return path
+
+
+if __name__ == "__main__":
+    # python -m src.services.profiler - токен для заголовка X-Profile
+    print(create_profile_token())
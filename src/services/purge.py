@@ -0,0 +1,123 @@
+import asyncio
+import logging
+from datetime import datetime, time, timedelta
+
+from src.conf.config import settings
+from src.database.db import SessionLocal, run_db_call
+from src.repository import changes as repository_changes
+from src.repository import contacts as repository_contacts
+from src.repository import users as repository_users
+
+logger = logging.getLogger(__name__)
+
+
+def seconds_until_hour(hour: int, now: datetime | None = None) -> float:
+    now = now or datetime.now()
+    start = datetime.combine(now.date(), time(hour))
+    if start <= now:
+        start += timedelta(days=1)
+    return (start - now).total_seconds()
+
+
+async def purge_in_batches(purge, before: datetime, batch_size: int, pause: float, db):
+    purged = 0
+    # кожна партія - у пулі потоків, цикл подій воркера не блокується
+    while count := await run_db_call(purge, before, batch_size, db):
+        purged += count
+        await asyncio.sleep(pause)
+    return purged
+
+
+async def purge_deleted(
+    batch_size: int = 500, retention_days: int = 7, pause: float = 0.1
+) -> dict:
+    """
+    The purge_deleted function hard-deletes users and contacts soft-deleted more than
+    retention_days ago, and the tombstones of contacts detached that long ago.
+    Rows are deleted in small batches, each in its own transaction, with a pause
+    between the batches, so the purge never holds long locks.
+
+    :param batch_size: int: Maximum number of rows deleted in one transaction
+    :param retention_days: int: How long soft-deleted rows are kept
+    :param pause: float: Seconds to wait between the batches
+    :return: Number of purged users, contacts and detachment tombstones
+    """
+
+    before = datetime.now() - timedelta(days=retention_days)
+    with SessionLocal() as db:
+        return {
+            "contacts": await purge_in_batches(
+                repository_contacts.purge_deleted_contacts,
+                before,
+                batch_size,
+                pause,
+                db,
+            ),
+            "users": await purge_in_batches(
+                repository_users.purge_deleted_users, before, batch_size, pause, db
+            ),
+            "detachments": await purge_in_batches(
+                repository_contacts.purge_contact_detachments,
+                before,
+                batch_size,
+                pause,
+                db,
+            ),
+        }
+
+
+async def purge_published_changes(
+    batch_size: int = 500, retention_days: int = 7, pause: float = 0.1
+) -> int:
+    """
+    The purge_published_changes function deletes outbox events published more than
+    retention_days ago, in the same small batches as purge_deleted.
+    Clients of /api/changes must sync at least once per retention period,
+    a cursor whose event is purged gets 410.
+
+    :param batch_size: int: Maximum number of rows deleted in one transaction
+    :param retention_days: int: How long published events are kept
+    :param pause: float: Seconds to wait between the batches
+    :return: Number of deleted events
+    """
+
+    before = datetime.now() - timedelta(days=retention_days)
+    with SessionLocal() as db:
+        return await purge_in_batches(
+            repository_changes.purge_published_changes, before, batch_size, pause, db
+        )
+
+
+async def purge_scheduler():
+    """
+    The purge_scheduler function runs purge_deleted and purge_published_changes
+    every day at purge_hour, when the load is low. Failed runs are retried in an hour.
+
+    :return: None, runs until cancelled
+    """
+
+    delay = seconds_until_hour(settings.purge_hour)
+    while True:
+        await asyncio.sleep(delay)
+        try:
+            purged = await purge_deleted(
+                settings.purge_batch_size, settings.purge_retention_days
+            )
+            purged["changes"] = await purge_published_changes(
+                settings.purge_batch_size, settings.changes_retention_days
+            )
+            logger.info("Purged rows: %s", purged)
+            delay = seconds_until_hour(settings.purge_hour)
+        except Exception:
+            logger.exception("Purge of soft-deleted rows failed")
+            delay = 3600
+
+
+if __name__ == "__main__":
+    # python -m src.services.purge - очищення окремим процесом (cron)
+    logging.basicConfig(level=logging.INFO)
+    print(
+        asyncio.run(
+            purge_deleted(settings.purge_batch_size, settings.purge_retention_days)
+        )
+    )
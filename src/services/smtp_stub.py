@@ -0,0 +1,93 @@
+import asyncio
+import email
+from email.message import EmailMessage
+from email.policy import default
+
+OK_COMMANDS = {"HELO", "MAIL", "RCPT", "RSET", "NOOP"}
+
+
+class SMTPStub:
+    """
+    Minimal local SMTP server that accepts every message and keeps it in memory.
+    Used by the tests and the notification benchmark instead of a real mail server.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0):
+        self.host = host
+        self.port = port
+        self.latency = latency  # імітація затримки мережі/сервера на кожен лист
+        self.raw_messages: list[bytes] = []
+        self.connections = 0
+        self._server: asyncio.Server | None = None
+
+    @property
+    def messages(self) -> list[EmailMessage]:
+        # розбір тільки на вимогу - сервер не гальмує відправника під навантаженням
+        return [
+            email.message_from_bytes(raw, policy=default) for raw in self.raw_messages
+        ]
+
+    async def start(self) -> "SMTPStub":
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "SMTPStub":
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+
+        async def reply(line: str):
+            writer.write(line.encode() + b"\r\n")
+            await writer.drain()
+
+        await reply("220 stub ESMTP")
+        try:
+            while line := await reader.readline():
+                command = line.decode(errors="replace").strip().upper()
+                if command.startswith("EHLO"):
+                    await reply("250-stub\r\n250-8BITMIME\r\n250 AUTH PLAIN LOGIN")
+                elif command.startswith("AUTH"):
+                    await reply("235 2.7.0 Authentication successful")
+                elif command.startswith("DATA"):
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    lines = []
+                    while (data := await reader.readline()) not in (b".\r\n", b""):
+                        # прибираємо dot-stuffing (RFC 5321, 4.5.2)
+                        lines.append(data[1:] if data.startswith(b"..") else data)
+                    self.raw_messages.append(b"".join(lines))
+                    if self.latency:
+                        await asyncio.sleep(self.latency)
+                    await reply("250 OK")
+                elif command.startswith("QUIT"):
+                    await reply("221 Bye")
+                    break
+                elif command.split(" ", 1)[0] in OK_COMMANDS:
+                    await reply("250 OK")
+                else:
+                    await reply("502 Command not implemented")
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(port: int):
+    async with SMTPStub(port=port) as stub:
+        print(f"SMTP stub listening on {stub.host}:{stub.port}")
+        await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    # python -m src.services.smtp_stub - локальний SMTP на порту 1025 для розробки
+    asyncio.run(serve(1025))
@@ -0,0 +1,61 @@
+import base64
+from datetime import datetime
+
+from fastapi import HTTPException, Query, status
+
+from src.database.db import to_naive_utc
+
+
+class SyncToken:
+    """
+    Decoded since token: the client has every change made up to synced_until,
+    and position is (updated_at, id) of the last row it received.
+    """
+
+    def __init__(self, synced_until: datetime, position: tuple[datetime, int]):
+        self.synced_until = synced_until
+        self.position = position
+
+
+def encode_sync_token(synced_until: datetime, updated_at: datetime, row_id: int) -> str:
+    """
+    The encode_sync_token function packs the state of a sync into an opaque
+    URL-safe token.
+
+    :param synced_until: datetime: Time up to which the client has all the changes
+    :param updated_at: datetime: updated_at of the last row
+    :param row_id: int: id of the last row
+    :return: The token
+    """
+
+    raw = f"{synced_until.isoformat()}|{updated_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def sync_token(
+    since: str | None = Query(
+        None, description="next of the previous sync, empty for the first sync"
+    )
+) -> SyncToken | None:
+    """
+    The sync_token function is a dependency decoding the since token of sync endpoints.
+
+    :param since: str | None: Token returned by the previous sync
+    :return: The decoded token, None for the first sync
+    """
+
+    if not since:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(since + "=" * (-len(since) % 4)).decode()
+        synced_until, updated_at, row_id = raw.split("|")
+        # токени з часом у часовому поясі приводяться до naive UTC, як час БД
+        return SyncToken(
+            to_naive_utc(datetime.fromisoformat(synced_until)),
+            (to_naive_utc(datetime.fromisoformat(updated_at)), int(row_id)),
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Invalid sync token",
+        )
@@ -1,18 +1,21 @@
+import asyncio
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from fastapi_limiter import FastAPILimiter
 from sqlalchemy.orm import sessionmaker
 
+from benchmarks.run import create_benchmark_engine, seed
 from main import app
-from src.database.models import Base
-from src.database.db import get_db
+from src.database.models import Base, Contact
+from src.database.db import RoutingSession, get_db
+from tests.fakes import FakeRedis
 
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# з date_part, як у Postgres: create_user оновлює дайджест днів народження
+engine = create_benchmark_engine(SQLALCHEMY_DATABASE_URL)
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
@@ -24,6 +27,8 @@ def session():
     Base.metadata.create_all(bind=engine)
 
     db = TestingSessionLocal()
+    db.add_all([Contact(phone_number="0501111111"), Contact(phone_number="0502222222")])
+    db.commit()  # контакти з id 1, 2 для реєстрації юзера
     try:
         yield db
     finally:
@@ -57,3 +62,52 @@ def user():
         "contacts": [1, 2],
     }
     # тут параметри повинні відповідати схемі юзера
+
+
+@pytest.fixture
+def create_db_engine(tmp_path):
+    # create_db_engine(ім'я) -> окрема SQLite БД зі схемою, закривається після тесту
+    db_engines = []
+
+    def create_db_engine(name: str):
+        db_engine = create_benchmark_engine(f"sqlite:///{tmp_path / name}.db")
+        Base.metadata.create_all(bind=db_engine)
+        db_engines.append(db_engine)
+        return db_engine
+
+    yield create_db_engine
+    for db_engine in db_engines:
+        db_engine.dispose()
+
+
+@pytest.fixture
+def db_engine(create_db_engine):
+    # окрема БД для тестів сервісів, що відкривають власні сесії (SessionLocal)
+    return create_db_engine("service")
+
+
+@pytest.fixture
+def session_factory(db_engine):
+    return sessionmaker(
+        class_=RoutingSession, autocommit=False, autoflush=False, bind=db_engine
+    )
+
+
+@pytest.fixture
+def seed_users(session_factory):
+    # seed_users(кількість користувачів, контактів у кожного) -> id користувачів;
+    # bind - інша БД замість db_engine
+    def seed_users(users: int, contacts_per_user: int = 0, bind=None) -> list[int]:
+        factory = session_factory if bind is None else sessionmaker(bind=bind)
+        return seed(factory, users, contacts_per_user)
+
+    return seed_users
+
+
+@pytest.fixture(scope="module")
+def fake_limiter():
+    # FastAPILimiter без Redis: ліміти запитів не спрацьовують
+    previous_redis = FastAPILimiter.redis
+    asyncio.run(FastAPILimiter.init(FakeRedis()))
+    yield
+    FastAPILimiter.redis = previous_redis
@@ -0,0 +1,207 @@
+"""
+In-memory replacements of Redis and other external services shared by the tests.
+"""
+
+import asyncio
+import time
+
+from src.services.locks import EXTEND_SCRIPT, RELEASE_SCRIPT
+
+
+class FakeRedis:
+    """
+    Redis for FastAPILimiter that never throttles.
+    """
+
+    def __init__(self):
+        self.calls = 0
+
+    async def script_load(self, script: str) -> str:
+        return "test"
+
+    async def evalsha(self, sha: str, numkeys: int, *args) -> int:
+        self.calls += 1
+        return 0
+
+    async def close(self):
+        pass
+
+
+class FakeStreamRedis:
+    """
+    Redis for the outbox relay: records XADD and PUBLISH of pipelines.
+    """
+
+    def __init__(self):
+        self.streams = {}
+        self.published = []
+        self.round_trips = 0
+
+    def pipeline(self, transaction=True):
+        return FakeStreamPipeline(self)
+
+
+class FakeStreamPipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.commands = []
+
+    def xadd(self, name, fields, maxlen=None, approximate=True):
+        self.commands.append((name, fields))
+        return self
+
+    def publish(self, channel, message):
+        self.commands.append((None, (channel, message)))
+        return self
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        for name, fields in self.commands:
+            if name is None:
+                self.redis.published.append(fields)
+            else:
+                self.redis.streams.setdefault(name, []).append(fields)
+
+
+class FakePubSub:
+    """
+    Pub/sub connection of FakePubSubRedis; tests put messages into its queue.
+    """
+
+    def __init__(self):
+        self.channels = []
+        self.messages = asyncio.Queue()
+
+    async def subscribe(self, channel):
+        self.channels.append(channel)
+
+    async def unsubscribe(self, channel):
+        self.channels.remove(channel)
+
+    async def get_message(self, ignore_subscribe_messages=False, timeout=0.0):
+        return await self.messages.get()
+
+    async def close(self):
+        pass
+
+
+class FakePubSubRedis:
+    """
+    Redis with a single pub/sub connection, for ContactChangeHub.
+    """
+
+    def __init__(self):
+        self.pubsub_instance = FakePubSub()
+
+    def pubsub(self):
+        return self.pubsub_instance
+
+
+class FakeLockRedis:
+    """
+    Redis for the locks of src.services.locks: keys with px expiry and the lock scripts.
+    """
+
+    def __init__(self):
+        self.data = {}
+
+    def _alive(self, key):
+        value, expires = self.data.get(key, (None, None))
+        if expires is not None and time.monotonic() >= expires:
+            del self.data[key]
+            return None
+        return value
+
+    async def set(self, key, value, nx=False, px=None):
+        if nx and self._alive(key) is not None:
+            return None
+        self.data[key] = (value, time.monotonic() + px / 1000 if px else None)
+        return True
+
+    async def eval(self, script, numkeys, key, token, *args):
+        if self._alive(key) != token:
+            return 0
+        if script == RELEASE_SCRIPT:
+            del self.data[key]
+        elif script == EXTEND_SCRIPT:
+            self.data[key] = (token, time.monotonic() + int(args[0]) / 1000)
+        return 1
+
+
+class FakeIdempotencyRedis:
+    """
+    Redis for IdempotencyMiddleware: stored responses, locks and their release.
+    """
+
+    def __init__(self):
+        self.data = {}
+
+    async def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    async def set(self, key, value, nx=False, px=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def eval(self, script, numkeys, key, token):
+        return self.release(key, token)
+
+    def release(self, key, token):
+        # RELEASE_SCRIPT: видалення лише власником замка
+        if self.data.get(key) != token:
+            return 0
+        del self.data[key]
+        return 1
+
+    def pipeline(self, transaction=True):
+        return FakeIdempotencyPipeline(self)
+
+
+class FakeIdempotencyPipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    def hset(self, key, mapping):
+        self.commands.append(lambda: self.redis.data.__setitem__(key, encode(mapping)))
+
+    def expire(self, key, seconds):
+        pass
+
+    def eval(self, script, numkeys, key, token):
+        self.commands.append(lambda: self.redis.release(key, token))
+
+    async def execute(self):
+        for command in self.commands:
+            command()
+
+
+def encode(mapping):
+    # Redis повертає ключі і значення хешу як bytes
+    return {
+        key.encode(): value if isinstance(value, bytes) else str(value).encode()
+        for key, value in mapping.items()
+    }
+
+
+class FakeSession:
+    """
+    Session of single_flight tests: only the attributes the decorator reads.
+    """
+
+    def __init__(self, wrote=False):
+        self.info = {"wrote": wrote}
@@ -0,0 +1,137 @@
+import asyncio
+import time
+
+import httpx
+from sqlalchemy import create_engine, text
+from starlette.applications import Starlette
+from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware import Middleware
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from main import app as main_app
+from src.database.db import TimedQueuePool, pool_wait_observers
+from src.services.admission import (
+    BULK,
+    CRITICAL,
+    NORMAL,
+    AdmissionController,
+    AdmissionMiddleware,
+)
+
+
+def test_waiting_request_gets_released_slot():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, target=0.01, interval=1)
+        assert await controller.acquire(NORMAL)
+        waiting = asyncio.create_task(controller.acquire(NORMAL))
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+        controller.release()
+        assert await waiting
+        assert controller.in_flight == 1
+        controller.release()
+        assert controller.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_queue_timeout_is_cut_when_overloaded():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, target=0.01, interval=0.05)
+        assert await controller.acquire(NORMAL)
+        start = time.monotonic()
+        assert not await controller.acquire(NORMAL)  # чекав цілий interval
+        assert time.monotonic() - start >= 0.05
+        # черга не спорожніла за інтервал - мінімальна затримка вище target
+        controller.queue_delay.observe(0.05)
+        await asyncio.sleep(0.06)
+        controller.queue_delay.observe(0.05)
+        assert controller.overloaded()
+        assert not await controller.acquire(BULK)  # масові запити - одразу 503
+        start = time.monotonic()
+        assert not await controller.acquire(NORMAL)
+        assert time.monotonic() - start < 0.04  # чекав лише target
+        assert not controller.waiters
+
+    asyncio.run(scenario())
+
+
+def test_critical_requests_go_first():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, target=0.01, interval=1)
+        assert await controller.acquire(NORMAL)
+        order = []
+
+        async def request(priority):
+            await controller.acquire(priority)
+            order.append(priority)
+
+        normal = asyncio.create_task(request(NORMAL))
+        await asyncio.sleep(0)
+        critical = asyncio.create_task(request(CRITICAL))
+        await asyncio.sleep(0)
+        controller.release()
+        await critical
+        controller.release()
+        await normal
+        assert order == [CRITICAL, NORMAL]
+
+    asyncio.run(scenario())
+
+
+def test_middleware_sheds_with_retry_after():
+    async def slow(request):
+        await asyncio.sleep(0.1)
+        return JSONResponse({"ok": True})
+
+    app = Starlette(
+        routes=[Route("/slow", slow), Route("/metrics", slow)],
+        middleware=[
+            Middleware(CORSMiddleware, allow_origins=["*"]),
+            Middleware(
+                AdmissionMiddleware,
+                max_in_flight=1,
+                target=0.01,
+                interval=0.02,
+                retry_after=2,
+                exempt_paths={"/metrics"},
+            ),
+        ],
+    )
+
+    async def scenario(path):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as ac:
+            headers = {"Origin": "http://client"}
+            return await asyncio.gather(
+                ac.get(path, headers=headers), ac.get(path, headers=headers)
+            )
+
+    responses = asyncio.run(scenario("/slow"))
+    assert sorted(response.status_code for response in responses) == [200, 503]
+    shed = next(response for response in responses if response.status_code == 503)
+    assert shed.headers["Retry-After"] == "2"
+    # браузер бачить саму 503, а не помилку CORS
+    assert shed.headers["access-control-allow-origin"] == "*"
+    exempt = asyncio.run(scenario("/metrics"))
+    assert [response.status_code for response in exempt] == [200, 200]
+
+
+def test_cors_wraps_admission():
+    middleware = [item.cls for item in main_app.user_middleware]
+    assert middleware.index(CORSMiddleware) < middleware.index(AdmissionMiddleware)
+
+
+def test_pool_reports_wait(tmp_path):
+    waits = []
+    pool_wait_observers.append(waits.append)
+    try:
+        engine = create_engine(
+            f"sqlite:///{tmp_path / 'pool.db'}", poolclass=TimedQueuePool
+        )
+        with engine.connect() as connection:
+            connection.execute(text("select 1"))
+    finally:
+        pool_wait_observers.remove(waits.append)
+    assert len(waits) == 1 and waits[0] >= 0
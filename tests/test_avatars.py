@@ -0,0 +1,57 @@
+import asyncio
+
+import httpx
+
+from src.database.models import User
+from src.services import avatars
+from src.services.avatars import avatar_provider, gravatar_url
+
+EMAIL_HASH = "f3ada405ce890b6f8204094deb12d8a8"  # md5("foo@bar.com")
+
+
+def gravatar(status_code: int) -> httpx.AsyncClient:
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.method == "HEAD"
+        assert request.url.params["d"] == "404"
+        return httpx.Response(status_code)
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_gravatar_url_is_local_and_cached():
+    gravatar_url.cache_clear()
+    url = avatar_provider.url(" Foo@Bar.com ")
+    assert url == f"https://www.gravatar.com/avatar/{EMAIL_HASH}"
+    assert avatar_provider.url("foo@bar.com") == url
+    assert gravatar_url.cache_info().hits == 1
+
+
+def test_gravatar_exists():
+    assert asyncio.run(avatar_provider.exists("foo@bar.com", gravatar(200))) is True
+    assert asyncio.run(avatar_provider.exists("foo@bar.com", gravatar(404))) is False
+    assert asyncio.run(avatar_provider.exists("foo@bar.com", gravatar(503))) is None
+
+    def unreachable(request):
+        raise httpx.ConnectError("no network")
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(unreachable))
+    assert asyncio.run(avatar_provider.exists("foo@bar.com", client)) is None
+
+
+def test_verify_avatar(session_factory, seed_users, monkeypatch):
+    first, second = seed_users(2)
+    monkeypatch.setattr(avatars, "SessionLocal", session_factory)
+
+    with session_factory() as db:
+        emails = [db.get(User, user_id).email for user_id in (first, second)]
+        db.get(User, first).avatar = avatar_provider.url(emails[0])
+        db.get(User, second).avatar = "https://res.cloudinary.com/own.png"
+        db.commit()
+
+    for email in emails:
+        asyncio.run(avatars.verify_avatar(email, gravatar(404)))
+
+    with session_factory() as db:
+        assert db.get(User, first).avatar == avatar_provider.fallback_url(emails[0])
+        # власна аватарка не замінюється
+        assert db.get(User, second).avatar == "https://res.cloudinary.com/own.png"
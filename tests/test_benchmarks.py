@@ -0,0 +1,54 @@
+from benchmarks.notifications import run_notifications_benchmark
+from benchmarks.run import compare, run_benchmark
+from benchmarks.schemas import run_schemas_benchmark
+from benchmarks.serialization import run_serialization_benchmark
+
+
+def test_run_benchmark_smoke():
+    report = run_benchmark(
+        users=3, contacts_per_user=2, requests=2, login_requests=1, concurrency=2
+    )
+    assert set(report["scenarios"]) == {
+        "login",
+        "users_me",
+        "get_user",
+        "get_users_batch",
+        "get_contacts_batch",
+        "list_users",
+        "list_users_sparse",
+        "list_contacts",
+        "birthdays",
+        "batch_mobile_start",
+        "bulk_update_user_contacts",
+    }
+    for result in report["scenarios"].values():
+        assert result["errors"] == 0
+        assert result["p50_ms"] <= result["p99_ms"]
+
+
+def test_compare_reports_regression():
+    baseline = {
+        "scenarios": {"login": {"p99_ms": 100.0}, "birthdays": {"p99_ms": 10.0}}
+    }
+    report = {"scenarios": {"login": {"p99_ms": 110.0}, "birthdays": {"p99_ms": 13.0}}}
+    regressions = compare(report, baseline, max_regression=0.2)
+    assert regressions == ["birthdays: p99 13.0 ms > baseline 10.0 ms"]
+
+
+def test_serialization_paths_produce_same_json():
+    report = run_serialization_benchmark(
+        users=3, contacts_per_user=2, limit=10, repeat=1
+    )
+    assert report["outputs_equal"] is True
+
+
+def test_schemas_benchmark_smoke():
+    report = run_schemas_benchmark(users=2, contacts_per_user=2, repeat=1)
+    assert report["meta"]["pydantic"].startswith("2.")
+    assert report["users_validate"]["p50_ms"] > 0
+
+
+def test_notifications_benchmark_smoke():
+    report = run_notifications_benchmark(users=20, pool_size=2, concurrency=4)
+    assert report["summary"]["failed"] == 0
+    assert report["summary"]["smtp_connections"] <= 2
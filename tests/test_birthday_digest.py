@@ -0,0 +1,71 @@
+import asyncio
+from datetime import date, timedelta
+
+from src.database.models import BirthdayDigest, User
+from src.repository import users as repository_users
+from src.schemas import UserModel
+
+
+def by_id(users: list[dict]) -> list[dict]:
+    return sorted(users, key=lambda user: user["id"])
+
+
+def test_birthday_digest(session_factory, seed_users):
+    user_ids = seed_users(40, 1)
+
+    with session_factory() as db:
+        expected = asyncio.run(repository_users.find_next_7_days_birthdays_as_dicts(db))
+        # без дайджесту запит лише читає
+        digest = asyncio.run(repository_users.get_birthday_digest_as_dicts(db))
+        assert expected
+        assert by_id(digest) == by_id(expected)
+        assert db.get(BirthdayDigest, date.today()) is None
+
+        assert asyncio.run(repository_users.refresh_birthday_digest(db)) == len(
+            expected
+        )
+        digest = asyncio.run(repository_users.get_birthday_digest_as_dicts(db))
+        assert by_id(digest) == by_id(expected)
+
+        user = db.get(User, user_ids[0])
+        for day in (
+            date.today() + timedelta(days=3),
+            date.today() + timedelta(days=60),
+        ):
+            body = UserModel(
+                name=user.name,
+                last_name=user.last_name,
+                day_of_born=day.replace(year=1990),
+                email=user.email,
+                description=user.description,
+                password=user.password,
+                contacts=[],
+            )
+            asyncio.run(repository_users.update_user(user.id, body, db, user))
+            expected = asyncio.run(
+                repository_users.find_next_7_days_birthdays_as_dicts(db)
+            )
+            digest = asyncio.run(repository_users.get_birthday_digest_as_dicts(db))
+            assert by_id(digest) == by_id(expected)
+
+
+def test_created_user_gets_into_digest(session_factory, seed_users):
+    seed_users(5)
+
+    with session_factory() as db:
+        asyncio.run(repository_users.refresh_birthday_digest(db))
+        body = UserModel(
+            name="new",
+            last_name="new",
+            day_of_born=(date.today() + timedelta(days=2)).replace(year=1990),
+            email="new@example.com",
+            description="new user",
+            password="password",
+            contacts=[],
+        )
+        user = asyncio.run(repository_users.create_user(body, db))
+        # новий користувач з'являється в дайджесті одразу, а не після оновлення
+        digest = asyncio.run(repository_users.get_birthday_digest_as_dicts(db))
+        assert user.id in [row["id"] for row in digest]
+        expected = asyncio.run(repository_users.find_next_7_days_birthdays_as_dicts(db))
+        assert by_id(digest) == by_id(expected)
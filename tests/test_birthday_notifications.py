@@ -0,0 +1,64 @@
+import asyncio
+
+from src.services.notifications import SMTPPool, send_birthday_notifications
+from src.services.smtp_stub import SMTPStub
+
+
+def test_send_birthday_notifications(session_factory, seed_users):
+    seed_users(60)
+
+    async def run():
+        async with SMTPStub() as stub:
+            pool = SMTPPool(stub.host, stub.port, size=3)
+            with session_factory() as db:
+                summary = await send_birthday_notifications(
+                    db, pool, concurrency=8, chunk_size=7
+                )
+            await pool.close()
+            return summary, stub
+
+    summary, stub = asyncio.run(run())
+    assert summary["recipients"] == 60
+    assert summary["failed"] == 0
+    assert summary["sent"] == 60 - summary["skipped"] == len(stub.raw_messages) > 0
+    assert stub.connections <= 3  # з'єднання перевикористовуються
+    message = stub.messages[0]
+    assert message["Subject"] == "Upcoming birthdays"
+    assert "<li>" in message.get_body(("html",)).get_content()
+
+
+def test_send_birthday_notifications_smtp_down(session_factory, seed_users):
+    seed_users(10)
+
+    async def run():
+        stub = await SMTPStub().start()
+        port = stub.port
+        await stub.stop()  # порт закрито - з'єднання відхиляються
+        pool = SMTPPool("127.0.0.1", port, size=2, timeout=1)
+        with session_factory() as db:
+            return await send_birthday_notifications(db, pool, concurrency=2)
+
+    summary = asyncio.run(run())
+    assert summary["sent"] == 0
+    assert summary["failed"] == summary["recipients"] - summary["skipped"] > 0
+
+
+def test_send_birthday_notifications_worker_survives_errors(
+    session_factory, seed_users
+):
+    seed_users(20)
+
+    class BrokenPool:
+        async def send(self, message):
+            raise RuntimeError("template error")
+
+    async def run():
+        with session_factory() as db:
+            # воркерів менше, ніж отримувачів, і черга мала - без обробки зависло б
+            return await asyncio.wait_for(
+                send_birthday_notifications(db, BrokenPool(), concurrency=2), 10
+            )
+
+    summary = asyncio.run(run())
+    assert summary["sent"] == 0
+    assert summary["failed"] == summary["recipients"] - summary["skipped"] > 0
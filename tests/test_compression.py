@@ -0,0 +1,70 @@
+import gzip
+import zlib
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from src.services.compression import CompressionMiddleware, choose_encoding
+
+BODY = "contact " * 200
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=500, cache_size=2)
+
+
+@app.get("/text")
+def text():
+    return PlainTextResponse(BODY)
+
+
+@app.get("/stream")
+def stream():
+    def chunks():
+        for _ in range(3):
+            yield BODY
+
+    return StreamingResponse(chunks(), media_type="text/event-stream")
+
+
+@app.get("/encoded")
+def encoded():
+    return PlainTextResponse(
+        gzip.compress(BODY.encode()), headers={"Content-Encoding": "gzip"}
+    )
+
+
+client = TestClient(app)
+
+
+def test_choose_encoding():
+    assert choose_encoding("gzip, deflate, br") == "br"
+    assert choose_encoding("gzip, br;q=0") == "gzip"
+    assert choose_encoding("deflate") is None
+    assert choose_encoding("") is None
+
+
+def test_brotli_and_cache():
+    response = client.get("/text", headers={"Accept-Encoding": "br"})
+    assert response.headers["content-encoding"] == "br"
+    assert response.text == BODY
+    client.get("/text", headers={"Accept-Encoding": "br"})
+    middleware = app.middleware_stack.app
+    assert middleware.cache.misses == 1
+    assert middleware.cache.hits == 1
+
+
+def test_streaming_gzip():
+    with client.stream(
+        "GET", "/stream", headers={"Accept-Encoding": "gzip"}
+    ) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        raw = b"".join(response.iter_raw())
+    assert zlib.decompress(raw, 16 + zlib.MAX_WBITS).decode() == BODY * 3
+
+
+def test_already_encoded_passthrough():
+    response = client.get("/encoded", headers={"Accept-Encoding": "br"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.text == BODY
@@ -0,0 +1,66 @@
+import asyncio
+
+from src.repository.changes import record_change
+from src.services import outbox
+from src.services.contact_events import (
+    RESYNC,
+    ContactChangeHub,
+    contact_event_stream,
+)
+from tests.fakes import FakePubSubRedis
+
+
+def test_hub_fan_out():
+    async def scenario():
+        redis = FakePubSubRedis()
+        pubsub = redis.pubsub_instance
+        hub = ContactChangeHub(redis, queue_size=2)
+        async with hub.listen(1) as first, hub.listen(1) as second:
+            assert pubsub.channels == ["contacts:1"]  # одна підписка на воркер
+            await pubsub.messages.put({"channel": b"contacts:1", "data": b"{}"})
+            assert await asyncio.wait_for(first.get(), 1) == b"{}"
+            assert await asyncio.wait_for(second.get(), 1) == b"{}"
+            for _ in range(3):  # черга на 2 повідомлення переповнюється
+                hub.publish_local(1, b"{}")
+            assert first.qsize() == 1
+            assert first.get_nowait() is RESYNC
+        assert pubsub.channels == []
+        assert hub.listeners == {}
+        await hub.close()
+
+    asyncio.run(scenario())
+
+
+def test_contact_event_stream():
+    async def scenario():
+        hub = ContactChangeHub(FakePubSubRedis())
+        stream = contact_event_stream(hub, 7, keepalive=0.01)
+        assert await anext(stream) == "event: ready\ndata: {}\n\n"
+        assert await anext(stream) == ": keep-alive\n\n"
+        hub.publish_local(7, b'{"id": 1}')
+        assert await anext(stream) == 'event: contact\ndata: {"id": 1}\n\n'
+        hub.publish_local(7, RESYNC)
+        assert await anext(stream) == "event: resync\ndata: {}\n\n"
+        await stream.aclose()
+        assert hub.listeners == {}
+        await hub.close()
+
+    asyncio.run(scenario())
+
+
+def test_commit_wakes_relay(session_factory, monkeypatch):
+
+    async def scenario():
+        wakeup = asyncio.Event()
+        monkeypatch.setattr(
+            outbox, "_relay_wakeup", (asyncio.get_running_loop(), wakeup)
+        )
+        with session_factory() as db:
+            db.commit()  # без подій релей не будиться
+            await asyncio.sleep(0)
+            assert not wakeup.is_set()
+            await record_change("contact", 1, "updated", db)
+            db.commit()
+        await asyncio.wait_for(wakeup.wait(), 1)
+
+    asyncio.run(scenario())
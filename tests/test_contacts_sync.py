@@ -0,0 +1,169 @@
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from src.database.db import db_now
+from src.database.models import Contact, User
+from src.repository import users as repository_users
+from src.schemas import UserModel
+from src.services.auth import auth_service
+from src.services.sync import encode_sync_token, sync_token
+
+
+@pytest.fixture(scope="module")
+def headers(session, fake_limiter):
+    user = User(
+        name="sync",
+        last_name="sync",
+        day_of_born=date(2000, 1, 1),
+        email="sync@example.com",
+        password="password",
+        confirmed=True,
+    )
+    session.add(user)
+    session.commit()
+    token = asyncio.run(auth_service.create_access_token(data={"sub": user.email}))
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(autouse=True)
+def no_settle(monkeypatch):
+    monkeypatch.setattr("src.routes.contacts.settings.changes_settle_seconds", 0)
+
+
+def sync(client, headers, since=None, limit=500):
+    params = {"limit": limit}
+    if since is not None:
+        params["since"] = since
+    response = client.get("/api/contacts/sync", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_sync_contacts(client, session, headers):
+    user = session.query(User).filter(User.email == "sync@example.com").one()
+    # у БД (SQLite) now() - це UTC
+    start = datetime.utcnow() - timedelta(minutes=1)
+    contacts = [
+        Contact(phone_number=f"050000000{i}", user_id=user.id, updated_at=start)
+        for i in range(3)
+    ]
+    session.add_all(contacts)
+    session.add(Contact(phone_number="0509999999", updated_at=start))  # чужий
+    session.commit()
+    ids = [contact.id for contact in contacts]
+
+    first = sync(client, headers, limit=2)
+    assert first["has_more"] is True
+    second = sync(client, headers, first["next"], limit=2)
+    assert second["has_more"] is False
+    synced = first["contacts"] + second["contacts"]
+    assert sorted(contact["id"] for contact in synced) == sorted(ids)
+
+    updated, deleted = session.get(Contact, ids[0]), session.get(Contact, ids[1])
+    updated.phone_number = "0501234567"
+    updated.updated_at = start + timedelta(seconds=1)
+    deleted.deleted_at = deleted.updated_at = start + timedelta(seconds=2)
+    session.commit()
+
+    delta = sync(client, headers, second["next"])
+    assert delta["contacts"] == [{"id": ids[0], "phone_number": "0501234567"}]
+    assert delta["deleted"] == [ids[1]]
+
+    empty = sync(client, headers, delta["next"])
+    assert empty["contacts"] == empty["deleted"] == []
+    assert empty["has_more"] is False
+    assert sync_token(empty["next"]).position == sync_token(delta["next"]).position
+
+
+def test_sync_detached_contacts(client, session, headers):
+    first = sync(client, headers)
+    user = session.query(User).filter(User.email == "sync@example.com").one()
+    ids = sorted(contact.id for contact in user.contacts)
+    body = UserModel(
+        name=user.name,
+        last_name=user.last_name,
+        day_of_born=user.day_of_born,
+        email=user.email,
+        description="sync",
+        password=user.password,
+        contacts=ids[1:],
+    )
+    asyncio.run(repository_users.update_user(user.id, body, session, user))
+
+    # контакт більше не належить користувачу - клієнт отримує його як видалений
+    delta = sync(client, headers, first["next"])
+    # поруч може бути tombstone контакту, видаленого в test_sync_contacts
+    assert ids[0] in delta["deleted"]
+    assert ids[0] not in [contact["id"] for contact in delta["contacts"]]
+    assert sync(client, headers, delta["next"])["deleted"] == []
+
+
+def test_sync_invalid_token(client, headers):
+    response = client.get(
+        "/api/contacts/sync", params={"since": "???"}, headers=headers
+    )
+    assert response.status_code == 422
+    expired = encode_sync_token(datetime(2000, 1, 1), datetime(2000, 1, 1), 1)
+    response = client.get(
+        "/api/contacts/sync", params={"since": expired}, headers=headers
+    )
+    assert response.status_code == 410
+
+
+def test_db_now_is_naive_utc(session):
+    assert db_now(session).tzinfo is None
+
+    class PostgresSession:
+        def scalar(self, statement):
+            return datetime(2024, 1, 1, 3, tzinfo=timezone(timedelta(hours=3)))
+
+    assert db_now(PostgresSession()) == datetime(2024, 1, 1)
+
+
+def test_sync_token_with_aware_time(client, headers):
+    kyiv = timezone(timedelta(hours=3))
+    synced_until = datetime.now(kyiv)
+    token = encode_sync_token(synced_until, datetime(2000, 1, 1), 1)
+    # час у часовому поясі (now() Postgres) порівнюється як naive UTC
+    assert sync_token(token).synced_until == synced_until.astimezone(
+        timezone.utc
+    ).replace(tzinfo=None)
+    assert sync(client, headers, token)["next"]
+    expired = encode_sync_token(
+        datetime(2000, 1, 1, tzinfo=kyiv), datetime(2000, 1, 1), 1
+    )
+    response = client.get(
+        "/api/contacts/sync", params={"since": expired}, headers=headers
+    )
+    assert response.status_code == 410
+
+
+def test_sync_without_changes_keeps_token_fresh(client, session, headers):
+    user = User(
+        name="quiet",
+        last_name="quiet",
+        day_of_born=date(2000, 1, 1),
+        email="quiet@example.com",
+        password="password",
+        confirmed=True,
+    )
+    session.add(user)
+    session.commit()
+    # єдина зміна старіша за retention, але клієнт синхронізується регулярно
+    old = datetime(2000, 1, 1)
+    contact = Contact(phone_number="0507777777", user_id=user.id, updated_at=old)
+    session.add(contact)
+    session.commit()
+    contact_id = contact.id
+    token = asyncio.run(auth_service.create_access_token(data={"sub": user.email}))
+    quiet_headers = {"Authorization": f"Bearer {token}"}
+
+    first = sync(client, quiet_headers)
+    assert [row["id"] for row in first["contacts"]] == [contact_id]
+    result = sync(client, quiet_headers, first["next"])
+    assert result["contacts"] == result["deleted"] == []
+    next_token = sync_token(result["next"])
+    assert next_token.position == (old, contact_id)
+    assert next_token.synced_until > datetime.now() - timedelta(days=1)
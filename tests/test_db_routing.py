@@ -0,0 +1,127 @@
+import asyncio
+import threading
+
+import pytest
+from sqlalchemy import select, text, update
+from sqlalchemy.exc import OperationalError
+
+from src.database import db as database
+from src.database.db import (
+    DBRoute,
+    QueryStats,
+    choose_replica,
+    db_route,
+    query_stats,
+    reads_from_replica,
+    replica_reads,
+    run_db_call,
+)
+from src.database.models import User
+from src.repository import users as repository_users
+
+EMAIL = "user0@example.com"
+
+
+@pytest.fixture
+def replica_engines(create_db_engine, db_engine, seed_users, monkeypatch):
+    replica_engines = [create_db_engine("replica1"), create_db_engine("replica2")]
+    for name, bind in zip(
+        ("primary", "replica1", "replica2"), [db_engine, *replica_engines]
+    ):
+        seed_users(1, bind=bind)
+        with bind.begin() as connection:
+            # за ім'ям видно, з якої БД прочитано користувача
+            connection.execute(update(User).values(name=name))
+    monkeypatch.setattr(database, "replica_engines", replica_engines)
+    return replica_engines
+
+
+def find_name(db) -> str:
+    return asyncio.run(repository_users.find_user_by_email(EMAIL, db)).name
+
+
+@pytest.mark.usefixtures("replica_engines")
+def test_reads_from_replica(session_factory):
+    with session_factory() as db:
+        assert find_name(db).startswith("replica")
+        # запити поза reads_from_replica функціями йдуть в основну БД
+        assert db.scalar(select(User.name)) == "primary"
+
+
+@pytest.mark.usefixtures("replica_engines")
+def test_read_your_writes(session_factory):
+    with session_factory() as db:
+        db.execute(update(User).values(description="changed"))
+        assert db.info["wrote"]
+        assert find_name(db) == "primary"
+
+
+@pytest.mark.usefixtures("replica_engines")
+def test_read_before_write_uses_primary(session_factory):
+    with session_factory() as db:
+        user = asyncio.run(repository_users.update_avatar(EMAIL, "avatar.png", db))
+        assert user.name == "primary"
+
+
+@pytest.mark.usefixtures("replica_engines")
+def test_sticky_request_reads_primary(session_factory):
+    token = db_route.set(DBRoute(sticky=True))
+    try:
+        with session_factory() as db:
+            assert find_name(db) == "primary"
+    finally:
+        db_route.reset(token)
+
+
+@pytest.mark.usefixtures("replica_engines")
+def test_write_marks_request(session_factory):
+    route = DBRoute()
+    token = db_route.set(route)
+    try:
+        with session_factory() as db:
+            db.execute(update(User).values(description="changed"))
+            db.commit()
+    finally:
+        db_route.reset(token)
+    assert route.wrote
+
+
+def test_choose_replica(replica_engines):
+    first, second = replica_engines
+    assert {choose_replica(), choose_replica()} == {first, second}
+    with first.connect():
+        assert [choose_replica() for _ in range(3)] == [second] * 3
+
+
+def test_run_db_call_uses_thread_pool():
+    @reads_from_replica
+    async def query(value):
+        return value, threading.get_ident(), replica_reads.get()
+
+    value, thread, use_replica = asyncio.run(run_db_call(query, 1))
+    assert value == 1 and use_replica is True
+    assert thread != threading.get_ident()  # цикл подій не блокується запитом
+
+
+def test_run_db_call_rejects_real_async_io():
+    async def query():
+        await asyncio.sleep(0)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(run_db_call(query))
+
+
+def test_failed_statement_leaves_no_timing(db_engine):
+    stats = QueryStats()
+    token = query_stats.set(stats)
+    try:
+        with db_engine.connect() as connection:
+            with pytest.raises(OperationalError):
+                connection.execute(text("SELECT * FROM missing_table"))
+            connection.execute(text("SELECT 1"))
+            # час старту не лишається в з'єднанні, що повертається в пул
+            assert "query_start_time" not in connection.info
+    finally:
+        query_stats.reset(token)
+    assert stats.count == 1
+    assert stats.slowest_statement == "SELECT 1"
@@ -0,0 +1,123 @@
+import asyncio
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from main import app
+from src.database.models import Contact
+from src.services.idempotency import IdempotencyMiddleware
+from tests.fakes import FakeIdempotencyRedis
+
+
+@pytest.fixture
+def idempotency_redis(monkeypatch, fake_limiter):
+    redis = FakeIdempotencyRedis()
+    monkeypatch.setattr(app.state, "redis", redis, raising=False)
+    return redis
+
+
+def test_create_contact_retry(client, session, idempotency_redis):
+    headers = {"Idempotency-Key": "create-contact-1"}
+    body = {"phone_number": "0507777777"}
+    first = client.post("/api/contacts/", json=body, headers=headers)
+    retry = client.post("/api/contacts/", json=body, headers=headers)
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+    assert session.query(Contact).filter_by(phone_number="0507777777").count() == 1
+
+    other = client.post(
+        "/api/contacts/", json={"phone_number": "0508888888"}, headers=headers
+    )
+    assert other.status_code == 422
+
+
+def make_app(handler, **options):
+    async def endpoint(request):
+        return await handler(request)
+
+    test_app = Starlette(
+        routes=[Route("/items", endpoint, methods=["POST"])],
+        middleware=[
+            Middleware(
+                IdempotencyMiddleware,
+                paths={("POST", "/items")},
+                poll_interval=0.01,
+                **options,
+            )
+        ],
+    )
+    test_app.state.redis = FakeIdempotencyRedis()
+    return test_app
+
+
+async def post(asgi_app, key="key-1", body=b"{}"):
+    transport = httpx.ASGITransport(app=asgi_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        return await ac.post("/items", content=body, headers={"Idempotency-Key": key})
+
+
+def test_concurrent_duplicates_run_once():
+    calls = []
+
+    async def handler(request):
+        calls.append(await request.body())
+        await asyncio.sleep(0.1)
+        return JSONResponse({"call": len(calls)}, 201)
+
+    asgi_app = make_app(handler)
+
+    async def scenario():
+        return await asyncio.gather(*(post(asgi_app) for _ in range(3)))
+
+    responses = asyncio.run(scenario())
+    assert calls == [b"{}"]  # тіло передане застосунку
+    assert [response.status_code for response in responses] == [201] * 3
+    assert [response.json() for response in responses] == [{"call": 1}] * 3
+
+
+def test_in_flight_timeout():
+    async def handler(request):
+        await asyncio.sleep(0.3)
+        return JSONResponse({})
+
+    asgi_app = make_app(handler, wait_seconds=0.05)
+
+    async def scenario():
+        return await asyncio.gather(post(asgi_app), post(asgi_app))
+
+    statuses = sorted(response.status_code for response in asyncio.run(scenario()))
+    assert statuses == [200, 409]
+
+
+def test_server_error_is_not_stored():
+    calls = []
+
+    async def handler(request):
+        calls.append(1)
+        return JSONResponse({}, 503 if len(calls) == 1 else 200)
+
+    asgi_app = make_app(handler)
+    assert asyncio.run(post(asgi_app)).status_code == 503
+    assert asyncio.run(post(asgi_app)).status_code == 200
+    assert len(calls) == 2
+    assert asyncio.run(post(asgi_app)).status_code == 200
+    assert len(calls) == 2
+
+
+def test_expired_lock_of_retry_is_kept():
+    async def handler(request):
+        redis = request.app.state.redis
+        # замок цього запиту прострочився, і його вже взяв повтор
+        lock_key = next(key for key in redis.data if key.endswith(":lock"))
+        redis.data[lock_key] = "retry-token"
+        return JSONResponse({}, 503)
+
+    asgi_app = make_app(handler)
+    assert asyncio.run(post(asgi_app)).status_code == 503
+    assert list(asgi_app.state.redis.data.values()) == ["retry-token"]
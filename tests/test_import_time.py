@@ -0,0 +1,37 @@
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# модулі, які завантажуються тільки при першому використанні
+LAZY_MODULES = {"cloudinary", "fastapi_mail", "passlib"}
+
+# межа з запасом для повільних CI; локально імпорт main займає близько 1.2 с
+IMPORT_TIME_BUDGET = 3.0
+
+
+def import_main() -> dict[str, int]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    # рядки виду "import time:  self [us] | cumulative | module"
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, total, module = line[len("import time:") :].split("|")
+        cumulative[module.strip()] = int(total)
+    return cumulative
+
+
+def test_import_main_is_lazy():
+    cumulative = import_main()
+    assert "main" in cumulative
+    assert not LAZY_MODULES & cumulative.keys()
+    assert cumulative["main"] / 1_000_000 < IMPORT_TIME_BUDGET
@@ -0,0 +1,51 @@
+import asyncio
+
+from src.services.locks import acquire_lock, release_lock, run_as_leader
+from tests.fakes import FakeLockRedis
+
+
+def test_release_lock_keeps_lock_of_other_owner():
+    async def run():
+        redis_client = FakeLockRedis()
+        assert await acquire_lock(redis_client, "lock", "first", 30)
+        assert not await acquire_lock(redis_client, "lock", "second", 30)
+        assert not await release_lock(redis_client, "lock", "second")
+        assert await release_lock(redis_client, "lock", "first")
+        assert await acquire_lock(redis_client, "lock", "second", 30)
+
+    asyncio.run(run())
+
+
+def test_run_as_leader_runs_job_in_one_worker():
+    running = []
+
+    async def job(worker):
+        running.append(worker)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            running.remove(worker)
+
+    async def run():
+        redis_client = FakeLockRedis()
+        workers = [
+            asyncio.create_task(run_as_leader(redis_client, "job", 0.15, job, worker))
+            for worker in range(3)
+        ]
+        await asyncio.sleep(0.4)  # замок продовжується довше за свій ttl
+        assert len(running) == 1
+        leader = running[0]
+
+        workers[leader].cancel()  # воркер зупинився - задачу перехоплює інший
+        await asyncio.gather(workers[leader], return_exceptions=True)
+        assert running == []
+        await asyncio.sleep(0.2)
+        assert len(running) == 1 and running[0] != leader
+
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        assert running == []
+        assert redis_client.data == {}
+
+    asyncio.run(run())
@@ -0,0 +1,195 @@
+import asyncio
+from datetime import date, datetime, timedelta
+
+import orjson
+from sqlalchemy import select
+
+from src.database.models import ChangeEvent, Contact, User
+from src.repository import changes as repository_changes
+from src.repository import contacts as repository_contacts
+from src.repository import users as repository_users
+from src.schemas import ChangesPage, ContactModel, UserModel
+from src.services.auth import auth_service
+from src.services.outbox import relay_changes
+from tests.fakes import FakeStreamRedis
+
+
+def test_outbox_relay(session_factory, seed_users):
+    user_id = seed_users(1)[0]
+    redis = FakeStreamRedis()
+
+    with session_factory() as db:
+        user = db.get(User, user_id)
+        contact = asyncio.run(
+            repository_contacts.create_contact(ContactModel(phone_number="0501"), db)
+        )
+        new_user = asyncio.run(
+            repository_users.create_user(
+                UserModel(
+                    name="outbox",
+                    last_name="outbox",
+                    day_of_born=date(1990, 1, 1),
+                    email="outbox@example.com",
+                    description="outbox user",
+                    password="password",
+                    contacts=[contact.id],
+                ),
+                db,
+            )
+        )
+        asyncio.run(repository_users.remove_user(user.id, db, user))
+
+        changes = asyncio.run(repository_changes.get_changes_as_dicts(0, 10, 0, db))
+        assert [(c["entity"], c["entity_id"], c["action"]) for c in changes] == [
+            ("contact", contact.id, "created"),
+            ("user", new_user.id, "created"),
+            ("user", user_id, "deleted"),
+        ]
+        # курсор: тільки події після since
+        after = asyncio.run(
+            repository_changes.get_changes_as_dicts(changes[0]["id"], 10, 0, db)
+        )
+        assert after == changes[1:]
+        # ще "не усталені" події не віддаються
+        assert asyncio.run(repository_changes.get_changes_as_dicts(0, 10, 60, db)) == []
+
+        assert asyncio.run(relay_changes(db, redis, batch_size=2)) == 2
+        assert asyncio.run(relay_changes(db, redis, batch_size=2)) == 1
+        assert asyncio.run(relay_changes(db, redis, batch_size=2)) == 0
+        assert redis.round_trips == 2  # одна пачка - один запит до Redis
+        assert [int(event["id"]) for event in redis.streams["changes"]] == [
+            change["id"] for change in changes
+        ]
+        # контакт прив'язаний до нового користувача - сповіщення в його канал
+        assert redis.published == [
+            (
+                f"contacts:{new_user.id}",
+                orjson.dumps(
+                    {
+                        "id": changes[0]["id"],
+                        "contact_id": contact.id,
+                        "action": "created",
+                    }
+                ),
+            )
+        ]
+        assert (
+            db.scalars(
+                select(ChangeEvent).where(ChangeEvent.published_at.is_(None))
+            ).all()
+            == []
+        )
+
+        purged = asyncio.run(
+            repository_changes.purge_published_changes(
+                datetime.now() + timedelta(seconds=1), 10, db
+            )
+        )
+        assert purged == 3
+
+
+def test_outbox_relay_detached_contact(session_factory, seed_users):
+    user_id = seed_users(1, 2)[0]
+    redis = FakeStreamRedis()
+
+    with session_factory() as db:
+        user = db.get(User, user_id)
+        kept, detached = sorted(contact.id for contact in user.contacts)
+        body = UserModel(
+            name=user.name,
+            last_name=user.last_name,
+            day_of_born=user.day_of_born,
+            email=user.email,
+            description=user.description,
+            password=user.password,
+            contacts=[kept],
+        )
+        asyncio.run(repository_users.update_user(user.id, body, db, user))
+        asyncio.run(relay_changes(db, redis))
+
+    # у контакту вже немає власника, але попередній отримує сповіщення
+    published = [
+        (channel, orjson.loads(message)) for channel, message in redis.published
+    ]
+    assert [
+        (channel, event["contact_id"], event["action"]) for channel, event in published
+    ] == [(f"contacts:{user_id}", detached, "detached")]
+
+
+def test_get_changes(client, session, monkeypatch):
+    monkeypatch.setattr("src.routes.changes.settings.changes_settle_seconds", 0)
+    user = User(
+        name="changes",
+        last_name="changes",
+        day_of_born=date(2000, 1, 1),
+        email="changes@example.com",
+        password="password",
+        confirmed=True,
+    )
+    session.add(user)
+    session.commit()
+    token = asyncio.run(auth_service.create_access_token(data={"sub": user.email}))
+    headers = {"Authorization": f"Bearer {token}"}
+    contact = asyncio.run(
+        repository_contacts.create_contact(ContactModel(phone_number="0502"), session)
+    )
+
+    response = client.get("/api/changes/", headers=headers)
+    assert response.status_code == 200, response.text
+    page = response.json()
+    assert [(c["entity"], c["entity_id"], c["action"]) for c in page["changes"]] == [
+        ("contact", contact.id, "created")
+    ]
+    assert page["next"] == page["changes"][-1]["id"]
+
+    response = client.get(
+        "/api/changes/", params={"since": page["next"]}, headers=headers
+    )
+    assert response.json() == {"changes": [], "next": page["next"]}
+    assert client.get("/api/changes/").status_code == 401
+
+    # сесію закрито після запиту - контакт змінюється через новий екземпляр
+    session.get(Contact, contact.id).user_id = user.id
+    session.commit()
+    asyncio.run(repository_contacts.detach_contacts(Contact.id == contact.id, session))
+    session.commit()
+    response = client.get(
+        "/api/changes/", params={"since": page["next"]}, headers=headers
+    )
+    assert response.status_code == 200, response.text
+    assert [(c["entity_id"], c["action"]) for c in response.json()["changes"]] == [
+        (contact.id, "detached")
+    ]
+    ChangesPage(**response.json())  # відповідь відповідає документованій схемі
+
+
+def test_get_changes_expired_cursor(client, session, monkeypatch):
+    monkeypatch.setattr("src.routes.changes.settings.changes_settle_seconds", 0)
+    user = User(
+        name="expired",
+        last_name="expired",
+        day_of_born=date(2000, 1, 1),
+        email="expired@example.com",
+        password="password",
+        confirmed=True,
+    )
+    session.add(user)
+    session.commit()
+    token = asyncio.run(auth_service.create_access_token(data={"sub": user.email}))
+    headers = {"Authorization": f"Bearer {token}"}
+    asyncio.run(
+        repository_contacts.create_contact(ContactModel(phone_number="0503"), session)
+    )
+    since = client.get("/api/changes/", headers=headers).json()["next"]
+
+    # подія курсора очищена - наступні за нею теж могли зникнути
+    ids = session.scalars(select(ChangeEvent.id)).all()
+    asyncio.run(repository_changes.mark_changes_published(ids, session))
+    asyncio.run(
+        repository_changes.purge_published_changes(
+            datetime.now() + timedelta(days=1), 100, session
+        )
+    )
+    response = client.get("/api/changes/", params={"since": since}, headers=headers)
+    assert response.status_code == 410
+    assert client.get("/api/changes/", headers=headers).status_code == 200
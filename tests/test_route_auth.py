@@ -51,6 +51,7 @@ def test_login_user(client, session, user):
     assert response.status_code == 200, response.text
     data = response.json()
     assert data["token_type"] == "bearer"
+    assert response.headers["Server-Timing"].startswith("db;dur=")
 
 
 def test_login_wrong_password(client, user):
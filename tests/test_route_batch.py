@@ -0,0 +1,130 @@
+import asyncio
+from datetime import date
+
+import pytest
+from fastapi import Request
+from sqlalchemy.orm import sessionmaker
+
+from main import app
+from src.database.db import RoutingSession, begin_unit_of_work, get_db
+from src.database.models import Contact, User
+from src.repository import users as repository_users
+from src.services.auth import auth_service
+
+
+def access_token(session) -> str:
+    user = User(
+        name="batch",
+        last_name="batch",
+        day_of_born=date(2000, 1, 1),
+        email="batch@example.com",
+        description="batch user",
+        password="password",
+        confirmed=True,
+    )
+    session.add(user)
+    session.commit()
+    return asyncio.run(auth_service.create_access_token(data={"sub": user.email}))
+
+
+def test_batch(client, session, monkeypatch):
+    token = access_token(session)
+    calls = []
+    original = repository_users.find_user_by_email
+
+    async def counting_find_user_by_email(email, db):
+        calls.append(email)
+        return await original(email, db)
+
+    monkeypatch.setattr(
+        "src.repository.users.find_user_by_email", counting_find_user_by_email
+    )
+    response = client.post(
+        "/api/batch",
+        json={
+            "requests": [
+                {"path": "/api/users/me/"},
+                {"path": "/api/users/me/"},
+                {"path": "/api/auth/refresh_token"},
+                {"path": "/api/batch", "method": "POST"},
+            ]
+        },
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert response.status_code == 200, response.text
+    me, me_again, refresh, nested = response.json()
+    assert me["status"] == 200
+    assert me["body"]["email"] == "batch@example.com"
+    assert me_again["body"] == me["body"]
+    assert calls == ["batch@example.com"]  # токен перевіряється один раз
+    assert refresh["status"] == 401
+    assert nested["status"] == 400
+
+
+def test_batch_without_auth(client):
+    response = client.post(
+        "/api/batch", json={"requests": [{"path": "/api/users/me/"}]}
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()[0]["status"] == 401
+
+
+def test_batch_validation(client):
+    response = client.post("/api/batch", json={"requests": [{"path": "/metrics"}]})
+    assert response.status_code == 422
+
+
+@pytest.mark.usefixtures("fake_limiter")
+def test_batch_sub_requests_have_own_sessions(client, session, monkeypatch):
+    token = asyncio.run(
+        auth_service.create_access_token(data={"sub": "batch@example.com"})
+    )
+    user_id = session.query(User).filter(User.email == "batch@example.com").one().id
+    session_factory = sessionmaker(
+        class_=RoutingSession, autoflush=False, bind=session.get_bind()
+    )
+
+    def own_session_db(request: Request):
+        db = session_factory()
+        begin_unit_of_work(db, request)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    monkeypatch.setitem(app.dependency_overrides, get_db, own_session_db)
+    response = client.post(
+        "/api/batch",
+        json={
+            "requests": [
+                {
+                    "path": "/api/contacts/",
+                    "method": "POST",
+                    "body": {"phone_number": "0503333333"},
+                },
+                {
+                    "path": f"/api/users/{user_id}",
+                    "method": "PUT",
+                    "body": {
+                        "name": "batch",
+                        "last_name": "batch",
+                        "day_of_born": "2000-01-01",
+                        "email": "batch@example.com",
+                        "description": "batch user",
+                        "password": "password",
+                        "contacts": [999999],
+                    },
+                },
+                {"path": "/api/users/me/"},
+            ]
+        },
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert response.status_code == 200, response.text
+    created, failed, me = response.json()
+    assert created["status"] == 200
+    assert failed["status"] == 404
+    assert me["status"] == 200
+    # відкат невдалого підзапиту не скасовує зміни сусіднього
+    with session_factory() as db:
+        assert db.get(Contact, created["body"]["id"]) is not None
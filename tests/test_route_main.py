@@ -0,0 +1,84 @@
+from fastapi.testclient import TestClient
+from fastapi_limiter import FastAPILimiter
+from sqlalchemy import create_engine
+
+from main import app
+from src.database.db import TimedQueuePool
+from src.services import metrics
+from src.services.profiler import create_profile_token
+from tests.fakes import FakeRedis
+
+
+def test_read_root(client):
+    response = client.get("/")
+    assert response.status_code == 200
+    assert response.json() == {"message": "Hello World"}
+
+
+def test_metrics(client):
+    client.get("/")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert (
+        'http_request_duration_seconds_count{method="GET",route="/",status="200"}'
+        in response.text
+    )
+    assert "db_pool_checked_out" in response.text
+
+
+def test_pool_metrics_are_set_explicitly(tmp_path, monkeypatch):
+    db_engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}", poolclass=TimedQueuePool, pool_size=3
+    )
+    monkeypatch.setattr(metrics, "engine", db_engine)
+    # значення записуються, а не рахуються під час збору - працює і з кількома воркерами
+    with db_engine.connect():
+        assert metrics.DB_POOL_CHECKED_OUT._value.get() == 1
+        assert metrics.DB_POOL_SIZE._value.get() == 3
+    assert metrics.DB_POOL_CHECKED_OUT._value.get() == 0
+    db_engine.dispose()
+
+
+def test_profiling_with_token(client, tmp_path, monkeypatch):
+    monkeypatch.setattr("src.services.profiler.settings.profiling_dir", str(tmp_path))
+    response = client.get("/", headers={"X-Profile": create_profile_token()})
+    assert response.status_code == 200
+    assert len(list((tmp_path / "root").glob("*.collapsed"))) == 1
+
+
+def test_profiling_invalid_token(client, tmp_path, monkeypatch):
+    monkeypatch.setattr("src.services.profiler.settings.profiling_dir", str(tmp_path))
+    response = client.get("/", headers={"X-Profile": "invalid"})
+    assert response.status_code == 200
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_metrics_compressed(client):
+    response = client.get("/metrics", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert "db_pool_checked_out" in response.text
+
+
+def test_small_response_not_compressed(client):
+    response = client.get("/", headers={"Accept-Encoding": "gzip, br"})
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+
+
+def test_lifespan(monkeypatch):
+    previous_redis = FastAPILimiter.redis
+    redis = FakeRedis()
+    monkeypatch.setattr("main.InstrumentedRedis", lambda connection_pool: redis)
+    monkeypatch.setattr("main.settings.birthday_digest_scheduler_enabled", False)
+    monkeypatch.setattr("main.settings.purge_scheduler_enabled", False)
+    monkeypatch.setattr("main.settings.outbox_relay_enabled", False)
+    try:
+        with TestClient(app) as client:
+            assert FastAPILimiter.redis is redis
+            assert not app.state.http_client.is_closed
+            assert client.get("/").status_code == 200
+        assert app.state.http_client.is_closed
+    finally:
+        FastAPILimiter.redis = previous_redis
@@ -0,0 +1,121 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.database.single_flight import single_flight
+from src.repository import users as repository_users
+from src.services.metrics import SINGLE_FLIGHT_CALLS
+from tests.fakes import FakeSession
+
+calls = []
+sessions = []
+
+
+@single_flight
+async def slow_query(value: int, db) -> dict:
+    calls.append(threading.get_ident())
+    sessions.append(db)
+    time.sleep(0.05)  # синхронний запит до БД
+    if value < 0:
+        raise ValueError("negative")
+    return {"value": value}
+
+
+def metric(function: str, result: str) -> float:
+    return SINGLE_FLIGHT_CALLS.labels(function, result)._value.get()
+
+
+@pytest.fixture(autouse=True)
+def reset_calls():
+    calls.clear()
+    sessions.clear()
+
+
+def test_identical_calls_are_coalesced():
+    executed = metric("slow_query", "executed")
+    coalesced = metric("slow_query", "coalesced")
+
+    callers = [FakeSession() for _ in range(6)]
+
+    async def scenario():
+        return await asyncio.gather(
+            *(slow_query(1, db) for db in callers[:5]),
+            slow_query(2, db=callers[5]),
+        )
+
+    results = asyncio.run(scenario())
+    assert results == [{"value": 1}] * 5 + [{"value": 2}]
+    assert len(calls) == 2
+    # спільний виклик працює в сесії першого запиту, решта чекають результату
+    assert sessions == [callers[0], callers[5]]
+    assert threading.get_ident() not in calls  # event loop не блокується
+    assert metric("slow_query", "executed") - executed == 2
+    assert metric("slow_query", "coalesced") - coalesced == 4
+
+    asyncio.run(scenario())  # завершені виклики не кешуються
+    assert len(calls) == 4
+
+
+def test_session_that_wrote_is_not_coalesced():
+    async def scenario():
+        return await asyncio.gather(
+            slow_query(1, FakeSession(wrote=True)),
+            slow_query(1, FakeSession(wrote=True)),
+        )
+
+    assert asyncio.run(scenario()) == [{"value": 1}] * 2
+    assert len(calls) == 2
+
+
+def test_error_is_shared():
+    async def scenario():
+        return await asyncio.gather(
+            slow_query(-1, FakeSession()),
+            slow_query(-1, FakeSession()),
+            return_exceptions=True,
+        )
+
+    errors = asyncio.run(scenario())
+    assert [type(error) for error in errors] == [ValueError, ValueError]
+    assert len(calls) == 1
+
+
+def test_cancelled_caller_does_not_cancel_flight():
+    async def scenario():
+        first = asyncio.create_task(slow_query(3, FakeSession()))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(slow_query(3, FakeSession()))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        # перший запит завершується лише разом із викликом, що тримає його сесію
+        results = await asyncio.gather(first, second, return_exceptions=True)
+        return first.cancelled(), results[1]
+
+    assert asyncio.run(scenario()) == (True, {"value": 3})
+    assert len(calls) == 1
+
+
+def test_find_user_by_email_as_dict(session_factory, seed_users):
+    user_id = seed_users(2, 2)[0]
+
+    emails = ["user0@example.com"] * 3 + ["missing@example.com"]
+    # кожен запит - зі своєю сесією, як у застосунку
+    dbs = [session_factory() for _ in emails]
+
+    async def scenario():
+        return await asyncio.gather(
+            *(
+                repository_users.find_user_by_email_as_dict(email, db)
+                for email, db in zip(emails, dbs)
+            )
+        )
+
+    *found, missing = asyncio.run(scenario())
+    for db in dbs:
+        db.close()
+    assert found[0]["id"] == user_id
+    assert len(found[0]["contacts"]) == 2
+    assert found[1] is found[0]
+    assert missing is None
@@ -0,0 +1,95 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+
+from src.database.models import Contact, ContactDetachment, User, user_m2m_contact
+from src.repository import contacts as repository_contacts
+from src.repository import users as repository_users
+from src.services import purge
+
+
+def count(db, model) -> int:
+    return db.scalar(
+        select(func.count()).select_from(model).execution_options(include_deleted=True)
+    )
+
+
+def test_soft_delete_and_purge(session_factory, seed_users, monkeypatch):
+    user_ids = seed_users(5, 3)
+    monkeypatch.setattr(purge, "SessionLocal", session_factory)
+
+    with session_factory() as db:
+        user = db.get(User, user_ids[0])
+        email = user.email
+        contact_id = user.contacts[0].id
+        db.execute(insert(user_m2m_contact).values(user_id=user.id, contact_id=1))
+        db.commit()
+        asyncio.run(repository_users.remove_user(user.id, db, user))
+        other = db.get(User, user_ids[1])
+        other_contact_id = other.contacts[0].id
+        asyncio.run(repository_contacts.remove_contact(other_contact_id, db, other))
+
+    with session_factory() as db:
+        # видалені рядки не видно ні ORM-запитам, ні вибіркам колонок
+        assert asyncio.run(repository_users.find_user_by_email(email, db)) is None
+        assert db.get(User, user_ids[0]) is None
+        users = asyncio.run(repository_users.get_users_as_dicts(0, 100, db))
+        assert user_ids[0] not in [user["id"] for user in users]
+        assert other_contact_id not in [
+            contact.id for contact in db.get(User, user_ids[1]).contacts
+        ]
+        assert count(db, User) == 5
+        # email видаленого користувача можна зареєструвати знову
+        db.add(
+            User(
+                name="n",
+                last_name="l",
+                day_of_born=datetime(1990, 1, 1),
+                email=email,
+                password="p",
+            )
+        )
+        db.commit()
+
+    # рядки, видалені недавно, очищення не чіпає
+    assert asyncio.run(purge.purge_deleted(batch_size=1)) == {
+        "contacts": 0,
+        "users": 0,
+        "detachments": 0,
+    }
+    purged = asyncio.run(purge.purge_deleted(batch_size=1, retention_days=-1, pause=0))
+    # очищений користувач більше не синхронізується - tombstones йому не пишуться
+    assert purged == {"contacts": 1, "users": 1, "detachments": 0}
+
+    with session_factory() as db:
+        assert count(db, User) == 5
+        assert count(db, user_m2m_contact) == 0
+        # контакти видаленого користувача лишаються вільними, як раніше
+        assert db.get(Contact, contact_id).user_id is None
+        assert db.get(Contact, other_contact_id) is None
+
+
+def test_detach_keeps_owner_of_deleted_contacts(session_factory, seed_users):
+    user_id = seed_users(1, 2)[0]
+
+    with session_factory() as db:
+        user = db.get(User, user_id)
+        deleted_id, kept_id = [contact.id for contact in user.contacts]
+        asyncio.run(repository_contacts.remove_contact(deleted_id, db, user))
+        asyncio.run(repository_contacts.detach_contacts(Contact.user_id == user_id, db))
+        db.commit()
+
+    with session_factory() as db:
+        rows = db.execute(
+            select(Contact.id, Contact.user_id).execution_options(include_deleted=True)
+        ).all()
+        # tombstone м'яко видаленого контакту лишається у власника
+        assert sorted(rows) == sorted([(deleted_id, user_id), (kept_id, None)])
+        assert db.scalars(select(ContactDetachment.contact_id)).all() == [kept_id]
+
+
+def test_seconds_until_hour():
+    now = datetime(2024, 5, 1, 2, 30)
+    assert purge.seconds_until_hour(3, now) == 30 * 60
+    assert purge.seconds_until_hour(2, now) == timedelta(hours=23, minutes=30).seconds
@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src.database import db as database
+from src.database.db import UnitOfWorkRoute, get_db
+from src.database.models import User
+from src.repository import users as repository_users
+
+EMAIL = "user0@example.com"
+
+router = APIRouter(route_class=UnitOfWorkRoute)
+
+
+@router.post("/confirm")
+async def confirm(fail: bool = False, db: Session = Depends(get_db)):
+    # дві функції репозиторію, кожна з власним commit()
+    await repository_users.update_avatar(EMAIL, "avatar.png", db)
+    await repository_users.confirmed_email(EMAIL, db)
+    if fail:
+        raise HTTPException(status_code=409, detail="Conflict")
+    return {"ok": True}
+
+
+app = FastAPI()
+app.include_router(router)
+
+
+def test_unit_of_work(db_engine, session_factory, seed_users, monkeypatch):
+    user_id = seed_users(1)[0]
+    monkeypatch.setattr(database, "SessionLocal", session_factory)
+    commits = []
+    event.listen(db_engine, "commit", lambda conn: commits.append(conn))
+    client = TestClient(app)
+
+    response = client.post("/confirm", params={"fail": True})
+    assert response.status_code == 409
+    assert commits == []
+    with session_factory() as db:
+        assert db.get(User, user_id).avatar != "avatar.png"
+
+    response = client.post("/confirm")
+    assert response.status_code == 200
+    assert len(commits) == 1  # одна транзакція на запит
+    with session_factory() as db:
+        assert db.get(User, user_id).avatar == "avatar.png"
@@ -6,6 +6,8 @@ from src.database.models import Contact, User
 from src.schemas import ContactModel
 from src.repository.contacts import (
     get_contacts,
+    get_contacts_as_dicts,
+    get_contacts_by_ids_as_dicts,
     get_contact,
     create_contact,
     update_contact,
@@ -24,6 +26,18 @@ class TestUsers(unittest.IsolatedAsyncioTestCase):
         result = await get_contacts(skip=0, limit=10, db=self.session)
         self.assertEqual(result, contacts)
 
+    async def test_get_contacts_as_dicts(self):
+        rows = [{"phone_number": "0632428185", "id": 1}]
+        self.session.execute().mappings().all.return_value = rows
+        result = await get_contacts_as_dicts(skip=0, limit=10, db=self.session)
+        self.assertEqual(result, rows)
+
+    async def test_get_contacts_by_ids_as_dicts(self):
+        rows = [{"phone_number": "0632428185", "id": 2}]
+        self.session.execute().mappings().all.return_value = rows
+        result = await get_contacts_by_ids_as_dicts([2, 7], db=self.session)
+        self.assertEqual(result, [rows[0], None])
+
     async def test_get_contact_found(self):
         contact = Contact()
         self.session.query().filter().first.return_value = contact
@@ -67,6 +81,8 @@ class TestUsers(unittest.IsolatedAsyncioTestCase):
         self.session.query().filter().first.return_value = contact
         result = await remove_contact(contact_id=1, db=self.session, user=self.user)
         self.assertEqual(result, contact)
+        self.assertIsNotNone(contact.deleted_at)
+        self.session.delete.assert_not_called()
 
     async def test_remove_contact_not_found(self):
         self.session.query().filter().first.return_value = None
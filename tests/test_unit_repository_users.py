@@ -1,9 +1,10 @@
 import unittest
 from unittest.mock import MagicMock
 
+from fastapi import HTTPException
+
 from pydantic import BaseModel, Field, EmailStr
 
-from libgravatar import Gravatar
 from typing import Type
 from datetime import date, timedelta
 
@@ -16,6 +17,8 @@ from src.schemas import UserModel
 from src.repository.users import (
     create_user,
     get_users,
+    get_users_as_dicts,
+    get_users_by_ids_as_dicts,
     get_user,
     remove_user,
     update_user,
@@ -23,6 +26,8 @@ from src.repository.users import (
     find_user_by_last_name,
     find_user_by_email,
     find_next_7_days_birthdays,
+    refresh_birthday_digest,
+    get_birthday_digest_as_dicts,
     update_token,
     update_avatar,
     confirmed_email,
@@ -51,8 +56,7 @@ class TestUsers(unittest.IsolatedAsyncioTestCase):
             password="testPassword",
             contacts=[1, 2],
         )
-        contacts = [Contact(id=1), Contact(id=2)]
-        self.session.query().filter().all.return_value = contacts
+        self.session.execute().scalars().all.return_value = [1, 2]
         result = await create_user(body=body, db=self.session)
         self.assertEqual(result.name, body.name)
         self.assertEqual(result.last_name, body.last_name)
@@ -60,17 +64,104 @@ class TestUsers(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(result.email, body.email)
         self.assertEqual(result.description, body.description)
         self.assertEqual(result.password, body.password)
-        self.assertEqual(result.contacts, contacts)
+        self.assertEqual(
+            result.avatar,
+            "https://www.gravatar.com/avatar/b52056a9ad1ec713796198b51943fca7",
+        )
+        self.session.commit.assert_called_once()
         self.assertTrue(
             hasattr(result, "id")
         )  # перевірка на унікальність "id" при створенні
 
+    async def test_create_user_unknown_contacts(self):
+        body = UserModel(
+            name="test",
+            last_name="test",
+            day_of_born="2023-09-02",
+            email="exemple@gmail.com",
+            description="test description",
+            password="testPassword",
+            contacts=[1, 2, 3],
+        )
+        self.session.execute().scalars().all.return_value = [1]
+        with self.assertRaises(HTTPException) as err:
+            await create_user(body=body, db=self.session)
+        self.assertEqual(err.exception.status_code, 404)
+        self.assertEqual(err.exception.detail, "Contacts not found: 2, 3")
+        self.session.rollback.assert_called_once()
+        self.session.commit.assert_not_called()
+
     async def test_get_users(self):
         users = [User(), User(), User()]
         self.session.query().offset().limit().all.return_value = users
         result = await get_users(skip=0, limit=10, db=self.session)
         self.assertEqual(result, users)
 
+    async def test_get_users_as_dicts(self):
+        users = MagicMock()
+        users.mappings().all.return_value = [{"id": 1}, {"id": 2}]
+        contacts = MagicMock()
+        contacts.all.return_value = [("0632428185", 5, 1)]
+        self.session.execute.side_effect = [users, contacts]
+        result = await get_users_as_dicts(skip=0, limit=10, db=self.session)
+        self.assertEqual(
+            result,
+            [
+                {"id": 1, "contacts": [{"phone_number": "0632428185", "id": 5}]},
+                {"id": 2, "contacts": []},
+            ],
+        )
+
+    async def test_get_users_by_ids_as_dicts(self):
+        users = MagicMock()
+        users.mappings().all.return_value = [{"id": 3}, {"id": 1}]
+        contacts = MagicMock()
+        contacts.all.return_value = []
+        self.session.execute.side_effect = [users, contacts]
+        result = await get_users_by_ids_as_dicts([1, 2, 3, 1], db=self.session)
+        self.assertEqual(
+            result,
+            [
+                {"id": 1, "contacts": []},
+                None,
+                {"id": 3, "contacts": []},
+                {"id": 1, "contacts": []},
+            ],
+        )
+
+    async def test_get_users_as_dicts_empty(self):
+        self.session.execute().mappings().all.return_value = []
+        result = await get_users_as_dicts(skip=0, limit=10, db=self.session)
+        self.assertEqual(result, [])
+
+    async def test_get_users_as_dicts_fields(self):
+        rows = [{"id": 1, "name": "test", "email": "exemple@gmail.com"}]
+        self.session.execute().mappings().all.return_value = rows
+        self.session.execute.reset_mock()
+        result = await get_users_as_dicts(
+            skip=0, limit=10, db=self.session, fields=["id", "name", "email"]
+        )
+        self.assertEqual(result, rows)
+        self.session.execute.assert_called_once()  # контакти не запитуються
+        stmt = self.session.execute.call_args.args[0]
+        self.assertEqual(
+            [column.key for column in stmt.selected_columns], ["id", "name", "email"]
+        )
+
+    async def test_get_users_as_dicts_fields_contacts_without_id(self):
+        users = MagicMock()
+        users.mappings().all.return_value = [{"id": 1, "name": "test"}]
+        contacts = MagicMock()
+        contacts.all.return_value = [("0632428185", 5, 1)]
+        self.session.execute.side_effect = [users, contacts]
+        result = await get_users_as_dicts(
+            skip=0, limit=10, db=self.session, fields=["name", "contacts"]
+        )
+        self.assertEqual(
+            result,
+            [{"name": "test", "contacts": [{"phone_number": "0632428185", "id": 5}]}],
+        )
+
     async def test_get_user_found(self):
         self.session.query().filter().first.return_value = self.user
         result = await get_user(user_id=1, db=self.session)
@@ -85,6 +176,8 @@ class TestUsers(unittest.IsolatedAsyncioTestCase):
         self.session.query().filter().first.return_value = self.user
         result = await remove_user(user_id=1, db=self.session, user=self.user)
         self.assertEqual(result, self.user)
+        self.assertIsNotNone(self.user.deleted_at)
+        self.session.delete.assert_not_called()
 
     async def test_remove_user_not_found(self):
         self.session.query().filter().first.return_value = None
@@ -104,12 +197,32 @@ class TestUsers(unittest.IsolatedAsyncioTestCase):
         contacts = [Contact(id=1), Contact(id=2)]
         user = User(contacts=contacts)
         self.session.query().filter().first.return_value = user
+        self.session.execute().scalars().all.return_value = [1, 2]
         self.session.commit.return_value = None
         result = await update_user(
             user_id=1, body=body, user=self.user, db=self.session
         )
         self.assertEqual(result, user)
 
+    async def test_update_user_same_day_of_born(self):
+        body = UserModel(
+            name="test",
+            last_name="test",
+            day_of_born="2023-09-02",
+            email="exemple@gmail.com",
+            description="test description",
+            password="testPassword",
+            contacts=[1, 2],
+        )
+        user = User(day_of_born=date(2023, 9, 2))
+        self.session.query().filter().first.return_value = user
+        self.session.execute().scalars().all.return_value = [1, 2]
+        self.session.execute().all.return_value = []
+        self.session.execute.reset_mock()
+        await update_user(user_id=1, body=body, user=self.user, db=self.session)
+        # тільки прив'язка, пошук відв'язаних і відв'язка контактів, дайджест не змінюється
+        self.assertEqual(self.session.execute.call_count, 3)
+
     async def test_update_user_not_found(self):
         body = UserModel(
             name="test",
@@ -161,6 +274,19 @@ class TestUsers(unittest.IsolatedAsyncioTestCase):
         result = await find_user_by_email(user_email=self.email, db=self.session)
         self.assertIsNone(result)
 
+    async def test_refresh_birthday_digest(self):
+        self.session.execute().rowcount = 3
+        result = await refresh_birthday_digest(db=self.session, today=date(2023, 9, 2))
+        self.assertEqual(result, 3)
+        self.session.commit.assert_called_once()
+
+    async def test_get_birthday_digest_missing_digest_is_not_built(self):
+        self.session.get.return_value = None
+        self.session.execute().mappings().all.return_value = []
+        result = await get_birthday_digest_as_dicts(db=self.session)
+        self.assertEqual(result, [])
+        self.session.commit.assert_not_called()
+
     async def test_find_next_7_days_birthdays_found(self):
         users = [User(), User(), User()]
         self.session.query().filter().all.return_value = users